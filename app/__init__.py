@@ -1,25 +1,44 @@
+from collections.abc import Mapping
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+migrate = Migrate()
 
-def create_app():
+def create_app(config_object='app.config.Config'):
     app = Flask(__name__)
-    app.config.from_object('app.config.Config')
+    if isinstance(config_object, Mapping):
+        # A copy of a running app's config, e.g. in payroll run workers
+        app.config.from_mapping(config_object)
+    else:
+        app.config.from_object(config_object)
 
     # Initialize extensions with the app instance
     db.init_app(app)
+    migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
+    # Query counts, SQL time and latency per endpoint; see /admin/metrics
+    from app.metrics import init_metrics
+    init_metrics(app, db)
+
     # Import models AFTER db is initialized
-    from app.models import User
+    from app.identity import load_identity
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Served from a short-lived process-local cache, not a query per request
+        return load_identity(user_id)
+
+    from app.money import format_minor
+    from app.periods import MONTHS
+    app.add_template_filter(format_minor, 'money')
+    app.jinja_env.globals['months'] = MONTHS
 
     # Register Blueprints
     from app.auth import auth_bp
@@ -27,4 +46,8 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(payroll_bp)
 
+    # CLI commands
+    from app.commands import payroll_cli
+    app.cli.add_command(payroll_cli)
+
     return app
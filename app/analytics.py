@@ -0,0 +1,167 @@
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from matplotlib.figure import Figure
+from sqlalchemy import delete, func, insert, literal, select
+
+from app import db
+from app.models import Employee, Payroll, PayrollRollup
+from app.money import from_minor
+from app.periods import MONTHS, month_number, period_key, period_label, year_range
+from app.refdata import refdata
+
+
+GROUPINGS = {
+    'department': PayrollRollup.department_id,
+    'grade': PayrollRollup.grade_id,
+    'month': PayrollRollup.period_key,
+}
+METRICS = {
+    'gross_salary': 'Gross Salary',
+    'total_deductions': 'Total Deductions',
+    'net_pay': 'Net Pay',
+    'headcount': 'Headcount',
+}
+AMOUNT_METRICS = ('gross_salary', 'total_deductions', 'net_pay')
+CHART_CACHE_SIZE = 64
+
+_charts = OrderedDict()
+_charts_lock = threading.Lock()
+
+
+# ------------------------- REFRESH -------------------------------------
+
+def refresh_period(key):
+    """Rebuild one period's rollup rows from payroll; the caller commits.
+
+    Called in the same transaction that writes the period, so the rollup
+    never disagrees with the payroll table it summarises.
+    """
+    db.session.execute(delete(PayrollRollup).where(PayrollRollup.period_key == key))
+    grouped = (
+        select(
+            Payroll.period_key,
+            Employee.department_id,
+            Payroll.grade_id,
+            func.count(),
+            *(func.sum(getattr(Payroll, column)) for column in AMOUNT_METRICS),
+            literal(datetime.utcnow(), db.DateTime),
+        )
+        .join(Employee, Payroll.employee_id == Employee.employee_id)
+        .where(Payroll.period_key == key)
+        .group_by(Payroll.period_key, Employee.department_id, Payroll.grade_id)
+    )
+    db.session.execute(insert(PayrollRollup).from_select(
+        ['period_key', 'department_id', 'grade_id', 'headcount', *AMOUNT_METRICS, 'refreshed_at'],
+        grouped,
+    ))
+
+
+def rebuild(year=None):
+    """Refresh every period (of one year) that has payroll rows."""
+    stmt = select(Payroll.period_key).distinct().order_by(Payroll.period_key)
+    if year is not None:
+        stmt = stmt.where(Payroll.period_key.between(*year_range(year)))
+    keys = db.session.execute(stmt).scalars().all()
+    for key in keys:
+        refresh_period(key)
+    db.session.commit()
+    return keys
+
+
+# ------------------------- QUERIES -------------------------------------
+
+def parse_analytics_args(args):
+    grouping = args.get('by') if args.get('by') in GROUPINGS else 'department'
+    metric = args.get('metric') if args.get('metric') in METRICS else 'gross_salary'
+    year = args.get('year', '').strip()
+    year = int(year) if year.isdigit() else None
+    month = args.get('month') if args.get('month') in MONTHS else None
+    return grouping, metric, year, month
+
+
+def _label(grouping, value):
+    if grouping == 'month':
+        return period_label(value)
+    if grouping == 'department':
+        department = refdata.by_id('departments').get(value)
+        return department.department_name if department else 'Unassigned'
+    grade = refdata.by_id('grades').get(value)
+    return grade.grade_name if grade else f"Grade {value}"
+
+
+def rollup(grouping, year=None, month=None):
+    """Totals per department, grade or month, read from the rollup table.
+
+    Amounts are summed over the selected periods. Headcount is that of the
+    latest period, since summing it across months would count people twice.
+    """
+    column = GROUPINGS[grouping]
+    stmt = (
+        select(
+            column, PayrollRollup.period_key, func.sum(PayrollRollup.headcount),
+            *(func.sum(getattr(PayrollRollup, c)) for c in AMOUNT_METRICS),
+        )
+        .group_by(column, PayrollRollup.period_key)
+        .order_by(PayrollRollup.period_key)
+    )
+    if year is not None and month is not None:
+        stmt = stmt.where(PayrollRollup.period_key == period_key(month, year))
+    elif year is not None:
+        stmt = stmt.where(PayrollRollup.period_key.between(*year_range(year)))
+    elif month is not None:
+        # That month in every year.
+        stmt = stmt.where(PayrollRollup.period_key % 100 == month_number(month))
+
+    totals = {}
+    for value, key, headcount, *amounts in db.session.execute(stmt):
+        entry = totals.setdefault(value, {'key': value, 'label': _label(grouping, value), 'headcount': 0,
+                                          **{c: 0 for c in AMOUNT_METRICS}})
+        entry['headcount'] = int(headcount)
+        for c, amount in zip(AMOUNT_METRICS, amounts):
+            entry[c] += amount or 0
+
+    rows = list(totals.values())
+    for row in rows:
+        # Summed as integer pesewas; presented in cedis as before.
+        row.update((c, from_minor(row[c])) for c in AMOUNT_METRICS)
+    if grouping == 'month':
+        return sorted(rows, key=lambda row: row['key'])
+    return sorted(rows, key=lambda row: row['label'])
+
+
+# ------------------------- CHARTS --------------------------------------
+
+def chart_png(grouping, metric, rows):
+    """Return (digest, png) for rows, rendering only when the data changed."""
+    digest = hashlib.sha256(json.dumps([grouping, metric, rows], default=str).encode()).hexdigest()
+    with _charts_lock:
+        if digest in _charts:
+            _charts.move_to_end(digest)
+            return digest, _charts[digest]
+
+    # Figure rather than pyplot: no global state, safe in threaded workers.
+    figure = Figure(figsize=(8, 4), dpi=100)
+    axes = figure.add_subplot()
+    labels = [row['label'] for row in rows]
+    values = [float(row[metric]) for row in rows]
+    if grouping == 'month':
+        axes.plot(labels, values, marker='o')
+    else:
+        axes.bar(labels, values)
+    axes.set_title(f"{METRICS[metric]} by {grouping}")
+    axes.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    png = buffer.getvalue()
+
+    with _charts_lock:
+        _charts[digest] = png
+        while len(_charts) > CHART_CACHE_SIZE:
+            _charts.popitem(last=False)
+    return digest, png
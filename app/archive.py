@@ -0,0 +1,395 @@
+"""Cold storage for closed payroll years.
+
+Each archived period is one compressed NumPy file (np.savez_compressed)
+with a member per payroll column: ids and period keys as int64, amounts as
+int64 pesewas, generated_at as datetime64. Rows are sorted by employee_id so
+one employee's row is a binary search away. manifest.json lists every
+archived year and period with its row count, net total and checksum.
+
+Reads are lazy and columnar: ArchivedPayroll only decompresses the columns
+that are actually touched, and decompressed columns are kept in a
+size-bounded LRU. A file's checksum is verified before its first read in a
+process, and before it is restored.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+
+from app import db
+from app.calculator import ALLOWANCE_FIELDS, DEDUCTION_FIELDS
+from app.models import Employee, Payroll
+from app.money import Money, to_minor
+from app.periods import MONTHS, period_label, year_range
+
+
+MANIFEST_VERSION = 1
+ID_COLUMNS = ('payroll_id', 'employee_id', 'grade_id', 'element_id', 'period_key')
+AMOUNT_COLUMNS = (
+    'basic_salary', *ALLOWANCE_FIELDS, *DEDUCTION_FIELDS,
+    'total_allowances', 'gross_salary', 'total_deductions', 'net_pay',
+)
+RESTORE_BATCH = 5000
+
+_lock = threading.Lock()
+_manifests = {}
+_columns = OrderedDict()
+_columns_bytes = 0
+# (path, mtime) of files whose checksum matched the manifest.
+_verified = set()
+
+
+# ------------------------- LOCATIONS -----------------------------------
+
+def archive_dir():
+    path = current_app.config.get('PAYROLL_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archive')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _period_file(key):
+    return os.path.join('payroll', str(key // 100), f"{key}.npz")
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            write(handle)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _check_file(key, entry):
+    # The period's file, once its checksum matches the manifest entry.
+    path = os.path.join(archive_dir(), entry['file'])
+    stamp = (path, os.stat(path).st_mtime_ns)
+    with _lock:
+        if stamp in _verified:
+            return path
+    if _sha256(path) != entry['sha256']:
+        raise RuntimeError(f"Archive file of {period_label(key)} does not match its manifest checksum.")
+    with _lock:
+        _verified.add(stamp)
+    return path
+
+
+# ------------------------- MANIFEST ------------------------------------
+
+def manifest():
+    """{'version': 1, 'years': {'2023': {..., 'periods': {'202301': {...}}}}}"""
+    path = os.path.join(archive_dir(), 'manifest.json')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {'version': MANIFEST_VERSION, 'years': {}}
+    with _lock:
+        cached = _manifests.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path) as handle:
+        data = json.load(handle)
+    with _lock:
+        _manifests[path] = (mtime, data)
+    return data
+
+
+def _save_manifest(data):
+    path = os.path.join(archive_dir(), 'manifest.json')
+    _write_atomic(path, lambda handle: handle.write(json.dumps(data, indent=2, sort_keys=True).encode()))
+
+
+def archived_keys():
+    """Every archived period key, oldest first."""
+    return sorted(int(key) for year in manifest()['years'].values() for key in year['periods'])
+
+
+def is_archived(key):
+    return str(int(key) // 100) in manifest()['years']
+
+
+def _manifest_entry(key):
+    return manifest()['years'].get(str(key // 100), {}).get('periods', {}).get(str(key))
+
+
+def archived_row_count(key):
+    period = _manifest_entry(key)
+    return period['rows'] if period else 0
+
+
+def ensure_hot(key):
+    # Archived periods are read-only, and nothing may be written before
+    # them; a correction needs the year restored.
+    years = manifest()['years']
+    newest = max(map(int, years), default=None)
+    if newest is not None and int(key) // 100 <= newest:
+        raise ValueError(f"Payroll up to {newest} is archived; restore it before changing {period_label(key)}.")
+
+
+# ------------------------- COLUMNS -------------------------------------
+
+def period_column(key, name):
+    global _columns_bytes
+    path = os.path.join(archive_dir(), _period_file(key))
+    cache_key = (path, os.stat(path).st_mtime_ns, name)
+    with _lock:
+        if cache_key in _columns:
+            _columns.move_to_end(cache_key)
+            return _columns[cache_key]
+
+    with np.load(_check_file(key, _manifest_entry(key))) as archive:
+        values = archive[name]
+
+    with _lock:
+        _columns[cache_key] = values
+        _columns_bytes += values.nbytes
+        limit = current_app.config.get('ARCHIVE_CACHE_BYTES', 0)
+        while _columns_bytes > limit and len(_columns) > 1:
+            _, evicted = _columns.popitem(last=False)
+            _columns_bytes -= evicted.nbytes
+    return values
+
+
+class ArchivedPayroll:
+    """Read-only stand-in for a Payroll row of an archived period.
+
+    Has the same attributes as Payroll; each is read from its column on
+    first use. employee is set by whoever loads the rows.
+    """
+    archived = True
+
+    def __init__(self, key, index, employee=None):
+        self.period_key = key
+        self.row_index = index
+        self.employee = employee
+
+    def __getattr__(self, name):
+        if name in ID_COLUMNS:
+            return int(period_column(self.period_key, name)[self.row_index])
+        if name in AMOUNT_COLUMNS:
+            return Money(period_column(self.period_key, name)[self.row_index])
+        if name == 'generated_at':
+            value = period_column(self.period_key, name)[self.row_index]
+            return None if np.isnat(value) else value.astype('datetime64[us]').item()
+        raise AttributeError(name)
+
+    @property
+    def month(self):
+        return MONTHS[self.period_key % 100 - 1]
+
+    @property
+    def year(self):
+        return self.period_key // 100
+
+    @property
+    def period(self):
+        return self.period_key
+
+    @property
+    def period_label(self):
+        return f"{self.month} {self.year}"
+
+
+def archived_rows(key, employee_ids=None):
+    """ArchivedPayroll rows of a period in employee order, optionally only
+    those of employee_ids."""
+    if not archived_row_count(key):
+        return []
+    employees = period_column(key, 'employee_id')
+    if employee_ids is None:
+        index = range(len(employees))
+    else:
+        wanted = np.asarray(sorted(employee_ids), dtype=np.int64)
+        pos = np.searchsorted(employees, wanted)
+        found = pos < len(employees)
+        found[found] = employees[pos[found]] == wanted[found]
+        index = pos[found].tolist()
+    return [ArchivedPayroll(key, int(i)) for i in index]
+
+
+def attach_employees(rows):
+    """Set .employee on archived rows with one query."""
+    ids = sorted({row.employee_id for row in rows})
+    employees = {}
+    if ids:
+        employees = {e.employee_id: e for e in Employee.query.filter(Employee.employee_id.in_(ids))}
+    for row in rows:
+        row.employee = employees.get(row.employee_id)
+    return rows
+
+
+def ytd_arrays(key, fields):
+    """{field: int64 pesewas} through key for each employee of the period,
+    aligned with period_column(key, 'employee_id')."""
+    if not archived_row_count(key):
+        return {f: np.zeros(0, dtype=np.int64) for f in fields}
+    employees = period_column(key, 'employee_id')
+    totals = {f: np.zeros(len(employees), dtype=np.int64) for f in fields}
+    first = year_range(key // 100)[0]
+    for earlier in archived_keys():
+        if not first <= earlier <= key:
+            continue
+        others = period_column(earlier, 'employee_id')
+        pos = np.clip(np.searchsorted(others, employees), 0, max(len(others) - 1, 0))
+        found = others[pos] == employees if len(others) else np.zeros(len(employees), dtype=bool)
+        for f in fields:
+            totals[f][found] += period_column(earlier, f)[pos[found]]
+    return totals
+
+
+# ------------------------- ARCHIVING -----------------------------------
+
+def _export_period(key, path):
+    stmt = (
+        select(*(getattr(Payroll, c) for c in ID_COLUMNS + AMOUNT_COLUMNS), Payroll.generated_at)
+        .where(Payroll.period_key == key)
+        .order_by(Payroll.employee_id)
+    )
+    rows = db.session.execute(stmt).all()
+    arrays = {}
+    for i, name in enumerate(ID_COLUMNS):
+        arrays[name] = np.array([row[i] for row in rows], dtype=np.int64)
+    for i, name in enumerate(AMOUNT_COLUMNS, len(ID_COLUMNS)):
+        arrays[name] = np.array([to_minor(row[i]) for row in rows], dtype=np.int64)
+    arrays['generated_at'] = np.array([row[-1] or 'NaT' for row in rows], dtype='datetime64[us]')
+
+    _write_atomic(path, lambda handle: np.savez_compressed(handle, **arrays))
+    return {
+        'file': _period_file(key),
+        'rows': len(rows),
+        'net_pay': int(arrays['net_pay'].sum()),
+        'sha256': _sha256(path),
+    }
+
+
+def _check_export(key, entry):
+    # Reopen the written file and compare its row count and every column's
+    # total with the table, before any row is deleted.
+    with np.load(os.path.join(archive_dir(), entry['file'])) as archive:
+        written = [len(archive['payroll_id'])] + [int(archive[c].sum()) for c in ID_COLUMNS + AMOUNT_COLUMNS]
+    expected = db.session.execute(
+        select(func.count(), *(func.sum(getattr(Payroll, c)) for c in ID_COLUMNS + AMOUNT_COLUMNS))
+        .where(Payroll.period_key == key)
+    ).one()
+    if written != [int(value or 0) for value in expected]:
+        raise RuntimeError(f"Archive of {period_label(key)} does not match the payroll table.")
+
+
+def archive_year(year):
+    """Move a closed year's payroll rows into compressed period files.
+
+    Files and manifest are written first; the rows are deleted only after
+    every file has been reopened and its row count and column totals
+    checked against the table. Running it again for an archived year
+    finishes an interrupted delete.
+    """
+    year = int(year)
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not closed yet.")
+    first, last = year_range(year)
+    data = manifest()
+    # Archived periods must stay older than every period in the table, so
+    # reads can continue from one into the other in period order.
+    older = db.session.execute(select(func.min(Payroll.period_key))).scalar()
+    if older is not None and older < first:
+        raise ValueError(f"Archive {older // 100} first.")
+
+    if str(year) not in data['years']:
+        keys = db.session.execute(
+            select(Payroll.period_key).distinct().where(Payroll.period_key.between(first, last))
+            .order_by(Payroll.period_key)
+        ).scalars().all()
+        if not keys:
+            raise ValueError(f"No payroll rows for {year}.")
+
+        periods = {}
+        for key in keys:
+            entry = _export_period(key, os.path.join(archive_dir(), _period_file(key)))
+            _check_export(key, entry)
+            periods[str(key)] = entry
+
+        data = dict(data, years=dict(data['years']))
+        data['years'][str(year)] = {
+            'archived_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'rows': sum(p['rows'] for p in periods.values()),
+            'periods': periods,
+        }
+        _save_manifest(data)
+
+    deleted = 0
+    for key in map(int, data['years'][str(year)]['periods']):
+        deleted += db.session.execute(delete(Payroll).where(Payroll.period_key == key)).rowcount
+    db.session.commit()
+    return data['years'][str(year)]['rows'], deleted
+
+
+def archive_closed_years(keep_years=None):
+    """Archive every year older than the newest keep_years (the current
+    year included); returns the years archived."""
+    keep_years = keep_years or current_app.config.get('ARCHIVE_KEEP_YEARS', 2)
+    cutoff = date.today().year - keep_years + 1
+    oldest = db.session.execute(select(func.min(Payroll.period_key))).scalar()
+    if oldest is None:
+        return []
+    archived = []
+    for year in range(oldest // 100, cutoff):
+        if db.session.execute(select(Payroll.payroll_id).where(Payroll.year == year).limit(1)).first():
+            archive_year(year)
+            archived.append(year)
+    return archived
+
+
+def restore_year(year):
+    """Put an archived year back into the payroll table."""
+    year = str(int(year))
+    data = manifest()
+    if year not in data['years']:
+        raise ValueError(f"{year} is not archived.")
+    newer = max(data['years'], key=int)
+    if newer != year:
+        raise ValueError(f"Restore {newer} first.")
+
+    periods = data['years'][year]['periods']
+    # Every file is checked before the first row goes back in.
+    paths = {int(key): _check_file(int(key), entry) for key, entry in periods.items()}
+    columns = ID_COLUMNS + AMOUNT_COLUMNS
+    restored = 0
+    for key, path in paths.items():
+        with np.load(path) as archive:
+            arrays = {name: archive[name] for name in columns + ('generated_at',)}
+        generated = [None if np.isnat(v) else v.astype('datetime64[us]').item() for v in arrays['generated_at']]
+        month = MONTHS[key % 100 - 1]
+        rows = []
+        for i in range(len(arrays['payroll_id'])):
+            row = {name: int(arrays[name][i]) for name in ID_COLUMNS}
+            row.update({name: Money(arrays[name][i]) for name in AMOUNT_COLUMNS})
+            row.update(month=month, year=key // 100, generated_at=generated[i])
+            rows.append(row)
+        for start in range(0, len(rows), RESTORE_BATCH):
+            db.session.execute(insert(Payroll), rows[start:start + RESTORE_BATCH])
+        restored += len(rows)
+    db.session.commit()
+
+    data = dict(data, years={y: v for y, v in data['years'].items() if y != year})
+    _save_manifest(data)
+    for period in periods.values():
+        os.unlink(os.path.join(archive_dir(), period['file']))
+    return restored
@@ -0,0 +1,197 @@
+"""Effective-dated grade and element assignments, and back-pay.
+
+Each employee has a history of [effective_from, effective_to) intervals per
+assignment kind. A period is paid on the assignments in effect on its last
+day (see app.calculator.batch_select), so a back-dated change affects the
+generated periods whose last day falls inside the changed interval.
+"""
+from collections import namedtuple
+from datetime import date
+
+from sqlalchemy import select
+
+from app import db
+from app.analytics import refresh_period
+from app.archive import archived_keys, archived_rows, ensure_hot, is_archived
+from app.calculator import batch_select, calculate, load_batch
+from app.models import ElementAssignment, Employee, GradeAssignment, Payroll
+from app.payroll_engine import payroll_rows, upsert_payroll
+from app.periods import MONTHS, key_of, period_end
+from app.refdata import refdata
+from app.statutory import rules_for
+from app.ytd import refresh_ytd
+
+
+# Start of the first interval when nothing earlier is known: the first
+# assignment then applies to every period, as employee.grade_id did.
+OPEN_START = date(1900, 1, 1)
+
+# kind -> (model, value column, reference table)
+KINDS = {
+    'grade': (GradeAssignment, 'grade_id', 'grades'),
+    'element': (ElementAssignment, 'element_id', 'elements'),
+}
+
+Arrear = namedtuple('Arrear', 'employee_id period_key paid_grade_id grade_id gross deductions net')
+
+
+# ------------------------- HISTORY -------------------------------------
+
+def history(employee_id):
+    """{kind: [assignment, ...]} oldest first."""
+    return {
+        kind: db.session.execute(
+            select(model).where(model.employee_id == employee_id).order_by(model.effective_from)
+        ).scalars().all()
+        for kind, (model, _, _) in KINDS.items()
+    }
+
+
+def initial_assignments(employees, effective_from=OPEN_START):
+    """Assignment rows for new employees (dicts with grade_id/element_id)."""
+    return {
+        kind: [
+            {'employee_id': e['employee_id'], column: e[column], 'effective_from': effective_from}
+            for e in employees if e.get(column) is not None
+        ]
+        for kind, (_, column, _) in KINDS.items()
+    }
+
+
+def _assign(kind, employee_id, day, value):
+    # Returns the (start, end) interval now carrying value, or None when
+    # nothing changed. The change runs until the next recorded change.
+    model, column, _ = KINDS[kind]
+    rows = history(employee_id)[kind]
+    current = next((r for r in rows if r.effective_from <= day and (r.effective_to is None or r.effective_to > day)),
+                   None)
+
+    if current is None:
+        end = next((r.effective_from for r in rows if r.effective_from > day), None)
+        db.session.add(model(employee_id=employee_id, effective_from=day, effective_to=end, **{column: value}))
+        return day, end
+    if getattr(current, column) == value:
+        return None
+
+    end = current.effective_to
+    if current.effective_from == day:
+        setattr(current, column, value)
+    else:
+        current.effective_to = day
+        db.session.add(model(employee_id=employee_id, effective_from=day, effective_to=end, **{column: value}))
+    return day, end
+
+
+def assign(employee_id, effective_from, grade_id=None, element_id=None):
+    """Record a grade and/or element change from effective_from.
+
+    effective_from may be in the past. Returns the keys of the generated
+    periods it affects, for arrears(); the caller commits.
+    """
+    employee = db.session.get(Employee, employee_id)
+    if employee is None:
+        raise ValueError(f"Unknown employee {employee_id}")
+
+    changed = []
+    for kind, value in (('grade', grade_id), ('element', element_id)):
+        if value is None:
+            continue
+        _, column, table = KINDS[kind]
+        if value not in refdata.by_id(table):
+            raise ValueError(f"Unknown {column} {value}")
+        interval = _assign(kind, employee_id, effective_from, value)
+        if interval:
+            changed.append(interval)
+    if not changed:
+        return []
+
+    # employee.grade_id/element_id keep showing today's assignment.
+    today = date.today()
+    for kind, (model, column, _) in KINDS.items():
+        value = db.session.execute(
+            select(getattr(model, column)).where(model.employee_id == employee_id, model.in_effect(today))
+        ).scalar()
+        setattr(employee, column, value)
+
+    ends = [end for _, end in changed]
+    return affected_periods([employee_id], effective_from, None if None in ends else max(ends))
+
+
+def affected_periods(employee_ids, start, end=None):
+    """Generated periods of employee_ids whose last day is in [start, end)."""
+    stmt = (
+        select(Payroll.period_key).distinct()
+        .where(Payroll.employee_id.in_(employee_ids), Payroll.period_key >= key_of(start))
+        .order_by(Payroll.period_key)
+    )
+    if end is not None:
+        stmt = stmt.where(Payroll.period_key < key_of(end))
+    archived = [
+        key for key in archived_keys()
+        if key >= key_of(start) and (end is None or key < key_of(end)) and archived_rows(key, employee_ids)
+    ]
+    return archived + db.session.execute(stmt).scalars().all()
+
+
+# ------------------------- BACK PAY ------------------------------------
+
+def _recalculate(employee_ids, key):
+    # Everyone's compensation for the period in one range join.
+    month, year = MONTHS[key % 100 - 1], key // 100
+    stmt = batch_select(period_end(key)).where(Employee.employee_id.in_(employee_ids))
+    return calculate(load_batch(stmt), rules_for(month, year))
+
+
+def arrears(employee_ids, keys):
+    """What each period should have paid, less what it did, in pesewas.
+
+    Only employees and periods whose amounts differ are returned.
+    """
+    out = []
+    for key in keys:
+        result = _recalculate(employee_ids, key)
+        if is_archived(key):
+            paid = {row.employee_id: row for row in archived_rows(key, employee_ids)}
+        else:
+            paid = {
+                row.employee_id: row for row in db.session.execute(
+                    select(Payroll.employee_id, Payroll.grade_id, Payroll.gross_salary,
+                           Payroll.total_deductions, Payroll.net_pay)
+                    .where(Payroll.period_key == key, Payroll.employee_id.in_(employee_ids))
+                )
+            }
+        for i in range(len(result)):
+            employee_id = int(result.batch.employee_id[i])
+            row = paid.get(employee_id)
+            if row is None:
+                continue
+            arrear = Arrear(
+                employee_id, key, row.grade_id, int(result.batch.grade_id[i]),
+                int(result.gross[i]) - row.gross_salary,
+                int(result.total_deductions[i]) - row.total_deductions,
+                int(result.net[i]) - row.net_pay,
+            )
+            if arrear.gross or arrear.deductions or arrear.net:
+                out.append(arrear)
+    return out
+
+
+def correct_periods(employee_ids, keys):
+    """Regenerate employee_ids' rows for keys from their assignments.
+
+    YTD accumulators and rollups of the periods are refreshed in the same
+    transaction. Returns the number of rows rewritten.
+    """
+    for key in keys:
+        ensure_hot(key)
+    written = 0
+    for key in keys:
+        month, year = MONTHS[key % 100 - 1], key // 100
+        rows = payroll_rows(_recalculate(employee_ids, key), month, year)
+        upsert_payroll(rows)
+        refresh_period(key)
+        written += len(rows)
+    for year in sorted({key // 100 for key in keys}):
+        refresh_ytd(year, employee_ids)
+    db.session.commit()
+    return written
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required
 from app.models import User, Employee
 from app import db
+from app.identity import identity_cache
 from werkzeug.security import check_password_hash
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -59,6 +60,7 @@ def register():
         new_user = User(username=username, employee_id=employee_id, role='employee') # setting the default role to user
         db.session.add(new_user)
         db.session.commit()
+        identity_cache.invalidate_employee(employee_id)
         flash("Account created! You can now log in.", "success")
         return redirect(url_for('auth.login'))
 
@@ -0,0 +1,151 @@
+import logging
+from datetime import date
+
+import numpy as np
+from sqlalchemy import and_, select
+
+from app import db
+from app.models import ElementAssignment, Employee, GradeAssignment
+from app.money import to_minor
+from app.refdata import refdata
+
+logger = logging.getLogger(__name__)
+
+ALLOWANCE_FIELDS = (
+    'transport_allowance',
+    'utility_allowance',
+    'extra_duty_allowance',
+    'other_allowance',
+    'overtime',
+)
+
+DEDUCTION_FIELDS = (
+    'social_security_deduction',
+    'tax_deduction',
+    'loan1_deduction',
+    'loan2_deduction',
+    'other_deductions',
+)
+
+PAYSLIP_LABELS = {
+    'transport_allowance': 'Transport Allowance',
+    'utility_allowance': 'Utility Allowance',
+    'extra_duty_allowance': 'Extra Duty Allowance',
+    'other_allowance': 'Other Allowance',
+    'overtime': 'Overtime',
+    'social_security_deduction': 'Social Security',
+    'tax_deduction': 'Income Tax',
+    'loan1_deduction': 'Loan 1',
+    'loan2_deduction': 'Loan 2',
+    'other_deductions': 'Other Deductions',
+}
+
+
+# ------------------------- BATCHES -------------------------------------
+
+class PayrollBatch:
+    """Column arrays for a set of employees, all amounts in pesewas."""
+
+    def __init__(self, employee_id, grade_id, element_id, basic, allowances, deductions):
+        self.employee_id = np.asarray(employee_id, dtype=np.int64)
+        self.grade_id = np.asarray(grade_id, dtype=np.int64)
+        self.element_id = np.asarray(element_id, dtype=np.int64)
+        self.basic = np.asarray(basic, dtype=np.int64)
+        self.allowances = np.asarray(allowances, dtype=np.int64).reshape(-1, len(ALLOWANCE_FIELDS))
+        self.deductions = np.asarray(deductions, dtype=np.int64).reshape(-1, len(DEDUCTION_FIELDS))
+
+    def __len__(self):
+        return len(self.employee_id)
+
+
+def batch_select(as_of=None):
+    # Everyone's grade and element as of a day (today by default), resolved
+    # in one range join against the assignment tables; load_batch adds the
+    # amounts.
+    as_of = as_of or date.today()
+    return (
+        select(Employee.employee_id, GradeAssignment.grade_id, ElementAssignment.element_id)
+        .join(GradeAssignment, and_(
+            GradeAssignment.employee_id == Employee.employee_id, GradeAssignment.in_effect(as_of),
+        ))
+        .join(ElementAssignment, and_(
+            ElementAssignment.employee_id == Employee.employee_id, ElementAssignment.in_effect(as_of),
+        ))
+        .order_by(Employee.employee_id)
+    )
+
+
+def _lookup(ids, table, columns):
+    # Gather per-row amounts for ids from a small {id: row} table. Returns
+    # (amounts, found) where found masks ids with no row in the table.
+    keys = np.array(sorted(table), dtype=np.int64)
+    values = np.array(
+        [[to_minor(getattr(table[k], c)) for c in columns] for k in keys], dtype=np.int64
+    ).reshape(len(keys), len(columns))
+    if not len(keys):
+        return np.zeros((len(ids), len(columns)), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+
+    pos = np.clip(np.searchsorted(keys, ids), 0, len(keys) - 1)
+    found = keys[pos] == ids
+    return values[pos], found
+
+
+def load_batch(stmt=None, grades=None, elements=None):
+    stmt = batch_select() if stmt is None else stmt
+    data = np.array(db.session.execute(stmt).all(), dtype=np.int64).reshape(-1, 3)
+    # Read through to the database: rows are stored as computed from the
+    # amounts current when the run started.
+    grades = refdata.by_id('grades', fresh=True) if grades is None else grades
+    elements = refdata.by_id('elements', fresh=True) if elements is None else elements
+
+    basic, has_grade = _lookup(data[:, 1], grades, ('salary',))
+    amounts, has_element = _lookup(data[:, 2], elements, ALLOWANCE_FIELDS + DEDUCTION_FIELDS)
+    # Employees pointing at a missing grade or element are skipped, as the
+    # old inner join did; with fresh reads that only happens for ids the
+    # foreign keys would not allow.
+    keep = has_grade & has_element
+    if not keep.all():
+        logger.warning("Skipped %d employees with no grade or element row: %s",
+                       (~keep).sum(), data[~keep, 0][:10].tolist())
+    split = len(ALLOWANCE_FIELDS)
+    return PayrollBatch(
+        data[keep, 0], data[keep, 1], data[keep, 2], basic[keep, 0],
+        amounts[keep, :split], amounts[keep, split:],
+    )
+
+
+# ------------------------- CALCULATION ---------------------------------
+
+class PayrollResult:
+    def __init__(self, batch):
+        self.batch = batch
+        self.basic = batch.basic
+        self.total_allowances = batch.allowances.sum(axis=1)
+        self.total_deductions = batch.deductions.sum(axis=1)
+        self.gross = self.basic + self.total_allowances
+        self.net = self.gross - self.total_deductions
+
+    def __len__(self):
+        return len(self.batch)
+
+    def row(self, i):
+        return {
+            'employee_id': int(self.batch.employee_id[i]),
+            'basic': int(self.basic[i]),
+            'allowances': int(self.total_allowances[i]),
+            'deductions': int(self.total_deductions[i]),
+            'gross': int(self.gross[i]),
+            'net': int(self.net[i]),
+        }
+
+    def rows(self):
+        return [self.row(i) for i in range(len(self))]
+
+
+def calculate(batch, statutory=None):
+    # statutory: app.statutory.StatutoryRules for the period, replacing the
+    # elements' flat tax and SSNIT amounts with bracket-computed ones.
+    if statutory:
+        statutory.apply(batch)
+    return PayrollResult(batch)
+
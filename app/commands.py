@@ -0,0 +1,366 @@
+import os
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+import click
+from flask.cli import AppGroup
+
+from app import db
+from app.analytics import rebuild
+from app.archive import archive_closed_years, archive_year, manifest, restore_year
+from app.assignments import KINDS as ASSIGNMENT_KINDS, arrears, assign, correct_periods, history
+from app.employee_import import error_report_csv, import_employees, read_rows
+from app.exports import EXPORTS, FORMATS, export_filename, stream_export
+from app.jobs import period_lock
+from app.models import Department, PayrollRun, StatutoryTable
+from app.money import Money, format_minor
+from app.payroll_preview import DIFF_PAGE_SIZE, commit_preview, diff_page, save_preview
+from app.payroll_runs import DEFAULT_RANGE_SHARDS, process_run, resume_run, start_run
+from app.payslip_cache import prewarm_period
+from app.payslips import stream_period_zip
+from app.periods import MONTHS, period_key, period_label
+from app.reconciliation import rebuild_digests, verify
+from app.seed import seed
+from app.statutory import KINDS, PRESETS, add_table, effective_table
+
+payroll_cli = AppGroup('payroll', help='Payroll run commands.')
+
+
+# ------------------------- PAYROLL RUNS --------------------------------
+
+@contextmanager
+def _period_writer(month, year):
+    # The same per-period lock background payroll jobs hold, so a CLI run
+    # and a job never write one period at once.
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(period_lock(month, year))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        yield
+
+
+@payroll_cli.command('run')
+@click.option('--month', required=True, type=click.Choice(MONTHS))
+@click.option('--year', required=True, type=int)
+@click.option('--shard-by', type=click.Choice(['department', 'range']), default='department')
+@click.option('--shards', type=int, default=DEFAULT_RANGE_SHARDS, help='Shard count for --shard-by range.')
+@click.option('--workers', type=int, default=None, help='Worker processes (defaults to CPU count).')
+def run_command(month, year, shard_by, shards, workers):
+    """Generate payroll for a period as a sharded, resumable run."""
+    with _period_writer(month, year):
+        run = start_run(month, year, shard_by=shard_by, shard_count=shards)
+        click.echo(f"Run {run.run_id}: {len(run.shards)} shards")
+        run = process_run(run.run_id, workers=workers)
+    click.echo(f"Run {run.run_id} {run.status}: {run.rows_written} payroll rows")
+    if run.error:
+        raise click.ClickException(run.error)
+
+
+@payroll_cli.command('resume')
+@click.argument('run_id', type=int)
+@click.option('--workers', type=int, default=None)
+def resume_command(run_id, workers):
+    """Resume an interrupted run from its last completed shard."""
+    run = db.session.get(PayrollRun, run_id)
+    if run is None:
+        raise click.ClickException(f"No payroll run {run_id}")
+    with _period_writer(run.month, run.year):
+        run = resume_run(run_id, workers=workers)
+    click.echo(f"Run {run.run_id} {run.status}: {run.rows_written} payroll rows")
+    if run.error:
+        raise click.ClickException(run.error)
+
+
+@payroll_cli.command('preview')
+@click.option('--month', required=True, type=click.Choice(MONTHS))
+@click.option('--year', required=True, type=int)
+@click.option('--threshold', default=None, help='Net pay change worth listing, in GH₵ (default PAYROLL_DIFF_THRESHOLD).')
+@click.option('--limit', type=int, default=DIFF_PAGE_SIZE, help='Changes to list.')
+@click.option('--commit', 'commit_', is_flag=True, help='Write the previewed run.')
+def preview_command(month, year, threshold, limit, commit_):
+    """Compute a period without writing it and show what changed since the previous one."""
+    try:
+        threshold = Money.from_cedis(threshold) if threshold else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--threshold')
+    with tempfile.TemporaryDirectory() as directory:
+        preview = save_preview(os.path.join(directory, 'preview.npz'), month, year, threshold=threshold)
+        summary = preview.summary
+        click.echo(f"{preview.label}: {summary['employees']} employees, net {format_minor(summary['net_total'])} "
+                   f"({preview.previous_label}: {format_minor(summary['previous_net_total'])})")
+        click.echo(f"{summary['new']} new, {summary['left']} left, {summary['changed']} with net pay moved by "
+                   f"more than {format_minor(preview.threshold)}")
+        rows, _ = diff_page(preview, limit=limit)
+        for row, _ in rows:
+            previous = '-' if row.previous_net is None else format_minor(row.previous_net)
+            net = '-' if row.net is None else format_minor(row.net)
+            click.echo(f"{row.employee_id:>8}  {row.change:<8} {previous:>12} -> {net:>12}  {format_minor(row.delta):>12}")
+        if commit_:
+            with _period_writer(month, year):
+                try:
+                    click.echo(f"Wrote {commit_preview(preview)} payroll rows for {preview.label}")
+                except ValueError as e:
+                    raise click.ClickException(str(e))
+
+
+# ------------------------- PAYSLIPS ------------------------------------
+
+@payroll_cli.command('payslips')
+@click.option('--month', required=True, type=click.Choice(MONTHS))
+@click.option('--year', required=True, type=int)
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None)
+@click.option('--workers', type=int, default=None, help='Render processes (defaults to CPU count).')
+def payslips_command(month, year, output, workers):
+    """Render every payslip for a period into a ZIP archive."""
+    output = output or f"payslips_{month}_{year}.zip"
+    size = 0
+    with open(output, 'wb') as archive:
+        for chunk in stream_period_zip(period_key(month, year), workers=workers):
+            archive.write(chunk)
+            size += len(chunk)
+    click.echo(f"Wrote {output} ({size:,} bytes)")
+
+
+@payroll_cli.command('warm-payslips')
+@click.option('--month', required=True, type=click.Choice(MONTHS))
+@click.option('--year', required=True, type=int)
+@click.option('--workers', type=int, default=None)
+def warm_payslips_command(month, year, workers):
+    """Pre-render a period's payslips into the PDF cache."""
+    count = prewarm_period(period_key(month, year), workers=workers)
+    click.echo(f"Cached {count} payslips for {month} {year}")
+
+
+# ------------------------- EXPORTS -------------------------------------
+
+@payroll_cli.command('export')
+@click.option('--month', required=True, type=click.Choice(MONTHS))
+@click.option('--year', required=True, type=int)
+@click.option('--kind', type=click.Choice(list(EXPORTS)), default='register')
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None)
+def export_command(month, year, kind, fmt, output):
+    """Export a period's payroll register or bank-transfer file."""
+    output = output or export_filename(kind, fmt, month, year)
+    _, chunks = stream_export(kind, fmt, period_key(month, year))
+    with open(output, 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    click.echo(f"Wrote {output}")
+
+
+# ------------------------- EMPLOYEE IMPORT -----------------------------
+
+@payroll_cli.command('import-employees')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write rejected rows to this CSV file.')
+def import_employees_command(path, errors_path):
+    """Bulk-import employees from a CSV or XLSX file."""
+    with open(path, 'rb') as handle:
+        result = import_employees(read_rows(handle, path))
+    click.echo(f"Imported {result.inserted} employees, rejected {result.rejected} rows")
+    if result.errors and errors_path:
+        with open(errors_path, 'w', newline='') as handle:
+            handle.write(error_report_csv(result))
+        click.echo(f"Rejected rows written to {errors_path}")
+
+
+# ------------------------- ANALYTICS -----------------------------------
+
+@payroll_cli.command('rollups')
+@click.option('--year', type=int, default=None, help='Only rebuild this year.')
+def rollups_command(year):
+    """Rebuild the analytics rollup table from payroll."""
+    keys = rebuild(year)
+    click.echo(f"Refreshed rollups for {len(keys)} periods")
+
+
+# ------------------------- STATUTORY TABLES ----------------------------
+
+@payroll_cli.command('statutory-add')
+@click.option('--kind', type=click.Choice(KINDS), default=None)
+@click.option('--effective-from', required=True, type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--band', 'bands', multiple=True, metavar='LOWER:RATE',
+              help='Monthly lower bound and percentage rate, e.g. --band 0:0 --band 490:5.')
+@click.option('--preset', type=click.Choice(list(PRESETS)), default=None, help='Use a built-in schedule.')
+@click.option('--description', default=None)
+def statutory_add_command(kind, effective_from, bands, preset, description):
+    """Add a new version of the PAYE or SSNIT schedule."""
+    if preset:
+        kind, brackets = PRESETS[preset]
+        description = description or preset
+    elif kind and bands:
+        brackets = [band.split(':', 1) for band in bands]
+    else:
+        raise click.UsageError('Give --kind and at least one --band, or a --preset.')
+
+    try:
+        table = add_table(kind, effective_from.date(), brackets, description)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--band')
+    click.echo(f"{table.kind} version {table.version} effective {table.effective_from}")
+
+
+@payroll_cli.command('statutory-list')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Only show the tables in effect on this date.')
+def statutory_list_command(as_of):
+    """Show statutory schedules and their brackets."""
+    if as_of:
+        ids = [t.table_id for t in (effective_table(kind, as_of.date()) for kind in KINDS) if t]
+        tables = StatutoryTable.query.filter(StatutoryTable.table_id.in_(ids)).all()
+    else:
+        tables = StatutoryTable.query.order_by(StatutoryTable.kind, StatutoryTable.version).all()
+    for table in tables:
+        click.echo(f"{table.kind} v{table.version} from {table.effective_from} {table.description or ''}")
+        for bracket in table.brackets:
+            click.echo(f"    from {format_minor(bracket.lower_bound):>12}  {bracket.rate}%")
+
+
+# ------------------------- ASSIGNMENTS ---------------------------------
+
+@payroll_cli.command('assign')
+@click.argument('employee_id', type=int)
+@click.option('--effective-from', required=True, type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--grade', 'grade_id', type=int, default=None)
+@click.option('--element', 'element_id', type=int, default=None)
+@click.option('--apply', 'apply_', is_flag=True, help='Regenerate the affected periods with the new amounts.')
+def assign_command(employee_id, effective_from, grade_id, element_id, apply_):
+    """Record a grade or element change, possibly back-dated, and show the arrears."""
+    if grade_id is None and element_id is None:
+        raise click.UsageError('Give --grade and/or --element.')
+    try:
+        keys = assign(employee_id, effective_from.date(), grade_id=grade_id, element_id=element_id)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    db.session.commit()
+
+    owed = arrears([employee_id], keys)
+    for row in owed:
+        click.echo(f"{period_label(row.period_key):<16} grade {row.paid_grade_id}->{row.grade_id}  "
+                   f"gross {format_minor(row.gross):>12}  net {format_minor(row.net):>12}")
+    click.echo(f"{len(keys)} generated periods affected, net arrears {format_minor(sum(r.net for r in owed))}")
+    if apply_ and keys:
+        try:
+            click.echo(f"Corrected {correct_periods([employee_id], keys)} payroll rows")
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+
+@payroll_cli.command('assignments')
+@click.argument('employee_id', type=int)
+def assignments_command(employee_id):
+    """Show an employee's grade and element history."""
+    for kind, rows in history(employee_id).items():
+        column = ASSIGNMENT_KINDS[kind][1]
+        for row in rows:
+            click.echo(f"{kind:<8} {getattr(row, column):>6}  {row.effective_from} to {row.effective_to or 'open'}")
+
+
+# ------------------------- ARCHIVE -------------------------------------
+
+@payroll_cli.command('archive')
+@click.option('--year', type=int, default=None, help='Archive this closed year only.')
+@click.option('--keep-years', type=int, default=None,
+              help='Years kept in the payroll table, the current one included (default ARCHIVE_KEEP_YEARS).')
+def archive_command(year, keep_years):
+    """Move closed years of payroll into compressed archive files.
+
+    Without --year every year older than the kept ones is archived; run it
+    from cron to keep the payroll table bounded.
+    """
+    try:
+        if year is not None:
+            rows, deleted = archive_year(year)
+            click.echo(f"Archived {year}: {rows:,} rows, {deleted:,} removed from the payroll table")
+            return
+        years = archive_closed_years(keep_years)
+    except (ValueError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Archived {', '.join(map(str, years))}" if years else 'Nothing to archive')
+
+
+@payroll_cli.command('archive-restore')
+@click.argument('year', type=int)
+def archive_restore_command(year):
+    """Move an archived year back into the payroll table."""
+    try:
+        rows = restore_year(year)
+    except (ValueError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored {year}: {rows:,} rows")
+
+
+@payroll_cli.command('archive-list')
+def archive_list_command():
+    """Show archived years and periods."""
+    for year, entry in sorted(manifest()['years'].items()):
+        click.echo(f"{year}: {entry['rows']:,} rows, archived {entry['archived_at']}")
+        for key, period in sorted(entry['periods'].items()):
+            click.echo(f"    {period_label(key)}: {period['rows']:,} rows, net {format_minor(period['net_pay'])}")
+
+
+# ------------------------- RECONCILIATION ------------------------------
+
+@payroll_cli.command('digests')
+@click.option('--year', type=int, default=None, help='Only record this year.')
+def digests_command(year):
+    """Record integrity digests of payroll as it stands now.
+
+    Run once for history written before digests were kept, or to accept
+    differences that verify reported.
+    """
+    keys = rebuild_digests(year)
+    click.echo(f"Recorded digests for {len(keys)} periods")
+
+
+@payroll_cli.command('verify')
+@click.option('--year', type=int, default=None, help='Only verify this year.')
+@click.option('--drill-down/--no-drill-down', default=True,
+              help='Recompute the rows of mismatching buckets from their inputs.')
+def verify_command(year, drill_down):
+    """Check stored payroll against its integrity digests."""
+    started = time.perf_counter()
+    checked, problems = verify(year, drill_down)
+    departments = dict(db.session.execute(db.select(Department.department_id, Department.department_name)).all())
+    for check in problems:
+        department = departments.get(check.department_id, 'Unassigned')
+        click.echo(f"{period_label(check.period_key)} / {department}: {check.status} "
+                   f"({check.recorded_rows:,} rows recorded, {check.rows:,} stored)")
+        if drill_down and check.status == 'mismatch' and not check.drift:
+            click.echo("    every row matches its inputs")
+        for drift in check.drift:
+            if drift.fields is None:
+                click.echo(f"    employee {drift.employee_id}: no grade or element for the period")
+                continue
+            fields = ', '.join(
+                f"{name} {_drift_value(name, stored)} (expected {_drift_value(name, expected)})"
+                for name, (stored, expected) in drift.fields.items()
+            )
+            click.echo(f"    employee {drift.employee_id}: {fields}")
+    click.echo(f"Checked {checked:,} buckets in {time.perf_counter() - started:.1f}s")
+    if problems:
+        raise click.ClickException(f"{len(problems)} buckets do not match their digests")
+
+
+def _drift_value(name, value):
+    return value if name in ('grade_id', 'element_id') else format_minor(value)
+
+
+# ------------------------- SYNTHETIC DATA ------------------------------
+
+@payroll_cli.command('seed')
+@click.option('--employees', type=int, default=1000)
+@click.option('--departments', type=int, default=20)
+@click.option('--grades', type=int, default=15)
+@click.option('--jobs', type=int, default=40)
+@click.option('--elements', type=int, default=25)
+@click.option('--history-months', type=int, default=12, help='Payroll periods to generate.')
+@click.option('--random-seed', type=int, default=42)
+def seed_command(**volumes):
+    """Fill the configured database with synthetic employees and payroll history."""
+    counts = seed(**volumes)
+    click.echo(', '.join(f"{name}: {count:,}" for name, count in counts.items()))
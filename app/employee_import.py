@@ -0,0 +1,234 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from xml.etree.ElementTree import iterparse
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.assignments import initial_assignments
+from app.models import ElementAssignment, Employee, GradeAssignment
+from app.refdata import refdata
+
+
+BATCH_SIZE = 1000
+
+IMPORT_COLUMNS = (
+    'employee_id',
+    'first_name',
+    'surname',
+    'date_of_birth',
+    'grade_id',
+    'department_id',
+    'job_id',
+    'element_id',
+    'bank_name',
+    'bank_account_number',
+)
+
+# column -> reference table its id must exist in
+FOREIGN_KEYS = {
+    'grade_id': 'grades',
+    'department_id': 'departments',
+    'job_id': 'jobs',
+    'element_id': 'elements',
+}
+
+
+# ------------------------- READERS -------------------------------------
+
+def read_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [h.strip().lower() for h in next(reader, [])]
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+_SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_REF = re.compile(r'([A-Z]+)')
+_EXCEL_EPOCH = date(1899, 12, 30)
+
+
+def _column_index(ref):
+    index = 0
+    for letter in _CELL_REF.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as handle:
+        for _, elem in iterparse(handle):
+            if elem.tag == _SHEET_NS + 'si':
+                strings.append(''.join(t.text or '' for t in elem.iter(_SHEET_NS + 't')))
+                elem.clear()
+    return strings
+
+
+def read_xlsx(stream):
+    # Row-at-a-time parse of the first worksheet; only shared strings are
+    # held in memory.
+    with zipfile.ZipFile(stream) as archive:
+        strings = _shared_strings(archive)
+        sheet = sorted(n for n in archive.namelist() if n.startswith('xl/worksheets/sheet'))[0]
+        header = None
+        with archive.open(sheet) as handle:
+            for _, elem in iterparse(handle):
+                if elem.tag != _SHEET_NS + 'row':
+                    continue
+                values = {}
+                index = -1
+                for cell in elem.iter(_SHEET_NS + 'c'):
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(_SHEET_NS + 't'))
+                    else:
+                        v = cell.find(_SHEET_NS + 'v')
+                        value = v.text if v is not None else ''
+                        if kind == 's' and value:
+                            value = strings[int(value)]
+                    # The reference is optional; without one a cell follows
+                    # the previous cell in its row.
+                    ref = cell.get('r')
+                    index = _column_index(ref) if ref else index + 1
+                    values[index] = value
+                elem.clear()
+
+                row = [values.get(i, '') for i in range(max(values, default=-1) + 1)]
+                if header is None:
+                    header = [str(h).strip().lower() for h in row]
+                else:
+                    yield dict(zip(header, row))
+
+
+def read_rows(stream, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(stream)
+    return read_csv(stream)
+
+
+# ------------------------- VALIDATION ----------------------------------
+
+def _parse_date(value):
+    value = str(value).strip()
+    if re.fullmatch(r'\d+(\.0+)?', value):
+        # Excel stores dates as serial day numbers.
+        return _EXCEL_EPOCH + timedelta(days=int(float(value)))
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _parse_int(value):
+    value = str(value).strip()
+    if value.endswith('.0'):
+        value = value[:-2]
+    return int(value)
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []  # (line, employee_id, message)
+
+    @property
+    def rejected(self):
+        return len(self.errors)
+
+
+def validate_row(raw, known_ids, seen_ids):
+    """Return (employee dict, []) or (None, [error messages])."""
+    errors = []
+    row = {}
+    missing = [c for c in IMPORT_COLUMNS if not str(raw.get(c) or '').strip()]
+    if missing:
+        return None, [f"missing {', '.join(missing)}"]
+
+    for column in ('employee_id', *FOREIGN_KEYS):
+        try:
+            row[column] = _parse_int(raw[column])
+        except ValueError:
+            errors.append(f"{column} is not a number")
+    try:
+        row['date_of_birth'] = _parse_date(raw['date_of_birth'])
+    except ValueError:
+        errors.append('date_of_birth must be YYYY-MM-DD')
+    for column in ('first_name', 'surname', 'bank_name', 'bank_account_number'):
+        row[column] = str(raw[column]).strip()
+
+    for column, table in FOREIGN_KEYS.items():
+        if column in row and row[column] not in known_ids[table]:
+            errors.append(f"unknown {column} {row[column]}")
+    if 'employee_id' in row and row['employee_id'] in seen_ids:
+        errors.append(f"employee_id {row['employee_id']} already exists")
+
+    return (None, errors) if errors else (row, [])
+
+
+# ------------------------- IMPORT --------------------------------------
+
+def import_employees(rows, batch_size=BATCH_SIZE):
+    # Foreign keys and existing ids are checked against in-memory sets; valid
+    # rows go in as executemany INSERTs, one transaction per batch. The sets
+    # are read fresh, so an id another worker just removed is not accepted
+    # from a stale cache.
+    known_ids = {table: set(refdata.by_id(table, fresh=True)) for table in FOREIGN_KEYS.values()}
+    seen_ids = set(db.session.execute(select(Employee.employee_id)).scalars())
+    result = ImportResult()
+    batch = []
+
+    for line, raw in enumerate(rows, 2):
+        row, errors = validate_row(raw, known_ids, seen_ids)
+        if errors:
+            result.errors.append((line, raw.get('employee_id', ''), '; '.join(errors)))
+            continue
+        seen_ids.add(row['employee_id'])
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            _flush(batch, result)
+            batch = []
+
+    if batch:
+        _flush(batch, result)
+    return result
+
+
+def _flush(batch, result):
+    try:
+        _insert([row for _, row in batch])
+        result.inserted += len(batch)
+        return
+    except IntegrityError:
+        db.session.rollback()
+
+    # Something changed since validation (an employee added or a reference
+    # row removed concurrently): retry the batch a row at a time so only the
+    # conflicting rows are rejected.
+    for line, row in batch:
+        try:
+            _insert([row])
+            result.inserted += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            result.errors.append((line, row['employee_id'], f"rejected by the database: {e.orig}"))
+
+
+def _insert(rows):
+    db.session.execute(insert(Employee), rows)
+    assignments = initial_assignments(rows)
+    db.session.execute(insert(GradeAssignment), assignments['grade'])
+    db.session.execute(insert(ElementAssignment), assignments['element'])
+    db.session.commit()
+
+
+def error_report_csv(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['line', 'employee_id', 'error'])
+    writer.writerows(result.errors)
+    return buffer.getvalue()
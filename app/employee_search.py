@@ -0,0 +1,94 @@
+from sqlalchemy import and_, or_, select, text
+
+from app import db
+from app.models import Department, Employee
+from app.refdata import refdata
+
+
+PAGE_SIZE = 50
+MAX_SEARCH_RESULTS = 50
+FILTER_FIELDS = ('department_id', 'grade_id', 'job_id')
+# Characters with a meaning in MySQL boolean-mode full-text queries.
+BOOLEAN_OPERATORS = '+-<>()~*"@'
+# InnoDB ignores shorter words (innodb_ft_min_token_size).
+FULLTEXT_MIN_WORD = 3
+
+
+# ------------------------- FILTERS -------------------------------------
+
+def parse_search(args):
+    search = {'q': (args.get('q') or '').strip()[:100]}
+    for field in FILTER_FIELDS:
+        value = (args.get(field) or '').strip()
+        if value.isdigit():
+            search[field] = int(value)
+    return search
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _prefix(column, term):
+    # A left-anchored LIKE is a range scan on the name indexes.
+    return column.like(f"{_escape_like(term)}%", escape='\\')
+
+
+def _name_condition(q, dialect):
+    words = [w for w in (w.strip(BOOLEAN_OPERATORS) for w in q.split()) if w] or [q]
+    if dialect == 'mysql' and len(words) > 1 and min(map(len, words)) >= FULLTEXT_MIN_WORD:
+        # "kwame men": every word must prefix-match first_name or surname.
+        terms = ' '.join(f"+{w}*" for w in words)
+        return text("MATCH (employee.first_name, employee.surname) AGAINST (:terms IN BOOLEAN MODE)").bindparams(terms=terms)
+    if len(words) > 1:
+        first, last = words[0], words[-1]
+        return or_(
+            and_(_prefix(Employee.first_name, first), _prefix(Employee.surname, last)),
+            and_(_prefix(Employee.surname, first), _prefix(Employee.first_name, last)),
+        )
+    return or_(_prefix(Employee.surname, q), _prefix(Employee.first_name, q))
+
+
+def _apply_search(stmt, search):
+    q = search.get('q')
+    if q:
+        if q.isdigit():
+            stmt = stmt.where(Employee.employee_id == int(q))
+        else:
+            stmt = stmt.where(_name_condition(q, db.session.get_bind().dialect.name))
+    for field in FILTER_FIELDS:
+        if field in search:
+            stmt = stmt.where(getattr(Employee, field) == search[field])
+    return stmt
+
+
+# ------------------------- QUERIES -------------------------------------
+
+def search_employees(search, after=None, limit=PAGE_SIZE):
+    """One page of (employee, department_name) in employee_id order.
+
+    Keyset paginated on employee_id; returns (rows, next_cursor).
+    """
+    stmt = (
+        select(Employee, Department.department_name)
+        .outerjoin(Department, Employee.department_id == Department.department_id)
+    )
+    stmt = _apply_search(stmt, search)
+    if after is not None and str(after).isdigit():
+        stmt = stmt.where(Employee.employee_id > int(after))
+
+    rows = db.session.execute(stmt.order_by(Employee.employee_id).limit(limit + 1)).all()
+    next_cursor = rows[limit - 1][0].employee_id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def search_result(employee, department_name):
+    grade = refdata.by_id('grades').get(employee.grade_id)
+    job = refdata.by_id('jobs').get(employee.job_id)
+    return {
+        'employee_id': employee.employee_id,
+        'name': f"{employee.first_name} {employee.surname}",
+        'department': department_name,
+        'grade': grade.grade_name if grade else None,
+        'job': job.job_name if job else None,
+    }
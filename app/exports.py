@@ -0,0 +1,242 @@
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+from app import db
+from app.archive import archived_rows, attach_employees, is_archived, ytd_arrays
+from app.models import Department, Employee, Payroll
+from app.money import Money, to_minor
+from app.refdata import refdata
+from app.streaming import counted, stream_zip
+from app.ytd import YTD_FIELDS, YTD_LABELS, ytd_columns
+
+
+YIELD_PER = 1000
+FLUSH_ROWS = 500
+
+# (header, column, is_amount)
+REGISTER_COLUMNS = (
+    ('Employee ID', Payroll.employee_id, False),
+    ('First Name', Employee.first_name, False),
+    ('Surname', Employee.surname, False),
+    ('Department', Department.department_name, False),
+    ('Month', Payroll.month, False),
+    ('Year', Payroll.year, False),
+    ('Basic Salary', Payroll.basic_salary, True),
+    ('Transport Allowance', Payroll.transport_allowance, True),
+    ('Utility Allowance', Payroll.utility_allowance, True),
+    ('Extra Duty Allowance', Payroll.extra_duty_allowance, True),
+    ('Other Allowance', Payroll.other_allowance, True),
+    ('Overtime', Payroll.overtime, True),
+    ('Total Allowances', Payroll.total_allowances, True),
+    ('Gross Salary', Payroll.gross_salary, True),
+    ('Social Security', Payroll.social_security_deduction, True),
+    ('Income Tax', Payroll.tax_deduction, True),
+    ('Loan 1', Payroll.loan1_deduction, True),
+    ('Loan 2', Payroll.loan2_deduction, True),
+    ('Other Deductions', Payroll.other_deductions, True),
+    ('Total Deductions', Payroll.total_deductions, True),
+    ('Net Pay', Payroll.net_pay, True),
+)
+
+BANK_COLUMNS = (
+    ('Employee ID', Payroll.employee_id, False),
+    ('First Name', Employee.first_name, False),
+    ('Surname', Employee.surname, False),
+    ('Bank Name', Employee.bank_name, False),
+    ('Account Number', Employee.bank_account_number, False),
+    ('Net Pay', Payroll.net_pay, True),
+)
+
+EXPORTS = {
+    'register': REGISTER_COLUMNS,
+    'bank': BANK_COLUMNS,
+}
+
+# Exports that end with the employee's YTD totals through the period.
+YTD_EXPORTS = ('register',)
+
+
+# ------------------------- ROWS ----------------------------------------
+
+def export_rows(kind, key):
+    # Plain column tuples from a server-side cursor (or the period's archive
+    # file): memory stays flat no matter how many rows the period has.
+    columns = EXPORTS[kind]
+    amounts = [i for i, (_, _, is_amount) in enumerate(columns) if is_amount]
+    if kind in YTD_EXPORTS:
+        amounts += range(len(columns), len(columns) + len(YTD_FIELDS))
+
+    rows = _archived_rows(kind, key) if is_archived(key) else _table_rows(kind, key)
+    for row in rows:
+        row = list(row)
+        for i in amounts:
+            row[i] = Money(to_minor(row[i]))
+        yield row
+
+
+def _table_rows(kind, key):
+    selected = [column for _, column, _ in EXPORTS[kind]]
+    join_ytd = None
+    if kind in YTD_EXPORTS:
+        join_ytd, ytd = ytd_columns(key)
+        selected += ytd
+
+    stmt = (
+        db.select(*selected)
+        .join(Employee, Payroll.employee_id == Employee.employee_id)
+        .outerjoin(Department, Employee.department_id == Department.department_id)
+    )
+    if join_ytd is not None:
+        stmt = join_ytd(stmt)
+    stmt = (
+        stmt.where(Payroll.period == key)
+        .order_by(Payroll.employee_id)
+        .execution_options(yield_per=YIELD_PER, stream_results=True)
+    )
+    return db.session.execute(stmt)
+
+
+def _archived_value(column, payslip, departments):
+    if column.class_ is Payroll:
+        return getattr(payslip, column.key)
+    if column.class_ is Employee:
+        return getattr(payslip.employee, column.key)
+    department = departments.get(payslip.employee.department_id)
+    return department.department_name if department else None
+
+
+def _archived_rows(kind, key):
+    # The same columns, read from the archive file and joined to employees
+    # a chunk at a time.
+    columns = [column for _, column, _ in EXPORTS[kind]]
+    totals = ytd_arrays(key, YTD_FIELDS) if kind in YTD_EXPORTS else None
+    departments = refdata.by_id('departments')
+    rows = archived_rows(key)
+    for start in range(0, len(rows), YIELD_PER):
+        for payslip in attach_employees(rows[start:start + YIELD_PER]):
+            row = [_archived_value(column, payslip, departments) for column in columns]
+            if totals is not None:
+                row += [Money(totals[f][payslip.row_index]) for f in YTD_FIELDS]
+            yield row
+
+
+def export_headers(kind):
+    headers = [header for header, _, _ in EXPORTS[kind]]
+    if kind in YTD_EXPORTS:
+        headers += [YTD_LABELS[f] for f in YTD_FIELDS]
+    return headers
+
+
+# ------------------------- CSV -----------------------------------------
+
+def stream_csv(headers, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# ------------------------- XLSX ----------------------------------------
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) or hasattr(value, 'as_tuple'):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _sheet_xml(headers, rows):
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>',
+        '<row>' + ''.join(_cell(h) for h in headers) + '</row>',
+    ]
+    for i, row in enumerate(rows, 1):
+        parts.append('<row>' + ''.join(_cell(v) for v in row) + '</row>')
+        if i % FLUSH_ROWS == 0:
+            yield ''.join(parts).encode()
+            parts = []
+    parts.append('</sheetData></worksheet>')
+    yield ''.join(parts).encode()
+
+
+def stream_xlsx(headers, rows, sheet_name='Payroll'):
+    # A minimal SpreadsheetML package written straight into a streamed ZIP;
+    # the worksheet part is produced row by row.
+    files = [
+        ('[Content_Types].xml', _CONTENT_TYPES.encode()),
+        ('_rels/.rels', _ROOT_RELS.encode()),
+        ('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)).encode()),
+        ('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.encode()),
+        ('xl/worksheets/sheet1.xml', _sheet_xml(headers, rows)),
+    ]
+    return stream_zip(files, compression=zipfile.ZIP_DEFLATED)
+
+
+# ------------------------- ENTRY POINT ---------------------------------
+
+FORMATS = {
+    'csv': ('text/csv', stream_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx),
+}
+
+
+def stream_export(kind, fmt, key, progress=None):
+    """Returns (mimetype, chunk generator) for a period export."""
+    mimetype, writer = FORMATS[fmt]
+    rows = export_rows(kind, key)
+    if progress is not None:
+        rows = counted(rows, progress, every=FLUSH_ROWS)
+    return mimetype, writer(export_headers(kind), rows)
+
+
+def export_filename(kind, fmt, month, year):
+    return f"payroll_{kind}_{month}_{year}.{fmt}"
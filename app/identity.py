@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import UserMixin
+
+from app import db
+from app.models import Employee, User
+
+
+# ------------------------- CACHED IDENTITY -----------------------------
+
+class EmployeeSummary:
+    """The employee fields the dashboard shows, detached from the session."""
+
+    __slots__ = ('employee_id', 'first_name', 'surname', 'bank_name', 'bank_account_number')
+
+    def __init__(self, employee):
+        for field in self.__slots__:
+            setattr(self, field, getattr(employee, field))
+
+
+class CachedUser(UserMixin):
+    """Stand-in for User as current_user; safe to share between requests."""
+
+    def __init__(self, user, employee=None):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.employee_id = user.employee_id
+        self.employee = EmployeeSummary(employee) if employee is not None else None
+
+
+# ------------------------- TTL / LRU CACHE -----------------------------
+
+class IdentityCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return value
+
+    def put(self, user_id, value):
+        ttl = current_app.config.get('IDENTITY_CACHE_TTL', 60)
+        size = current_app.config.get('IDENTITY_CACHE_SIZE', 1024)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate_employee(self, employee_id):
+        employee_id = int(employee_id)
+        with self._lock:
+            stale = [k for k, (_, v) in self._entries.items() if v.employee_id == employee_id]
+            for user_id in stale:
+                del self._entries[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def load_identity(user_id):
+    user_id = int(user_id)
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # User and linked employee in one round trip.
+    row = db.session.execute(
+        db.select(User, Employee)
+        .outerjoin(Employee, User.employee_id == Employee.employee_id)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+
+    identity = CachedUser(*row)
+    identity_cache.put(user_id, identity)
+    return identity
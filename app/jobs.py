@@ -0,0 +1,363 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.archive import archived_row_count, is_archived
+from app.exports import export_filename, stream_export
+from app.models import BackgroundJob, Payroll, PeriodLock
+from app.money import format_minor
+from app.payroll_engine import run_payroll
+from app.payroll_preview import Preview, commit_preview, save_preview
+from app.payroll_runs import process_run, resume_run, start_run
+from app.payslip_cache import prewarm_period
+from app.payslips import payslip_filename, period_payslips, render_many
+from app.periods import period_key, period_label
+from app.streaming import counted, stream_zip
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+# Kinds that write a payroll period; params carry its month and year, and
+# each holds the period's PeriodLock from submission until it finishes.
+PERIOD_WRITERS = ('payroll', 'payroll_resume', 'payroll_commit')
+ACTIVE_STATUSES = ('queued', 'running')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Jobs and CLI period locks held by this process, kept alive by _heartbeat.
+_live_jobs = set()
+_live_locks = {}  # period_key -> holder
+_heartbeat = None
+_live_lock = threading.Lock()
+
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# ------------------------- PROGRESS ------------------------------------
+
+class JobProgress:
+    """Progress reporter for a running job.
+
+    Writes go through their own short transaction on the engine, so they
+    never commit (or break a streaming cursor in) the handler's session.
+    Updates are throttled to one write per `interval` seconds.
+    """
+
+    def __init__(self, job_id, interval=1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self.done = 0
+        self.total = None
+        self._written_at = 0.0
+
+    def set_total(self, total):
+        self.total = total
+        self.flush()
+
+    def update(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        if time.monotonic() - self._written_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.job_id == self.job_id)
+                .values(progress_done=self.done, progress_total=self.total)
+            )
+        self._written_at = time.monotonic()
+
+
+# ------------------------- RUNNER --------------------------------------
+
+def _get_executor():
+    # Created lazily so each gunicorn worker gets its own pool after fork.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Jobs left behind by a process that died before this one started.
+            recover_orphaned_jobs()
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('JOB_WORKERS', 2),
+                thread_name_prefix='payroll-job',
+            )
+        return _executor
+
+
+def submit(kind, params, user_id=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    def stage():
+        job = BackgroundJob(kind=kind, params=json.dumps(params), created_by=user_id)
+        db.session.add(job)
+        if kind in PERIOD_WRITERS:
+            db.session.flush()
+            db.session.add(PeriodLock(period_key=period_key(params['month'], params['year']),
+                                      job_id=job.job_id, holder=f"job {job.job_id}"))
+        return job
+
+    if kind in PERIOD_WRITERS:
+        job = _commit_locked(period_key(params['month'], params['year']), stage)
+    else:
+        job = stage()
+        db.session.commit()
+    app = current_app._get_current_object()
+    _keep_alive(app, job_id=job.job_id)
+    _get_executor().submit(_run, app, job.job_id)
+    return job
+
+
+# ------------------------- PERIOD LOCKS --------------------------------
+
+def _commit_locked(key, stage):
+    """Commit what stage() adds, which includes key's PeriodLock row.
+
+    Raises ValueError if another writer holds the period. A lock whose
+    holder stopped heartbeating is reclaimed and the commit retried once.
+    """
+    for retry in (True, False):
+        result = stage()
+        try:
+            db.session.commit()
+            return result
+        except IntegrityError:
+            db.session.rollback()
+        if not (retry and recover_orphaned_jobs()):
+            break
+    held = db.session.get(PeriodLock, key)
+    raise ValueError(f"{period_label(key)} is already being written by {held.holder if held else 'another writer'}.")
+
+
+@contextmanager
+def period_lock(month, year):
+    """Hold a period's writer lock around a write run outside the job runner,
+    e.g. `flask payroll run`; raises ValueError if the period is busy."""
+    key = period_key(month, year)
+    holder = f"{socket.gethostname()} pid {os.getpid()}"
+    _commit_locked(key, lambda: db.session.add(PeriodLock(period_key=key, holder=holder)))
+    _keep_alive(current_app._get_current_object(), lock=(key, holder))
+    try:
+        yield
+    finally:
+        with _live_lock:
+            _live_locks.pop(key, None)
+        db.session.rollback()
+        db.session.execute(delete(PeriodLock).where(PeriodLock.period_key == key, PeriodLock.holder == holder))
+        db.session.commit()
+
+
+def recover_orphaned_jobs():
+    """Fail queued or running jobs, and drop period locks, whose heartbeat
+    has lapsed; returns how many were found.
+
+    Their process stopped (a restart, a crash) without finishing them, and
+    left alone they would keep their period locked for good.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get('JOB_HEARTBEAT_TIMEOUT', 120))
+    jobs = db.session.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.status.in_(ACTIVE_STATUSES),
+               func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at) < cutoff)
+        .values(status='failed', finished_at=now,
+                message='Interrupted: the process running this job stopped before it finished.')
+    ).rowcount
+    locks = db.session.execute(
+        delete(PeriodLock).where(or_(
+            PeriodLock.heartbeat_at < cutoff,
+            PeriodLock.job_id.in_(select(BackgroundJob.job_id).where(BackgroundJob.status.not_in(ACTIVE_STATUSES))),
+        ))
+    ).rowcount
+    db.session.commit()
+    if jobs or locks:
+        logger.warning("Recovered %d orphaned jobs and %d period locks", jobs, locks)
+    return jobs + locks
+
+
+def _keep_alive(app, job_id=None, lock=None):
+    global _heartbeat
+    with _live_lock:
+        if job_id is not None:
+            _live_jobs.add(job_id)
+        if lock is not None:
+            _live_locks[lock[0]] = lock[1]
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, args=(app,), name='payroll-job-heartbeat', daemon=True)
+            _heartbeat.start()
+
+
+def _beat(app):
+    interval = app.config.get('JOB_HEARTBEAT_TIMEOUT', 120) / 4
+    while True:
+        time.sleep(interval)
+        with _live_lock:
+            jobs, locks = list(_live_jobs), dict(_live_locks)
+        if not jobs and not locks:
+            continue
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                now = datetime.utcnow()
+                if jobs:
+                    conn.execute(update(BackgroundJob).where(BackgroundJob.job_id.in_(jobs)).values(heartbeat_at=now))
+                    conn.execute(update(PeriodLock).where(PeriodLock.job_id.in_(jobs)).values(heartbeat_at=now))
+                for key, holder in locks.items():
+                    conn.execute(update(PeriodLock)
+                                 .where(PeriodLock.period_key == key, PeriodLock.holder == holder)
+                                 .values(heartbeat_at=now))
+        except Exception:
+            logger.exception("Background job heartbeat failed")
+
+
+def _run(app, job_id):
+    with app.app_context():
+        job = db.session.get(BackgroundJob, job_id)
+        if job.status != 'queued':
+            # Given up on as orphaned while it waited; its lock may be gone.
+            with _live_lock:
+                _live_jobs.discard(job_id)
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        progress = JobProgress(job_id)
+        params = json.loads(job.params)
+        try:
+            message, output_path = JOB_HANDLERS[job.kind](job_id, params, progress)
+            status = 'completed'
+        except Exception as e:
+            logger.exception("Background job %s (%s) failed", job_id, job.kind)
+            db.session.rollback()
+            message, output_path, status = str(e), None, 'failed'
+
+        progress.flush()
+        job = db.session.get(BackgroundJob, job_id)
+        job.status = status
+        job.message = message
+        job.output_path = output_path
+        job.finished_at = datetime.utcnow()
+        # Released in the same transaction that finishes the job.
+        db.session.execute(delete(PeriodLock).where(PeriodLock.job_id == job_id))
+        db.session.commit()
+        with _live_lock:
+            _live_jobs.discard(job_id)
+
+
+def output_path_for(job_id, filename):
+    directory = current_app.config.get('JOB_OUTPUT_DIR') or os.path.join(current_app.instance_path, 'jobs')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{job_id}-{filename}")
+
+
+def _period_size(key):
+    if is_archived(key):
+        return archived_row_count(key)
+    return db.session.execute(select(func.count()).select_from(Payroll).where(Payroll.period == key)).scalar()
+
+
+# ------------------------- HANDLERS ------------------------------------
+
+@job_handler('payroll')
+def payroll_job(job_id, params, progress):
+    month, year, mode = params['month'], params['year'], params.get('mode', 'single')
+    if mode == 'single':
+        count = run_payroll(month, year, full=params.get('full', False))
+        progress.update(count, count)
+    else:
+        run = start_run(month, year, shard_by=mode)
+        run = process_run(run.run_id, progress=progress.update)
+        if run.status != 'completed':
+            raise RuntimeError(f"Payroll run {run.run_id} did not finish ({run.error}); resume it from Generate Payroll.")
+        count = run.rows_written
+
+    _prewarm_payslips(month, year)
+    return f"{count} employees computed for {month} {year}", None
+
+
+@job_handler('payroll_resume')
+def payroll_resume_job(job_id, params, progress):
+    run = resume_run(params['run_id'], progress=progress.update)
+    if run.status != 'completed':
+        raise RuntimeError(f"Payroll run {run.run_id} failed again ({run.error}).")
+    _prewarm_payslips(run.month, run.year)
+    return f"Run {run.run_id} completed: {run.rows_written} employees", None
+
+
+@job_handler('payroll_preview')
+def payroll_preview_job(job_id, params, progress):
+    month, year = params['month'], params['year']
+    path = output_path_for(job_id, f"preview_{month}_{year}.npz")
+    preview = save_preview(path, month, year, threshold=params.get('threshold'))
+    summary = preview.summary
+    progress.update(summary['employees'], summary['employees'])
+    return (
+        f"Preview of {preview.label}: {summary['employees']} employees, {summary['new']} new, "
+        f"{summary['left']} left, {summary['changed']} with net pay moved by more than "
+        f"{format_minor(preview.threshold)} since {preview.previous_label}",
+        path,
+    )
+
+
+@job_handler('payroll_commit')
+def payroll_commit_job(job_id, params, progress):
+    source = db.session.get(BackgroundJob, params['preview_job_id'])
+    preview = Preview(source.output_path)
+    count = commit_preview(preview)
+    progress.update(count, count)
+    _prewarm_payslips(preview.month, preview.year)
+    return f"{count} employees written for {preview.label} from preview job {source.job_id}", None
+
+
+def _prewarm_payslips(month, year):
+    if current_app.config.get('PAYSLIP_CACHE_PREWARM'):
+        prewarm_period(period_key(month, year))
+
+
+@job_handler('payslips_zip')
+def payslips_zip_job(job_id, params, progress):
+    month, year = params['month'], params['year']
+    key = period_key(month, year)
+    progress.set_total(_period_size(key))
+
+    path = output_path_for(job_id, f"payslips_{month}_{year}.zip")
+    rendered = counted(render_many(period_payslips(key)), progress.update)
+    files = ((payslip_filename(data, per_employee=True), pdf) for data, pdf in rendered)
+    with open(path, 'wb') as handle:
+        for chunk in stream_zip(files):
+            handle.write(chunk)
+    return f"{progress.done} payslips for {month} {year}", path
+
+
+@job_handler('export')
+def export_job(job_id, params, progress):
+    month, year, kind, fmt = params['month'], params['year'], params['kind'], params['format']
+    key = period_key(month, year)
+    progress.set_total(_period_size(key))
+
+    path = output_path_for(job_id, export_filename(kind, fmt, month, year))
+    _, chunks = stream_export(kind, fmt, key, progress=progress.update)
+    with open(path, 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+    return f"{progress.done} rows exported", path
@@ -0,0 +1,212 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Per-request totals; unset outside a request (CLI, background jobs).
+_current = ContextVar('request_stats', default=None)
+
+
+# ------------------------- HISTOGRAMS ----------------------------------
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            for bound, value in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+request_latency = Histogram(
+    'payroll_request_duration_seconds', 'Total request latency.',
+    ('endpoint', 'method'), LATENCY_BUCKETS,
+)
+request_sql_time = Histogram(
+    'payroll_request_sql_seconds', 'Time spent executing SQL per request.',
+    ('endpoint', 'method'), LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    'payroll_request_queries', 'SQL statements executed per request.',
+    ('endpoint', 'method'), QUERY_COUNT_BUCKETS,
+)
+slow_queries = Counter(
+    'payroll_slow_queries_total', 'Statements slower than SLOW_QUERY_SECONDS.', ('endpoint',),
+)
+
+METRICS = (request_latency, request_sql_time, request_queries, slow_queries)
+
+
+def render_metrics():
+    """All metrics of this process in Prometheus text format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.expose()
+    return '\n'.join(lines) + '\n'
+
+
+# ------------------------- SQL EVENTS ----------------------------------
+
+class RequestStats:
+    __slots__ = ('endpoint', 'started', 'queries', 'sql_seconds')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+def call_site():
+    # First frame in application code above SQLAlchemy. Only walked for
+    # slow statements, so the cost never lands on the fast path.
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename != __file__:
+            return f"{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context rather than the connection, so a
+    # statement that raises takes its start time with it instead of leaving
+    # it behind for the next one to pop.
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def _make_after_cursor_execute(slow_seconds):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+        if elapsed >= slow_seconds:
+            endpoint = stats.endpoint if stats is not None else 'background'
+            slow_queries.inc((endpoint,))
+            logger.warning(
+                "Slow query (%.3fs) at %s [%s]: %s",
+                elapsed, call_site(), endpoint, ' '.join(statement.split())[:500],
+            )
+    return after_cursor_execute
+
+
+# ------------------------- REQUEST HOOKS -------------------------------
+
+def _before_request():
+    _current.set(RequestStats(request.endpoint or 'unmatched'))
+
+
+def _make_after_request(query_warn):
+    def after_request(response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        labels = (stats.endpoint, request.method)
+        request_latency.observe(labels, elapsed)
+        request_sql_time.observe(labels, stats.sql_seconds)
+        request_queries.observe(labels, stats.queries)
+
+        if stats.queries > query_warn:
+            logger.warning("%s %s ran %d queries (%.3fs SQL)", request.method, request.path, stats.queries, stats.sql_seconds)
+        # Visible in the browser's network panel next to each response.
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f'total;dur={elapsed * 1000:.1f}'
+        )
+        return response
+    return after_request
+
+
+def _teardown_request(exc):
+    _current.set(None)
+
+
+def init_metrics(app, db):
+    """Attach SQL and request instrumentation to app and its engines."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    after_cursor_execute = _make_after_cursor_execute(app.config.get('SLOW_QUERY_SECONDS', 0.5))
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    app.before_request(_before_request)
+    app.after_request(_make_after_request(app.config.get('REQUEST_QUERY_WARN', 50)))
+    app.teardown_request(_teardown_request)
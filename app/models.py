@@ -1,6 +1,9 @@
 from . import db
 from flask_login import UserMixin
 from sqlalchemy.ext.hybrid import hybrid_property
+from datetime import datetime
+from app import periods
+from app.money import MoneyType
 
 # ------------------------------
 # 1. User Table
@@ -18,17 +21,25 @@ class User(db.Model, UserMixin):
 # ------------------------------
 class Employee(db.Model):
     __tablename__ = 'employee'
+    __table_args__ = (
+        # Name-prefix search (app.employee_search); the full-text index is
+        # only created on MySQL, which serves multi-word searches from it.
+        db.Index('ix_employee_surname', 'surname', 'first_name'),
+        db.Index('ix_employee_first_name', 'first_name'),
+        db.Index('ix_employee_name_fulltext', 'first_name', 'surname', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     employee_id = db.Column(db.Integer, primary_key=True)
-    grade_id = db.Column(db.Integer, db.ForeignKey('grade.grade_id'))
-    department_id = db.Column(db.Integer, db.ForeignKey('department.department_id'))
-    job_id = db.Column(db.Integer, db.ForeignKey('job.job_id'))
-    element_id = db.Column(db.Integer, db.ForeignKey('element.element_id'))
+    grade_id = db.Column(db.Integer, db.ForeignKey('grade.grade_id'), index=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('department.department_id'), index=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.job_id'), index=True)
+    element_id = db.Column(db.Integer, db.ForeignKey('element.element_id'), index=True)
     first_name = db.Column(db.String(100))
     surname = db.Column(db.String(100))
     date_of_birth = db.Column(db.Date)
     bank_name = db.Column(db.String(100))
     bank_account_number = db.Column(db.String(100))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = db.relationship('User', backref='employee', uselist=False)
 
@@ -39,8 +50,9 @@ class Grade(db.Model):
     __tablename__ = 'grade'
 
     grade_id = db.Column(db.Integer, primary_key=True)
-    salary = db.Column(db.Numeric(10, 2))
+    salary = db.Column(MoneyType)
     grade_name = db.Column(db.String(50), nullable=False, unique=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     employees = db.relationship('Employee', backref='grade', lazy=True)
     payrolls = db.relationship('Payroll', back_populates='grade', lazy=True)
@@ -78,16 +90,17 @@ class Element(db.Model):
     __tablename__ = 'element'
 
     element_id = db.Column(db.Integer, primary_key=True)
-    transport_allowance = db.Column(db.Numeric(10, 2))
-    utility_allowance = db.Column(db.Numeric(10, 2))
-    extra_duty_allowance = db.Column(db.Numeric(10, 2))
-    other_allowance = db.Column(db.Numeric(10, 2))
-    overtime = db.Column(db.Numeric(10, 2))
-    social_security_deduction = db.Column(db.Numeric(10, 2))
-    tax_deduction = db.Column(db.Numeric(10, 2))
-    loan1_deduction = db.Column(db.Numeric(10, 2))
-    loan2_deduction = db.Column(db.Numeric(10, 2))
-    other_deductions = db.Column(db.Numeric(10, 2))
+    transport_allowance = db.Column(MoneyType)
+    utility_allowance = db.Column(MoneyType)
+    extra_duty_allowance = db.Column(MoneyType)
+    other_allowance = db.Column(MoneyType)
+    overtime = db.Column(MoneyType)
+    social_security_deduction = db.Column(MoneyType)
+    tax_deduction = db.Column(MoneyType)
+    loan1_deduction = db.Column(MoneyType)
+    loan2_deduction = db.Column(MoneyType)
+    other_deductions = db.Column(MoneyType)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     employees = db.relationship('Employee', backref='element', lazy=True)
     payrolls = db.relationship('Payroll', back_populates='element', lazy=True)
@@ -98,6 +111,13 @@ class Element(db.Model):
 # ------------------------------
 class Payroll(db.Model):
     __tablename__ = 'payroll'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'month', 'year', name='uq_payroll_employee_period'),
+        db.Index('ix_payroll_employee_period', 'employee_id', 'period_key'),
+        # Keyset pagination and server-side filters on the records view.
+        db.Index('ix_payroll_period', 'period_key', 'payroll_id'),
+        db.Index('ix_payroll_grade_period', 'grade_id', 'period_key', 'payroll_id'),
+    )
 
     payroll_id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), nullable=False)
@@ -105,15 +125,299 @@ class Payroll(db.Model):
     element_id = db.Column(db.Integer, db.ForeignKey('element.element_id'), nullable=False)
     month = db.Column(db.String(20), nullable=False)
     year = db.Column(db.Integer, nullable=False)
+    # Sortable yyyymm, kept in step with month/year.
+    period_key = db.Column(db.Integer, nullable=False)
+
     @hybrid_property
     def period(self):
+        return periods.period_key(self.month, self.year)
+
+    @period.expression
+    def period(cls):
+        return cls.period_key
+
+    @property
+    def period_label(self):
         return f"{self.month} {self.year}"
 
+    # Pay components as they stood when the row was generated, so history
+    # does not move when a grade or element is edited later.
+    basic_salary = db.Column(MoneyType, nullable=False, default=0)
+    transport_allowance = db.Column(MoneyType, nullable=False, default=0)
+    utility_allowance = db.Column(MoneyType, nullable=False, default=0)
+    extra_duty_allowance = db.Column(MoneyType, nullable=False, default=0)
+    other_allowance = db.Column(MoneyType, nullable=False, default=0)
+    overtime = db.Column(MoneyType, nullable=False, default=0)
+    social_security_deduction = db.Column(MoneyType, nullable=False, default=0)
+    tax_deduction = db.Column(MoneyType, nullable=False, default=0)
+    loan1_deduction = db.Column(MoneyType, nullable=False, default=0)
+    loan2_deduction = db.Column(MoneyType, nullable=False, default=0)
+    other_deductions = db.Column(MoneyType, nullable=False, default=0)
+    total_allowances = db.Column(MoneyType, nullable=False, default=0)
 
-    gross_salary = db.Column(db.Float, nullable=False)
-    total_deductions = db.Column(db.Float, nullable=False)
-    net_pay = db.Column(db.Float, nullable=False)
+    gross_salary = db.Column(MoneyType, nullable=False)
+    total_deductions = db.Column(MoneyType, nullable=False)
+    net_pay = db.Column(MoneyType, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     employee = db.relationship('Employee', backref='payrolls')
     grade = db.relationship('Grade', back_populates='payrolls')
-    element = db.relationship('Element', back_populates='payrolls')
\ No newline at end of file
+    element = db.relationship('Element', back_populates='payrolls')
+
+# ------------------------------
+# 8. Payroll Run Table
+# ------------------------------
+class PayrollRun(db.Model):
+    __tablename__ = 'payroll_run'
+
+    run_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(20), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    shard_by = db.Column(db.Enum('department', 'range'), nullable=False)
+    status = db.Column(db.Enum('running', 'completed', 'failed'), nullable=False, default='running')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    shards = db.relationship('PayrollRunShard', back_populates='run', lazy=True,
+                             order_by='PayrollRunShard.shard_id')
+
+    @property
+    def rows_written(self):
+        return sum(shard.rows_written for shard in self.shards)
+
+    @property
+    def error(self):
+        # The first failed shard's reason, if any.
+        return next((shard.error for shard in self.shards if shard.status == 'failed' and shard.error), None)
+
+
+# ------------------------------
+# 9. Payroll Run Checkpoint Table
+# ------------------------------
+class PayrollRunShard(db.Model):
+    __tablename__ = 'payroll_run_shard'
+
+    shard_id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('payroll_run.run_id'), nullable=False, index=True)
+    department_id = db.Column(db.Integer)
+    first_employee_id = db.Column(db.Integer)
+    last_employee_id = db.Column(db.Integer)
+    status = db.Column(db.Enum('pending', 'completed', 'failed'), nullable=False, default='pending')
+    # Checkpoint: highest employee_id committed so far in this shard.
+    checkpoint_employee_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    # Why the shard last failed, shown when resuming.
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    run = db.relationship('PayrollRun', back_populates='shards')
+
+
+# ------------------------------
+# 10. Background Job Table
+# ------------------------------
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_job'
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.Enum('queued', 'running', 'completed', 'failed'), nullable=False, default='queued')
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    message = db.Column(db.Text)
+    # Path of the produced file for export-type jobs.
+    output_path = db.Column(db.String(500))
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # Touched periodically by the process holding the job; a queued or
+    # running job whose heartbeat lapses is failed by app.jobs.
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        elapsed = None
+        if self.started_at:
+            elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress_done': self.progress_done,
+            'progress_total': self.progress_total,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'elapsed_seconds': elapsed,
+            'has_output': bool(self.output_path),
+        }
+
+
+# ------------------------------
+# 11. Payroll Rollup Table
+# ------------------------------
+class PayrollRollup(db.Model):
+    """Per-period totals by department and grade, rebuilt by app.analytics.
+
+    department_id is the employee's department when the period was last
+    generated; NULL for employees without one.
+    """
+    __tablename__ = 'payroll_rollup'
+    __table_args__ = (
+        db.Index('ix_payroll_rollup_period', 'period_key', 'department_id', 'grade_id'),
+    )
+
+    rollup_id = db.Column(db.Integer, primary_key=True)
+    period_key = db.Column(db.Integer, nullable=False)
+    department_id = db.Column(db.Integer)
+    grade_id = db.Column(db.Integer, nullable=False)
+    headcount = db.Column(db.Integer, nullable=False)
+    gross_salary = db.Column(MoneyType, nullable=False)
+    total_deductions = db.Column(MoneyType, nullable=False)
+    net_pay = db.Column(MoneyType, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# ------------------------------
+# 12. Year-to-date Accumulator Table
+# ------------------------------
+class PayrollYtd(db.Model):
+    """Per-employee totals for a calendar year, maintained by app.ytd.
+
+    Covers every generated period of the year up to through_period_key.
+    """
+    __tablename__ = 'payroll_ytd'
+
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    gross_salary = db.Column(MoneyType, nullable=False)
+    tax_deduction = db.Column(MoneyType, nullable=False)
+    social_security_deduction = db.Column(MoneyType, nullable=False)
+    net_pay = db.Column(MoneyType, nullable=False)
+    periods = db.Column(db.Integer, nullable=False)
+    through_period_key = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# ------------------------------
+# 13. Statutory Deduction Tables
+# ------------------------------
+class StatutoryTable(db.Model):
+    """A versioned, effective-dated PAYE or SSNIT schedule (see app.statutory).
+
+    Tables are never edited in place: a change is a new version with its
+    own effective_from date.
+    """
+    __tablename__ = 'statutory_table'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'version', name='uq_statutory_table_version'),
+    )
+
+    table_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.Enum('paye', 'ssnit'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    effective_from = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    brackets = db.relationship('StatutoryBracket', backref='table', lazy=True,
+                               order_by='StatutoryBracket.lower_bound', cascade='all, delete-orphan')
+
+
+class StatutoryBracket(db.Model):
+    __tablename__ = 'statutory_bracket'
+
+    bracket_id = db.Column(db.Integer, primary_key=True)
+    table_id = db.Column(db.Integer, db.ForeignKey('statutory_table.table_id'), nullable=False, index=True)
+    # Monthly amount from which `rate` (a percentage) applies.
+    lower_bound = db.Column(MoneyType, nullable=False)
+    rate = db.Column(db.Numeric(5, 2), nullable=False)
+
+
+# ------------------------------
+# 14. Compensation Assignment Tables
+# ------------------------------
+class EffectiveDated:
+    """An interval [effective_from, effective_to) of an employee's history.
+
+    effective_to is NULL for the open, current interval. Maintained by
+    app.assignments; employee.grade_id/element_id mirror today's values.
+    """
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.employee_id'), nullable=False)
+    effective_from = db.Column(db.Date, nullable=False)
+    effective_to = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @classmethod
+    def in_effect(cls, as_of):
+        return db.and_(
+            cls.effective_from <= as_of,
+            db.or_(cls.effective_to.is_(None), cls.effective_to > as_of),
+        )
+
+
+class GradeAssignment(EffectiveDated, db.Model):
+    __tablename__ = 'grade_assignment'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'effective_from', name='uq_grade_assignment_start'),
+        # As-of joins probe (employee_id, effective_from <= day) and read the
+        # rest from the index.
+        db.Index('ix_grade_assignment_as_of', 'employee_id', 'effective_from', 'effective_to', 'grade_id'),
+    )
+
+    assignment_id = db.Column(db.Integer, primary_key=True)
+    grade_id = db.Column(db.Integer, db.ForeignKey('grade.grade_id'), nullable=False)
+
+
+class ElementAssignment(EffectiveDated, db.Model):
+    __tablename__ = 'element_assignment'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'effective_from', name='uq_element_assignment_start'),
+        db.Index('ix_element_assignment_as_of', 'employee_id', 'effective_from', 'effective_to', 'element_id'),
+    )
+
+    assignment_id = db.Column(db.Integer, primary_key=True)
+    element_id = db.Column(db.Integer, db.ForeignKey('element.element_id'), nullable=False)
+
+
+# ------------------------------
+# 15. Payroll Integrity Digest Table
+# ------------------------------
+class PayrollDigest(db.Model):
+    """Row count and hash of one period's payroll rows per department,
+    recorded by app.reconciliation whenever the period is written.
+
+    department_id is as in PayrollRollup.
+    """
+    __tablename__ = 'payroll_digest'
+    __table_args__ = (
+        db.Index('ix_payroll_digest_period', 'period_key', 'department_id'),
+    )
+
+    digest_id = db.Column(db.Integer, primary_key=True)
+    period_key = db.Column(db.Integer, nullable=False)
+    department_id = db.Column(db.Integer)
+    row_count = db.Column(db.Integer, nullable=False)
+    digest = db.Column(db.BigInteger, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# ------------------------------
+# 16. Period Writer Lock Table
+# ------------------------------
+class PeriodLock(db.Model):
+    """Held by whatever is writing a payroll period, a background job or a
+    CLI run; see app.jobs.
+
+    The period is the primary key, so of two writers racing for it exactly
+    one insert succeeds.
+    """
+    __tablename__ = 'period_lock'
+
+    period_key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('background_job.job_id'))
+    holder = db.Column(db.String(120), nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,95 @@
+"""Money as integer minor units.
+
+Every amount is stored and summed as a whole number of pesewas (1/100
+GH₵), in SQL as BIGINT columns and in NumPy as int64 arrays, so totals
+are exact however many rows they cover.
+"""
+import numbers
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from sqlalchemy.types import BigInteger, TypeDecorator
+
+
+MINOR_UNITS = 100
+
+
+class Money(int):
+    """An amount in pesewas.
+
+    Arithmetic is plain int arithmetic. str() gives the amount in cedis
+    without separators ('1234.56'), as form fields and CSV cells expect;
+    use format_minor() or the `money` template filter for display.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_cedis(cls, value):
+        """An amount given in cedis (a form field, a CSV cell, a Decimal),
+        rounded half up to the pesewa. A blank or missing value is zero; anything
+        else that is not a finite number raises ValueError."""
+        try:
+            amount = Decimal(str(value or '').strip() or 0).scaleb(2)
+            return cls(amount.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Not an amount: {value!r}") from None
+
+    def __str__(self):
+        return format_minor(self, grouping=False)
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+
+def from_minor(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def to_minor(value):
+    """Pesewas from an amount already in pesewas.
+
+    Money, ints and NumPy integers pass through, as does a whole Decimal
+    (MySQL returns SUM() over BIGINT as one). Cedis are never inferred
+    from the type: convert them with Money.from_cedis(). Floats, strings
+    and fractional Decimals raise ValueError.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, Decimal) and value.is_finite() and value == value.to_integral_value():
+        return int(value)
+    raise ValueError(f"Not an amount in pesewas: {value!r}; use Money.from_cedis() for cedis")
+
+
+def format_minor(value, grouping=True):
+    value = to_minor(value)
+    sign = '-' if value < 0 else ''
+    whole, frac = divmod(abs(value), MINOR_UNITS)
+    return f"{sign}{whole:,}.{frac:02d}" if grouping else f"{sign}{whole}.{frac:02d}"
+
+
+class MoneyType(TypeDecorator):
+    """A BIGINT column of pesewas that reads back as Money.
+
+    Only whole pesewas bind: Money, ints and NumPy integers. Amounts in
+    cedis go through Money.from_cedis() first; a Decimal, float or string
+    raises ValueError instead of being stored in the wrong unit.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, numbers.Integral):
+            raise ValueError(f"Not an amount in pesewas: {value!r}; use Money.from_cedis() for cedis")
+        return int(value)
+
+    def process_result_value(self, value, dialect):
+        # SUM() over BIGINT comes back as DECIMAL on MySQL and PostgreSQL.
+        return None if value is None else Money(value)
+
+    def coerce_compared_value(self, op, value):
+        return self
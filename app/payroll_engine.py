@@ -0,0 +1,170 @@
+from datetime import datetime
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import db
+from app.analytics import refresh_period
+from app.archive import ensure_hot
+from app.calculator import (
+    ALLOWANCE_FIELDS,
+    DEDUCTION_FIELDS,
+    batch_select,
+    calculate,
+    load_batch,
+)
+from app.models import Element, ElementAssignment, Employee, Grade, GradeAssignment, Payroll
+from app.money import Money
+from app.periods import period_end, period_key
+from app.reconciliation import updating_digests
+from app.statutory import rules_for
+from app.ytd import refresh_ytd
+
+
+# Columns rewritten when a row for (employee_id, month, year) already exists.
+UPSERT_COLUMNS = (
+    'grade_id',
+    'element_id',
+    'basic_salary',
+    *ALLOWANCE_FIELDS,
+    *DEDUCTION_FIELDS,
+    'total_allowances',
+    'gross_salary',
+    'total_deductions',
+    'net_pay',
+    'generated_at',
+)
+# Employees per statement in the portable upsert.
+UPSERT_CHUNK = 1000
+
+
+# ------------------------- PAYROLL ROWS --------------------------------
+
+def payroll_rows(result, month, year, generated_at=None):
+    # generated_at should be taken before the inputs were read.
+    batch = result.batch
+    generated_at = generated_at or datetime.utcnow()
+    key = period_key(month, year)
+    rows = []
+    for i in range(len(result)):
+        row = {
+            'employee_id': int(batch.employee_id[i]),
+            'grade_id': int(batch.grade_id[i]),
+            'element_id': int(batch.element_id[i]),
+            'month': month,
+            'year': year,
+            'period_key': key,
+            'basic_salary': Money(batch.basic[i]),
+            'total_allowances': Money(result.total_allowances[i]),
+            'gross_salary': Money(result.gross[i]),
+            'total_deductions': Money(result.total_deductions[i]),
+            'net_pay': Money(result.net[i]),
+            'generated_at': generated_at,
+        }
+        row.update(zip(ALLOWANCE_FIELDS, map(Money, batch.allowances[i])))
+        row.update(zip(DEDUCTION_FIELDS, map(Money, batch.deductions[i])))
+        rows.append(row)
+    return rows
+
+
+def upsert_payroll(rows):
+    # INSERT, or UPDATE the existing row for the same employee and period;
+    # the periods' integrity digests move with the rows.
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        stmt = mysql.insert(Payroll)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in UPSERT_COLUMNS})
+    elif dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(Payroll)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['employee_id', 'month', 'year'],
+            set_={c: stmt.excluded[c] for c in UPSERT_COLUMNS},
+        )
+    else:
+        with updating_digests(rows):
+            _replace_payroll(rows)
+        return
+
+    with updating_digests(rows):
+        db.session.execute(stmt, rows)
+
+
+def _replace_payroll(rows):
+    # Portable upsert for dialects without one: delete the existing rows for
+    # the same employees and periods and insert them again under their old
+    # payroll_id, in the caller's transaction.
+    by_period = {}
+    for row in rows:
+        by_period.setdefault(row['period_key'], []).append(row)
+    for key, written in by_period.items():
+        for start in range(0, len(written), UPSERT_CHUNK):
+            chunk = written[start:start + UPSERT_CHUNK]
+            scope = and_(Payroll.period_key == key, Payroll.employee_id.in_([row['employee_id'] for row in chunk]))
+            existing = dict(db.session.execute(select(Payroll.employee_id, Payroll.payroll_id).where(scope)).all())
+            db.session.execute(delete(Payroll).where(scope))
+            db.session.execute(insert(Payroll), [
+                dict(row, payroll_id=existing[row['employee_id']]) if row['employee_id'] in existing else row
+                for row in chunk
+            ])
+
+
+# ------------------------- CHANGE TRACKING -----------------------------
+
+def changed_employees(month, year, statutory=None):
+    # Employees with no row for the period, whose grade or element for the
+    # period is not the one paid (e.g. a back-dated promotion), or whose
+    # employee, grade or element was modified after their row was
+    # generated, or every row if a statutory table in effect was added since.
+    key = period_key(month, year)
+    as_of = period_end(key)
+    existing = and_(
+        Payroll.employee_id == Employee.employee_id,
+        Payroll.period == key,
+    )
+    return (
+        select(Employee.employee_id)
+        .join(GradeAssignment, and_(
+            GradeAssignment.employee_id == Employee.employee_id, GradeAssignment.in_effect(as_of),
+        ))
+        .join(ElementAssignment, and_(
+            ElementAssignment.employee_id == Employee.employee_id, ElementAssignment.in_effect(as_of),
+        ))
+        .join(Grade, GradeAssignment.grade_id == Grade.grade_id)
+        .join(Element, ElementAssignment.element_id == Element.element_id)
+        .outerjoin(Payroll, existing)
+        .where(or_(
+            Payroll.payroll_id.is_(None),
+            Payroll.generated_at.is_(None),
+            Payroll.grade_id != GradeAssignment.grade_id,
+            Payroll.element_id != ElementAssignment.element_id,
+            Employee.updated_at > Payroll.generated_at,
+            Grade.updated_at > Payroll.generated_at,
+            Element.updated_at > Payroll.generated_at,
+            *([Payroll.generated_at < statutory.changed_at] if statutory and statutory.changed_at else []),
+        ))
+    )
+
+
+# ------------------------- PAYROLL RUN ---------------------------------
+
+def run_payroll(month, year, full=False):
+    # One SELECT over employee/assignments, one executemany upsert.
+    # Re-running a period only recomputes employees whose inputs changed.
+    ensure_hot(period_key(month, year))
+    started_at = datetime.utcnow()
+    statutory = rules_for(month, year)
+    stmt = batch_select(period_end(period_key(month, year)))
+    if not full:
+        stmt = stmt.where(Employee.employee_id.in_(changed_employees(month, year, statutory)))
+
+    result = calculate(load_batch(stmt), statutory)
+    rows = payroll_rows(result, month, year, started_at)
+    if rows:
+        upsert_payroll(rows)
+        refresh_ytd(year, [row['employee_id'] for row in rows])
+        refresh_period(period_key(month, year))
+    db.session.commit()
+    return len(rows)
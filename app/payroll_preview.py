@@ -0,0 +1,211 @@
+"""Dry-run payroll previews and their diff against the previous period.
+
+A preview computes a whole period exactly as a full run would, without
+writing to the payroll table, and stores the computed batch in an .npz file
+(the output of its background job). The diff report merge-joins the
+preview's rows, which are in employee_id order, with the previous period's
+rows streamed in the same order, so a page costs only the rows between its
+cursor and the next page's. Committing writes the stored rows unchanged.
+"""
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.analytics import refresh_period
+from app.archive import archived_row_count, ensure_hot, is_archived, period_column
+from app.calculator import PayrollBatch, PayrollResult, batch_select, calculate, load_batch
+from app.models import Employee, Payroll
+from app.money import Money
+from app.payroll_engine import payroll_rows, upsert_payroll
+from app.periods import MONTHS, period_end, period_key, period_label, previous_key
+from app.statutory import rules_for
+from app.ytd import refresh_ytd
+
+
+BATCH_FIELDS = ('employee_id', 'grade_id', 'element_id', 'basic', 'allowances', 'deductions')
+SUMMARY_FIELDS = ('employees', 'new', 'left', 'changed', 'previous_net_total', 'net_total')
+DIFF_PAGE_SIZE = 50
+YIELD_PER = 1000
+
+# change is 'new', 'left' or 'changed'; amounts are Money, None when absent.
+DiffRow = namedtuple('DiffRow', 'employee_id change previous_net net delta')
+
+
+# ------------------------- DIFF ----------------------------------------
+
+def _previous_rows(key, after=None):
+    # (employee_id, net_pay) of period key in employee_id order, streamed
+    # from a server-side cursor or read from the archive file.
+    if is_archived(key):
+        if not archived_row_count(key):
+            return
+        employees, nets = period_column(key, 'employee_id'), period_column(key, 'net_pay')
+        start = 0 if after is None else int(np.searchsorted(employees, after, side='right'))
+        for i in range(start, len(employees)):
+            yield int(employees[i]), int(nets[i])
+        return
+
+    stmt = (
+        select(Payroll.employee_id, Payroll.net_pay)
+        .where(Payroll.period == key)
+        .order_by(Payroll.employee_id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    if after is not None:
+        stmt = stmt.where(Payroll.employee_id > after)
+    result = db.session.execute(stmt)
+    try:
+        for employee_id, net in result:
+            yield employee_id, int(net)
+    finally:
+        result.close()
+
+
+def merge_diff(current, previous, threshold):
+    """Merge-join two (employee_id, net) streams, both in employee_id order.
+
+    Yields a DiffRow for everyone only in current (new), only in previous
+    (left), or in both with net pay moved by more than threshold pesewas.
+    """
+    current, previous = iter(current), iter(previous)
+    cur, prev = next(current, None), next(previous, None)
+    while cur is not None or prev is not None:
+        if prev is None or (cur is not None and cur[0] < prev[0]):
+            yield DiffRow(cur[0], 'new', None, Money(cur[1]), Money(cur[1]))
+            cur = next(current, None)
+        elif cur is None or prev[0] < cur[0]:
+            yield DiffRow(prev[0], 'left', Money(prev[1]), None, Money(-prev[1]))
+            prev = next(previous, None)
+        else:
+            delta = cur[1] - prev[1]
+            if abs(delta) > threshold:
+                yield DiffRow(cur[0], 'changed', Money(prev[1]), Money(cur[1]), Money(delta))
+            cur, prev = next(current, None), next(previous, None)
+
+
+def _tally(rows, totals, name):
+    # Pass (employee_id, net) rows through, adding up their net pay.
+    for row in rows:
+        totals[name] += row[1]
+        yield row
+
+
+# ------------------------- PREVIEWS ------------------------------------
+
+class Preview:
+    """A stored dry run: its rows' ids and net pay, and its summary.
+
+    The full batch is only read back by result(), when committing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with np.load(path) as data:
+            self.key = int(data['period_key'])
+            self.started_at = data['started_at'].astype('datetime64[us]').item()
+            self.threshold = int(data['threshold'])
+            self.summary = {name: int(data[name]) for name in SUMMARY_FIELDS}
+            self.employee_id = data['employee_id']
+            self.net = data['net']
+
+    @property
+    def month(self):
+        return MONTHS[self.key % 100 - 1]
+
+    @property
+    def year(self):
+        return self.key // 100
+
+    @property
+    def label(self):
+        return period_label(self.key)
+
+    @property
+    def previous_label(self):
+        return period_label(previous_key(self.key))
+
+    def rows(self, after=None):
+        start = 0 if after is None else int(np.searchsorted(self.employee_id, after, side='right'))
+        for i in range(start, len(self.employee_id)):
+            yield int(self.employee_id[i]), int(self.net[i])
+
+    def diff(self, after=None):
+        return merge_diff(self.rows(after), _previous_rows(previous_key(self.key), after), self.threshold)
+
+    def result(self):
+        with np.load(self.path) as data:
+            return PayrollResult(PayrollBatch(*(data[name] for name in BATCH_FIELDS)))
+
+
+def save_preview(path, month, year, threshold=None):
+    """Compute the whole period without writing it; returns a Preview."""
+    key = period_key(month, year)
+    threshold = current_app.config['PAYROLL_DIFF_THRESHOLD'] if threshold is None else int(threshold)
+    started_at = datetime.utcnow()
+    result = calculate(load_batch(batch_select(period_end(key))), rules_for(month, year))
+
+    summary = dict.fromkeys(SUMMARY_FIELDS, 0)
+    summary['employees'] = len(result)
+    summary['net_total'] = int(result.net.sum())
+    current = zip(result.batch.employee_id.tolist(), result.net.tolist())
+    previous = _tally(_previous_rows(previous_key(key)), summary, 'previous_net_total')
+    for row in merge_diff(current, previous, threshold):
+        summary[row.change] += 1
+
+    batch = result.batch
+    np.savez(
+        path,
+        period_key=key, started_at=np.datetime64(started_at, 'us'), threshold=threshold, net=result.net,
+        **{name: getattr(batch, name) for name in BATCH_FIELDS},
+        **summary,
+    )
+    return Preview(path)
+
+
+def diff_page(preview, after=None, limit=DIFF_PAGE_SIZE):
+    """One page of (DiffRow, employee or None) in employee_id order.
+
+    Keyset paginated on employee_id; returns (rows, next_cursor).
+    """
+    after = int(after) if after is not None and str(after).isdigit() else None
+    diff = preview.diff(after)
+    try:
+        rows = list(islice(diff, limit + 1))
+    finally:
+        diff.close()  # and with it the previous period's cursor
+    next_cursor = rows[limit - 1].employee_id if len(rows) > limit else None
+    rows = rows[:limit]
+
+    ids = [row.employee_id for row in rows]
+    employees = {}
+    if ids:
+        employees = {e.employee_id: e for e in Employee.query.filter(Employee.employee_id.in_(ids))}
+    return [(row, employees.get(row.employee_id)) for row in rows], next_cursor
+
+
+def commit_preview(preview):
+    """Write the previewed rows as they were computed.
+
+    Rows are stamped with the preview's start time, so the next ordinary run
+    recomputes anyone whose inputs changed after the preview. Refused if the
+    period was written after the preview was taken. Returns the row count.
+    """
+    ensure_hot(preview.key)
+    latest = db.session.execute(
+        select(func.max(Payroll.generated_at)).where(Payroll.period == preview.key)
+    ).scalar()
+    if latest is not None and latest > preview.started_at:
+        raise ValueError(f"{preview.label} was generated after this preview was taken; preview it again.")
+
+    rows = payroll_rows(preview.result(), preview.month, preview.year, preview.started_at)
+    if rows:
+        upsert_payroll(rows)
+        refresh_ytd(preview.year, [row['employee_id'] for row in rows])
+        refresh_period(preview.key)
+    db.session.commit()
+    return len(rows)
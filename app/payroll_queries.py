@@ -0,0 +1,150 @@
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import contains_eager
+
+from app import db
+from app.archive import ArchivedPayroll, archived_keys, archived_rows, attach_employees, period_column
+from app.models import Employee, Payroll
+from app.periods import MONTHS, period_key, year_range
+
+
+PAGE_SIZE = 50
+FILTER_FIELDS = ('month', 'year', 'department_id', 'grade_id', 'employee_id')
+
+
+# ------------------------- FILTERS -------------------------------------
+
+def parse_filters(args):
+    filters = {}
+    for field in FILTER_FIELDS:
+        value = (args.get(field) or '').strip()
+        if not value:
+            continue
+        if field == 'month':
+            if value in MONTHS:
+                filters[field] = value
+        elif value.isdigit():
+            filters[field] = int(value)
+    return filters
+
+
+def _apply_filters(query, filters):
+    if 'month' in filters and 'year' in filters:
+        query = query.filter(Payroll.period == period_key(filters['month'], filters['year']))
+    elif 'year' in filters:
+        query = query.filter(Payroll.period.between(*year_range(filters['year'])))
+    elif 'month' in filters:
+        query = query.filter(Payroll.period.in_(_month_keys(filters['month'])))
+    if 'grade_id' in filters:
+        query = query.filter(Payroll.grade_id == filters['grade_id'])
+    if 'employee_id' in filters:
+        query = query.filter(Payroll.employee_id == filters['employee_id'])
+    if 'department_id' in filters:
+        query = query.filter(Employee.department_id == filters['department_id'])
+    return query
+
+
+def _month_keys(month):
+    # The month's period key in every year the table covers, so the filter
+    # stays an index lookup on period_key.
+    first, last = db.session.execute(select(func.min(Payroll.period_key), func.max(Payroll.period_key))).one()
+    if first is None:
+        return []
+    return [period_key(month, year) for year in range(first // 100, last // 100 + 1)]
+
+
+# ------------------------- KEYSET PAGINATION ---------------------------
+
+def encode_cursor(payroll):
+    return f"{payroll.period_key}-{payroll.payroll_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        key, payroll_id = cursor.split('-')
+        return int(key), int(payroll_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def payroll_records_page(filters, after=None, limit=PAGE_SIZE):
+    # Newest first; (period, payroll_id) is the keyset so every page is an
+    # index range scan no matter how deep the user pages.
+    query = (
+        Payroll.query
+        .join(Payroll.employee)
+        .options(contains_eager(Payroll.employee))
+    )
+    query = _apply_filters(query, filters)
+
+    position = decode_cursor(after)
+    if position:
+        key, payroll_id = position
+        query = query.filter(or_(
+            Payroll.period < key,
+            and_(Payroll.period == key, Payroll.payroll_id < payroll_id),
+        ))
+
+    rows = query.order_by(Payroll.period.desc(), Payroll.payroll_id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        # Archived years are all older than the table's, so they simply
+        # continue the same ordering.
+        rows += _archived_page(filters, position, limit + 1 - len(rows))
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+# ------------------------- ARCHIVED PERIODS ----------------------------
+
+def _archived_page(filters, position, limit):
+    keys = archived_keys()
+    if 'year' in filters:
+        keys = [k for k in keys if k // 100 == filters['year']]
+    if 'month' in filters:
+        keys = [k for k in keys if k % 100 == MONTHS.index(filters['month']) + 1]
+    if position:
+        keys = [k for k in keys if k <= position[0]]
+    department = None
+    if 'department_id' in filters:
+        department = np.array(db.session.execute(
+            select(Employee.employee_id).where(Employee.department_id == filters['department_id'])
+        ).scalars().all(), dtype=np.int64)
+
+    rows = []
+    for key in reversed(keys):
+        payroll_ids = period_column(key, 'payroll_id')
+        mask = np.ones(len(payroll_ids), dtype=bool)
+        if 'employee_id' in filters:
+            mask &= period_column(key, 'employee_id') == filters['employee_id']
+        if 'grade_id' in filters:
+            mask &= period_column(key, 'grade_id') == filters['grade_id']
+        if department is not None:
+            mask &= np.isin(period_column(key, 'employee_id'), department)
+        if position and key == position[0]:
+            mask &= payroll_ids < position[1]
+        index = np.flatnonzero(mask)
+        index = index[np.argsort(-payroll_ids[index], kind='stable')][:limit - len(rows)]
+        rows += [ArchivedPayroll(key, int(i)) for i in index]
+        if len(rows) >= limit:
+            break
+    return attach_employees(rows)
+
+
+def employee_payslips(employee_id):
+    """All of an employee's payroll rows, newest first, archived included."""
+    rows = Payroll.query.filter_by(employee_id=employee_id).order_by(Payroll.period.desc()).all()
+    for key in reversed(archived_keys()):
+        rows += attach_employees(archived_rows(key, [employee_id]))
+    return rows
+
+
+def find_payslip(payroll_id, employee_id):
+    """One of an employee's payroll rows by id, from the table or the archive."""
+    payslip = Payroll.query.filter_by(payroll_id=payroll_id, employee_id=employee_id).first()
+    if payslip is not None:
+        return payslip
+    for key in archived_keys():
+        for row in archived_rows(key, [employee_id]):
+            if row.payroll_id == payroll_id:
+                return attach_employees([row])[0]
+    return None
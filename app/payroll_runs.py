@@ -0,0 +1,198 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.analytics import refresh_period
+from app.archive import ensure_hot
+from app.calculator import batch_select, calculate, load_batch
+from app.models import Employee, PayrollRun, PayrollRunShard
+from app.payroll_engine import payroll_rows, upsert_payroll
+from app.periods import period_end, period_key
+from app.statutory import rules_for
+from app.ytd import refresh_ytd
+
+
+CHUNK_SIZE = 1000
+DEFAULT_RANGE_SHARDS = 8
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------- PLANNING ------------------------------------
+
+def _plan_department_shards():
+    departments = db.session.execute(
+        select(Employee.department_id).distinct().order_by(Employee.department_id)
+    ).scalars()
+    return [PayrollRunShard(department_id=department_id) for department_id in departments]
+
+
+def _plan_range_shards(shard_count):
+    low, high = db.session.execute(
+        select(func.min(Employee.employee_id), func.max(Employee.employee_id))
+    ).one()
+    if low is None:
+        return []
+
+    step = max(1, -(-(high - low + 1) // shard_count))
+    return [
+        PayrollRunShard(first_employee_id=start, last_employee_id=min(start + step - 1, high))
+        for start in range(low, high + 1, step)
+    ]
+
+
+def start_run(month, year, shard_by='department', shard_count=DEFAULT_RANGE_SHARDS):
+    ensure_hot(period_key(month, year))
+    if shard_by == 'department':
+        shards = _plan_department_shards()
+    elif shard_by == 'range':
+        shards = _plan_range_shards(shard_count)
+    else:
+        raise ValueError(f"Unknown shard mode: {shard_by}")
+
+    run = PayrollRun(month=month, year=year, shard_by=shard_by, shards=shards)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+# ------------------------- SHARD WORKER --------------------------------
+
+def _shard_select(shard):
+    as_of = period_end(period_key(shard.run.month, shard.run.year))
+    stmt = batch_select(as_of).where(Employee.employee_id > shard.checkpoint_employee_id)
+    if shard.run.shard_by == 'department':
+        if shard.department_id is None:
+            return stmt.where(Employee.department_id.is_(None))
+        return stmt.where(Employee.department_id == shard.department_id)
+    return stmt.where(Employee.employee_id.between(shard.first_employee_id, shard.last_employee_id))
+
+
+def process_shard(shard_id, chunk_size=CHUNK_SIZE):
+    shard = db.session.get(PayrollRunShard, shard_id)
+    if shard.status == 'completed':
+        return shard.rows_written
+
+    try:
+        started_at = datetime.utcnow()
+        result = calculate(load_batch(_shard_select(shard)), rules_for(shard.run.month, shard.run.year))
+        rows = payroll_rows(result, shard.run.month, shard.run.year, started_at)
+
+        # Each chunk commits together with its checkpoint and its employees'
+        # YTD totals, so a resumed shard picks up exactly after the last
+        # committed employee.
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            upsert_payroll(chunk)
+            refresh_ytd(shard.run.year, [row['employee_id'] for row in chunk])
+            shard.checkpoint_employee_id = chunk[-1]['employee_id']
+            shard.rows_written += len(chunk)
+            db.session.commit()
+
+        shard.status = 'completed'
+        shard.error = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _record_failure(shard_id, e)
+        raise
+
+    return shard.rows_written
+
+
+def _record_failure(shard_id, error):
+    shard = db.session.get(PayrollRunShard, shard_id)
+    shard.status = 'failed'
+    shard.error = f"{type(error).__name__}: {error}"
+    db.session.commit()
+
+
+_worker_app = None
+_worker_error = None
+
+
+def _init_worker(config):
+    # config is the parent app's config, so workers use the same database.
+    global _worker_app, _worker_error
+    from app import create_app
+
+    try:
+        _worker_app = create_app(config)
+        with _worker_app.app_context():
+            # Never reuse connections inherited from the parent process.
+            db.engine.dispose(close=False)
+    except Exception as e:
+        # Raised from each shard instead of silently breaking the pool.
+        _worker_error = e
+
+
+def _process_shard_in_worker(shard_id):
+    if _worker_error is not None:
+        raise RuntimeError(f"Payroll worker failed to start: {type(_worker_error).__name__}: {_worker_error}")
+    with _worker_app.app_context():
+        return process_shard(shard_id)
+
+
+# ------------------------- RUNNING -------------------------------------
+
+def process_run(run_id, workers=None, progress=None):
+    # progress, if given, is called as progress(completed_shards, total_shards).
+    run = db.session.get(PayrollRun, run_id)
+    pending = [shard.shard_id for shard in run.shards if shard.status != 'completed']
+    total = len(run.shards)
+    done = total - len(pending)
+    progress = progress or (lambda done, total: None)
+    progress(done, total)
+    workers = min(workers or os.cpu_count() or 1, len(pending) or 1)
+
+    run.status = 'running'
+    run.finished_at = None
+    db.session.commit()
+
+    failed = False
+    if workers == 1:
+        for shard_id in pending:
+            try:
+                process_shard(shard_id)
+                done += 1
+                progress(done, total)
+            except Exception:
+                logger.exception("Payroll run %s: shard %s failed", run_id, shard_id)
+                failed = True
+    else:
+        config = {key: value for key, value in current_app.config.items() if key.isupper()}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+            futures = {pool.submit(_process_shard_in_worker, shard_id): shard_id for shard_id in pending}
+            for future in as_completed(futures):
+                error = future.exception()
+                if error is not None:
+                    logger.error("Payroll run %s: shard %s failed", run_id, futures[future], exc_info=error)
+                    # The worker may not have got as far as recording it.
+                    _record_failure(futures[future], error)
+                    failed = True
+                else:
+                    done += 1
+                    progress(done, total)
+
+    # Worker processes committed on their own connections.
+    db.session.expire_all()
+    run = db.session.get(PayrollRun, run_id)
+    run.status = 'failed' if failed else 'completed'
+    run.finished_at = datetime.utcnow()
+    # Committed shards are visible in payroll even when others failed.
+    refresh_period(period_key(run.month, run.year))
+    db.session.commit()
+    return run
+
+
+def resume_run(run_id, workers=None, progress=None):
+    return process_run(run_id, workers=workers, progress=progress)
+
+
+def incomplete_runs():
+    return PayrollRun.query.filter(PayrollRun.status != 'completed').order_by(PayrollRun.run_id.desc()).all()
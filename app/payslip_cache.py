@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from flask import current_app
+
+from app.payslips import period_payslips, render_many, render_payslip
+
+
+# Running byte total per cache directory; rebuilt from disk when unknown.
+_sizes = {}
+_lock = threading.Lock()
+
+
+# ------------------------- KEYS ----------------------------------------
+
+def content_hash(data):
+    # Everything the PDF shows is in data, so equal hashes mean equal PDFs.
+    encoded = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def cache_dir():
+    path = current_app.config.get('PAYSLIP_CACHE_DIR') or os.path.join(current_app.instance_path, 'payslip_cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(data, digest=None):
+    digest = digest or content_hash(data)
+    return os.path.join(cache_dir(), f"{data['payroll_id']}-{digest[:32]}.pdf")
+
+
+# ------------------------- LOOKUP --------------------------------------
+
+def _touch(path):
+    # mtime doubles as the LRU clock; atime is unreliable on noatime mounts.
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _store(path, pdf):
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(pdf)
+    os.replace(tmp, path)
+    _account(directory, len(pdf))
+
+
+def cached_payslip(data, digest=None):
+    """Return the path of the cached PDF for data, rendering it on a miss."""
+    path = cache_path(data, digest)
+    if not _touch(path):
+        _store(path, render_payslip(data))
+    return path
+
+
+# ------------------------- EVICTION ------------------------------------
+
+def _entries(directory):
+    with os.scandir(directory) as it:
+        return [e for e in it if e.name.endswith('.pdf') and e.is_file()]
+
+
+def _account(directory, added):
+    limit = current_app.config.get('PAYSLIP_CACHE_MAX_BYTES', 512 * 2**20)
+    with _lock:
+        if directory not in _sizes:
+            _sizes[directory] = sum(e.stat().st_size for e in _entries(directory))
+        else:
+            _sizes[directory] += added
+        if _sizes[directory] > limit:
+            _sizes[directory] = _evict(directory, int(limit * 0.9))
+
+
+def _evict(directory, target):
+    # Drop least recently used entries until the cache fits in target bytes.
+    entries = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in _entries(directory)))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+# ------------------------- PRE-WARMING ---------------------------------
+
+def prewarm_period(key, workers=None):
+    """Render every not-yet-cached payslip of a period; returns the count."""
+    missing = (data for data in period_payslips(key) if not os.path.exists(cache_path(data)))
+    count = 0
+    for data, pdf in render_many(missing, workers=workers):
+        _store(cache_path(data), pdf)
+        count += 1
+    return count
@@ -0,0 +1,129 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app import db
+from app.calculator import ALLOWANCE_FIELDS, DEDUCTION_FIELDS, PAYSLIP_LABELS
+from app.archive import archived_rows, attach_employees, is_archived, ytd_arrays
+from app.models import Employee, Payroll
+from app.money import Money, format_minor
+from app.streaming import stream_zip
+from app.ytd import YTD_FIELDS, YTD_LABELS, ytd_columns
+
+
+# ------------------------- PAYSLIP DATA --------------------------------
+
+def payslip_data(payslip, employee, ytd=None):
+    # Plain, picklable snapshot of everything the PDF shows. ytd maps
+    # YTD_FIELDS to amounts through this payslip's period.
+    lines = [('Basic Salary', payslip.basic_salary)]
+    lines += [(PAYSLIP_LABELS[f], getattr(payslip, f)) for f in ALLOWANCE_FIELDS]
+    lines += [('Gross Salary', payslip.gross_salary)]
+    lines += [(PAYSLIP_LABELS[f], getattr(payslip, f)) for f in DEDUCTION_FIELDS]
+    lines += [('Total Deductions', payslip.total_deductions), ('Net Pay', payslip.net_pay)]
+
+    return {
+        'payroll_id': payslip.payroll_id,
+        'employee_id': employee.employee_id,
+        'name': f"{employee.first_name} {employee.surname}",
+        'month': payslip.month,
+        'year': payslip.year,
+        'lines': [(label, format_minor(amount)) for label, amount in lines],
+        'ytd': [(YTD_LABELS[f], format_minor(ytd[f])) for f in YTD_FIELDS] if ytd else [],
+    }
+
+
+def payslip_filename(data, per_employee=False):
+    if per_employee:
+        return f"payslip_{data['employee_id']}_{data['month']}_{data['year']}.pdf"
+    return f"payslip_{data['month']}_{data['year']}.pdf"
+
+
+def render_payslip(data):
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    p.setFont("Helvetica", 12)
+
+    # Header
+    p.drawString(100, 750, "Payslip")
+    p.drawString(100, 735, f"Name: {data['name']}")
+    p.drawString(100, 720, f"Employee ID: {data['employee_id']}")
+    p.drawString(100, 705, f"Period: {data['month']} {data['year']}")
+
+    # Payroll Details
+    y = 680
+    for label, amount in data['lines']:
+        p.drawString(100, y, f"{label}: {amount}")
+        y -= 15
+
+    # Year to date
+    if data.get('ytd'):
+        y -= 10
+        for label, amount in data['ytd']:
+            p.drawString(100, y, f"{label}: {amount}")
+            y -= 15
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+# ------------------------- PERIOD PAYSLIPS -----------------------------
+
+def period_payslips(key, yield_per=500):
+    # Streams the period from a server-side cursor in employee order, with
+    # each employee's YTD totals joined in rather than summed per payslip.
+    if is_archived(key):
+        yield from _archived_payslips(key, yield_per)
+        return
+    join_ytd, ytd = ytd_columns(key)
+    stmt = (
+        join_ytd(db.select(Payroll, Employee, *ytd).join(Employee, Payroll.employee_id == Employee.employee_id))
+        .where(Payroll.period == key)
+        .order_by(Payroll.employee_id)
+        .execution_options(yield_per=yield_per)
+    )
+    for payslip, employee, *totals in db.session.execute(stmt):
+        yield payslip_data(payslip, employee, dict(zip(YTD_FIELDS, totals)))
+
+
+def _archived_payslips(key, chunk_size):
+    totals = ytd_arrays(key, YTD_FIELDS)
+    rows = archived_rows(key)
+    for start in range(0, len(rows), chunk_size):
+        for payslip in attach_employees(rows[start:start + chunk_size]):
+            ytd = {f: Money(totals[f][payslip.row_index]) for f in YTD_FIELDS}
+            yield payslip_data(payslip, payslip.employee, ytd)
+
+
+def render_many(items, workers=None):
+    # Yields (data, pdf) in input order. At most a few tasks per worker are
+    # in flight, so neither inputs nor finished PDFs pile up in memory.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for data in items:
+            yield data, render_payslip(data)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for data in items:
+            pending.append((data, pool.submit(render_payslip, data)))
+            if len(pending) >= workers * 4:
+                data, future = pending.popleft()
+                yield data, future.result()
+        while pending:
+            data, future = pending.popleft()
+            yield data, future.result()
+
+
+# ------------------------- STREAMED ZIP --------------------------------
+
+def stream_period_zip(key, workers=None):
+    # Stored, not deflated: ReportLab output is already compressed.
+    rendered = render_many(period_payslips(key), workers=workers)
+    return stream_zip((payslip_filename(data, per_employee=True), pdf) for data, pdf in rendered)
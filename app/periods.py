@@ -0,0 +1,40 @@
+import calendar
+from datetime import date
+
+MONTHS = (
+    'January', 'February', 'March', 'April', 'May', 'June', 'July',
+    'August', 'September', 'October', 'November', 'December',
+)
+
+
+def month_number(month):
+    return MONTHS.index(month) + 1
+
+
+def period_key(month, year):
+    # Sortable integer yyyymm, e.g. ('March', 2025) -> 202503.
+    return int(year) * 100 + month_number(month)
+
+
+def year_range(year):
+    return int(year) * 100 + 1, int(year) * 100 + 12
+
+
+def period_label(key):
+    year, month = divmod(int(key), 100)
+    return f"{MONTHS[month - 1]} {year}"
+
+
+def period_end(key):
+    # Last day of the period; effective-dated assignments are resolved as of it.
+    year, month = divmod(int(key), 100)
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+def key_of(day):
+    return day.year * 100 + day.month
+
+
+def previous_key(key):
+    year, month = divmod(int(key), 100)
+    return key - 1 if month > 1 else (year - 1) * 100 + 12
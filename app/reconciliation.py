@@ -0,0 +1,328 @@
+"""Integrity digests of stored payroll, for reconciliation.
+
+Every (period, department) bucket has a PayrollDigest: its row count and an
+order-independent 64-bit hash of its rows' ids and amounts, the component
+amounts copied from the grade and element included. A bucket digest is the
+sum of its rows' hashes mod 2**64, so upsert_payroll keeps it up to date
+incrementally: the rows a write replaces are hashed first, and each bucket
+moves by the new rows' hashes less the old ones', in the same transaction.
+The digests thus record what the application itself wrote, at a cost
+proportional to the rows written.
+
+verify() recomputes every bucket's digest from the stored rows (or the
+archive files), which is a few vectorized passes per period, and drills down
+only into buckets that do not match: their rows are recomputed from the
+employees' inputs for the period and compared field by field. A period
+whose buckets differ but whose total still matches has only had employees
+change department.
+"""
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import and_, delete, insert, select, type_coerce
+
+from app import db
+from app.archive import AMOUNT_COLUMNS, archived_keys, archived_row_count, archived_rows, is_archived, period_column
+from app.calculator import batch_select, calculate, load_batch
+from app.models import Employee, Payroll, PayrollDigest
+from app.periods import MONTHS, period_end, year_range
+from app.statutory import rules_for
+
+
+HASHED_COLUMNS = ('period_key', 'employee_id', 'grade_id', 'element_id', *AMOUNT_COLUMNS)
+# Stands in for a NULL department in the department arrays.
+NO_DEPARTMENT = -1
+# Employees per query when reading the rows a write replaces.
+WRITE_CHUNK = 1000
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+# status: 'mismatch', 'regrouped' (only department membership changed),
+# 'unrecorded' (rows without a digest) or 'missing' (a digest without rows).
+BucketCheck = namedtuple('BucketCheck', 'period_key department_id status recorded_rows rows drift')
+# fields maps column -> (stored, expected); None when the employee has no
+# grade or element for the period.
+Drift = namedtuple('Drift', 'employee_id fields')
+
+
+# ------------------------- HASHING -------------------------------------
+
+def _mix(h):
+    # splitmix64 finalizer; uint64 arithmetic wraps.
+    h = (h ^ (h >> np.uint64(30))) * _MIX1
+    h = (h ^ (h >> np.uint64(27))) * _MIX2
+    return h ^ (h >> np.uint64(31))
+
+
+def row_hashes(columns):
+    """One uint64 hash per row of {column: int64 array} over HASHED_COLUMNS."""
+    h = np.zeros(len(columns['employee_id']), dtype=np.uint64)
+    for name in HASHED_COLUMNS:
+        h = _mix((h + _GOLDEN) ^ np.asarray(columns[name], dtype=np.int64).view(np.uint64))
+    return h
+
+
+def _period_arrays(key, departments=None):
+    # (department per row, {column: int64 array}) for one period, from the
+    # payroll table or the period's archive file. departments maps
+    # employee_id -> department_id for archived periods.
+    if is_archived(key):
+        if not archived_row_count(key):
+            return np.zeros(0, dtype=np.int64), {c: np.zeros(0, dtype=np.int64) for c in HASHED_COLUMNS}
+        columns = {c: period_column(key, c) for c in HASHED_COLUMNS}
+        if departments is None:
+            departments = _departments()
+        department = np.array([departments.get(e, NO_DEPARTMENT) for e in columns['employee_id'].tolist()],
+                              dtype=np.int64)
+        return department, columns
+
+    # Plain integers: skipping Money conversion keeps this a raw fetch.
+    stmt = (
+        select(
+            Employee.department_id,
+            *(type_coerce(getattr(Payroll, c), db.BigInteger) for c in HASHED_COLUMNS),
+        )
+        .join(Employee, Payroll.employee_id == Employee.employee_id)
+        .where(Payroll.period_key == key)
+    )
+    rows = db.session.execute(stmt).all()
+    data = np.array(
+        [[NO_DEPARTMENT if row[0] is None else row[0], *row[1:]] for row in rows], dtype=np.int64,
+    ).reshape(-1, len(HASHED_COLUMNS) + 1)
+    return data[:, 0], {c: data[:, i + 1] for i, c in enumerate(HASHED_COLUMNS)}
+
+
+def _signed(digest):
+    # A digest mod 2**64 as the signed BIGINT it is stored as.
+    return (digest + 2**63) % 2**64 - 2**63
+
+
+def _departments():
+    return dict(db.session.execute(select(Employee.employee_id, Employee.department_id)).all())
+
+
+def bucket_digests(key, departments=None):
+    """{department_id: (rows, digest)} computed from the period's stored rows."""
+    department, columns = _period_arrays(key, departments)
+    if not len(department):
+        return {}
+    buckets, index = np.unique(department, return_inverse=True)
+    sums = np.zeros(len(buckets), dtype=np.uint64)
+    np.add.at(sums, index, row_hashes(columns))
+    counts = np.bincount(index, minlength=len(buckets))
+    return {
+        None if bucket == NO_DEPARTMENT else int(bucket): (int(count), int(digest.view(np.int64)))
+        for bucket, count, digest in zip(buckets, counts, sums)
+    }
+
+
+# ------------------------- MAINTENANCE ---------------------------------
+
+def refresh_digests(key):
+    """Record the digests of one period from its stored rows; the caller
+    commits. For bulk loads and baselines; ordinary writes go through
+    updating_digests().
+    """
+    db.session.execute(delete(PayrollDigest).where(PayrollDigest.period_key == key))
+    now = datetime.utcnow()
+    rows = [
+        {'period_key': key, 'department_id': department_id, 'row_count': count, 'digest': digest, 'refreshed_at': now}
+        for department_id, (count, digest) in bucket_digests(key).items()
+    ]
+    if rows:
+        db.session.execute(insert(PayrollDigest), rows)
+
+
+def _replaced_rows(key, employee_ids):
+    # {employee_id: (department_id, hash of their stored row or None)}.
+    replaced = {}
+    for start in range(0, len(employee_ids), WRITE_CHUNK):
+        chunk = employee_ids[start:start + WRITE_CHUNK]
+        stmt = (
+            select(
+                Employee.employee_id, Employee.department_id,
+                *(type_coerce(getattr(Payroll, c), db.BigInteger).label(f"stored_{c}") for c in HASHED_COLUMNS),
+            )
+            .outerjoin(Payroll, and_(Payroll.employee_id == Employee.employee_id, Payroll.period_key == key))
+            .where(Employee.employee_id.in_(chunk))
+        )
+        rows = db.session.execute(stmt).all()
+        stored = [row for row in rows if row[2] is not None]
+        hashes = row_hashes({
+            c: np.array([row[i + 2] for row in stored], dtype=np.int64) for i, c in enumerate(HASHED_COLUMNS)
+        })
+        replaced.update((row[0], (row[1], None)) for row in rows)
+        replaced.update((row[0], (row[1], int(h))) for row, h in zip(stored, hashes))
+    return replaced
+
+
+def _unrecorded(key):
+    # Rows stored before digests were kept, and no baseline recorded yet:
+    # left to `flask payroll digests` rather than given partial digests.
+    if db.session.execute(select(PayrollDigest.digest_id).where(PayrollDigest.period_key == key).limit(1)).first():
+        return False
+    return db.session.execute(select(Payroll.payroll_id).where(Payroll.period_key == key).limit(1)).first() is not None
+
+
+@contextmanager
+def updating_digests(rows):
+    """Wrap a write of payroll rows (payroll_rows() dicts) to fold it into
+    the digests of their periods; the caller commits.
+    """
+    by_period = defaultdict(list)
+    for row in rows:
+        by_period[row['period_key']].append(row)
+    replaced = {
+        key: _replaced_rows(key, [row['employee_id'] for row in written])
+        for key, written in by_period.items() if not _unrecorded(key)
+    }
+    yield
+    for key, before in replaced.items():
+        _apply_write(key, by_period[key], before)
+
+
+def _apply_write(key, written, before):
+    hashes = row_hashes({c: np.array([int(row[c]) for row in written], dtype=np.int64) for c in HASHED_COLUMNS})
+    deltas = defaultdict(lambda: [0, 0])
+    for row, h in zip(written, hashes.tolist()):
+        department_id, old = before[row['employee_id']]
+        delta = deltas[department_id]
+        if old is None:
+            delta[0] += 1
+            delta[1] += h
+        else:
+            delta[1] += h - old
+
+    # Locked, so concurrent shards of a run add up instead of overwriting
+    # each other; a bucket both create is stored twice and verify() sums it.
+    stored = {}
+    for digest in db.session.execute(
+        select(PayrollDigest).where(PayrollDigest.period_key == key)
+        .order_by(PayrollDigest.digest_id).with_for_update()
+    ).scalars():
+        stored.setdefault(digest.department_id, digest)
+    now = datetime.utcnow()
+    for department_id, (count, delta) in deltas.items():
+        digest = stored.get(department_id)
+        if digest is None:
+            db.session.add(PayrollDigest(period_key=key, department_id=department_id, row_count=count,
+                                         digest=_signed(delta), refreshed_at=now))
+        else:
+            digest.row_count += count
+            digest.digest = _signed(digest.digest + delta)
+            digest.refreshed_at = now
+
+
+def _period_keys(year=None):
+    hot = db.session.execute(select(Payroll.period_key).distinct()).scalars().all()
+    recorded = db.session.execute(select(PayrollDigest.period_key).distinct()).scalars().all()
+    keys = sorted(set(hot) | set(recorded) | set(archived_keys()))
+    if year is not None:
+        first, last = year_range(year)
+        keys = [key for key in keys if first <= key <= last]
+    return keys
+
+
+def rebuild_digests(year=None):
+    """Record digests of every period (of one year) as it stands now.
+
+    For existing history, or to accept the state verify() reported.
+    """
+    keys = _period_keys(year)
+    for key in keys:
+        refresh_digests(key)
+    db.session.commit()
+    return keys
+
+
+# ------------------------- VERIFICATION --------------------------------
+
+def verify(year=None, drill_down=True):
+    """Compare every bucket with its recorded digest.
+
+    Returns (buckets checked, [BucketCheck for each bucket that differs]).
+    Only mismatching buckets are recomputed from inputs (drift).
+    """
+    recorded = {}
+    stmt = select(PayrollDigest.period_key, PayrollDigest.department_id, PayrollDigest.row_count, PayrollDigest.digest)
+    for key, department_id, count, digest in db.session.execute(stmt):
+        # Digests add up, so a bucket stored twice is their sum.
+        buckets = recorded.setdefault(key, {})
+        total_count, total = buckets.get(department_id, (0, 0))
+        buckets[department_id] = (total_count + count, _signed(total + digest))
+
+    departments = _departments()
+    checked, problems = 0, []
+    for key in _period_keys(year):
+        expected = recorded.get(key, {})
+        actual = bucket_digests(key, departments)
+        buckets = sorted(set(expected) | set(actual), key=lambda d: (d is None, d or 0))
+        checked += len(buckets)
+        differing = [d for d in buckets if expected.get(d) != actual.get(d)]
+        if not differing:
+            continue
+
+        regrouped = bool(expected) and _total(expected) == _total(actual)
+        for department_id in differing:
+            recorded_rows, rows = expected.get(department_id, (0, 0))[0], actual.get(department_id, (0, 0))[0]
+            if regrouped:
+                status = 'regrouped'
+            elif department_id not in expected:
+                status = 'unrecorded'
+            elif department_id not in actual:
+                status = 'missing'
+            else:
+                status = 'mismatch'
+            drift = drift_rows(key, department_id) if drill_down and status == 'mismatch' else []
+            problems.append(BucketCheck(key, department_id, status, recorded_rows, rows, drift))
+    return checked, problems
+
+
+def _total(buckets):
+    # Whole-period row count and digest: bucket digests add up mod 2**64.
+    return sum(c for c, _ in buckets.values()), sum(d for _, d in buckets.values()) % 2**64
+
+
+def _stored_rows(key, department_id):
+    department = Employee.department_id.is_(None) if department_id is None else Employee.department_id == department_id
+    if is_archived(key):
+        ids = db.session.execute(select(Employee.employee_id).where(department)).scalars().all()
+        return {row.employee_id: row for row in archived_rows(key, ids)}
+    rows = db.session.execute(
+        select(Payroll).join(Employee, Payroll.employee_id == Employee.employee_id)
+        .where(Payroll.period_key == key, department)
+    ).scalars()
+    return {row.employee_id: row for row in rows}
+
+
+def drift_rows(key, department_id):
+    """Rows of one bucket that differ from a recomputation from their inputs."""
+    from app.payroll_engine import payroll_rows  # payroll_engine refreshes digests
+
+    stored = _stored_rows(key, department_id)
+    if not stored:
+        return []
+    month, year = MONTHS[key % 100 - 1], key // 100
+    stmt = batch_select(period_end(key)).where(Employee.employee_id.in_(stored))
+    expected = {
+        row['employee_id']: row
+        for row in payroll_rows(calculate(load_batch(stmt), rules_for(month, year)), month, year)
+    }
+
+    drift = []
+    for employee_id, row in sorted(stored.items()):
+        if employee_id not in expected:
+            drift.append(Drift(employee_id, None))
+            continue
+        fields = {
+            name: (getattr(row, name), expected[employee_id][name])
+            for name in ('grade_id', 'element_id', *AMOUNT_COLUMNS)
+            if getattr(row, name) != expected[employee_id][name]
+        }
+        if fields:
+            drift.append(Drift(employee_id, fields))
+    return drift
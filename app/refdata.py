@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from flask import current_app
+
+from app import db
+from app.models import Department, Element, Grade, Job, StatutoryBracket, StatutoryTable
+
+
+# name -> (model, primary key, sort column)
+REFERENCE_TABLES = {
+    'grades': (Grade, 'grade_id', Grade.grade_name),
+    'departments': (Department, 'department_id', Department.department_name),
+    'jobs': (Job, 'job_id', Job.job_name),
+    'elements': (Element, 'element_id', Element.element_id),
+    'statutory_tables': (StatutoryTable, 'table_id', StatutoryTable.effective_from),
+    'statutory_brackets': (StatutoryBracket, 'bracket_id', StatutoryBracket.lower_bound),
+}
+
+
+def _snapshot(obj):
+    # Plain, session-free copy of the mapped columns.
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in db.inspect(obj).mapper.column_attrs})
+
+
+class ReferenceCache:
+    """Versioned cache of small, rarely edited lookup tables.
+
+    Writers call bump(name). With REFDATA_VERSION_DIR set, versions live in
+    one stamp file per table, so every gunicorn worker sees a bump on its
+    next read. Without it versions are per process and entries also expire
+    after REFDATA_CACHE_TTL seconds to bound staleness in other workers.
+
+    Reads with fresh=True always go to the database (and refresh the
+    entry); payroll calculation uses them, since an amount computed from a
+    stale entry would be stored as current.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._local_versions = {}
+        self._lock = threading.Lock()
+
+    # --------------------- versions ------------------------------------
+
+    def _stamp_path(self, name):
+        directory = current_app.config.get('REFDATA_VERSION_DIR')
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{name}.version")
+
+    def version(self, name):
+        path = self._stamp_path(name)
+        if path is None:
+            return self._local_versions.get(name, 0)
+        try:
+            with open(path) as handle:
+                return int(handle.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self, name):
+        with self._lock:
+            path = self._stamp_path(name)
+            if path is None:
+                self._local_versions[name] = self._local_versions.get(name, 0) + 1
+            else:
+                # Nanosecond clock: unique enough across workers, no locking.
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, 'w') as handle:
+                    handle.write(str(time.time_ns()))
+                os.replace(tmp, path)
+            self._tables.pop(name, None)
+
+    # --------------------- reads ---------------------------------------
+
+    def _fresh(self, name, entry, version):
+        if entry is None or entry['version'] != version:
+            return False
+        if self._stamp_path(name) is None:
+            ttl = current_app.config.get('REFDATA_CACHE_TTL', 30)
+            return time.monotonic() - entry['loaded_at'] < ttl
+        return True
+
+    def _load(self, name, fresh=False):
+        version = self.version(name)
+        entry = self._tables.get(name)
+        if not fresh and self._fresh(name, entry, version):
+            return entry
+
+        model, key, order = REFERENCE_TABLES[name]
+        rows = [_snapshot(obj) for obj in db.session.execute(db.select(model).order_by(order)).scalars()]
+        entry = {
+            'version': version,
+            'loaded_at': time.monotonic(),
+            'rows': rows,
+            'by_id': {getattr(row, key): row for row in rows},
+        }
+        with self._lock:
+            self._tables[name] = entry
+        return entry
+
+    def rows(self, name, fresh=False):
+        return self._load(name, fresh)['rows']
+
+    def by_id(self, name, fresh=False):
+        return self._load(name, fresh)['by_id']
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+refdata = ReferenceCache()
@@ -1,11 +1,32 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, make_response, Response, jsonify, send_file, stream_with_context
 from flask_login import login_required, current_user
-from app.models import Employee, Payroll, Grade, Department, Job, Element, db
+from app.models import BackgroundJob, Employee, Grade, Department, Job, Element, ElementAssignment, GradeAssignment, PayrollRun, db
 from app import db
+from app.archive import is_archived
+from app.assignments import OPEN_START
+from app.analytics import METRICS, chart_png, parse_analytics_args, rollup
+from app.employee_search import MAX_SEARCH_RESULTS, parse_search, search_employees, search_result
+from app.employee_import import IMPORT_COLUMNS, import_employees, read_rows
+from app.exports import EXPORTS, FORMATS, export_filename, stream_export
+from app.identity import identity_cache
+from app.jobs import submit as submit_job
+from app.metrics import render_metrics
+from app.money import Money
+from app.periods import MONTHS, period_key
+from app.payslip_cache import cached_payslip, content_hash
+from app.payslips import payslip_data, payslip_filename, stream_period_zip
+from app.payroll_preview import Preview, diff_page
+from app.payroll_queries import employee_payslips, find_payslip, parse_filters, payroll_records_page
+from app.payroll_runs import incomplete_runs
+from app.refdata import refdata
+from app.ytd import payslip_ytd
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import io
+import hmac
+import json
+import os
+import zipfile
+
+MAX_ERRORS_SHOWN = 1000
 
 payroll_bp = Blueprint('payroll', __name__)
 
@@ -23,8 +44,41 @@ def admin_dashboard():
     if current_user.role != 'admin':
         return redirect(url_for('payroll.employee_dashboard'))
 
-    employees = Employee.query.all()
-    return render_template('admin_dashboard.html', employees=employees)
+    search = parse_search(request.args)
+    employees, next_cursor = search_employees(search, after=request.args.get('after'))
+    return render_template(
+        'admin_dashboard.html',
+        employees=employees,
+        search=search,
+        next_cursor=next_cursor,
+        departments=refdata.rows('departments'),
+        grades=refdata.rows('grades'),
+        jobs=refdata.rows('jobs'),
+    )
+
+
+@payroll_bp.route('/admin/employees/search')
+@login_required
+def employee_search():
+    if current_user.role != 'admin':
+        return jsonify(error='Forbidden'), 403
+
+    limit = request.args.get('limit', '')
+    limit = min(int(limit), MAX_SEARCH_RESULTS) if limit.isdigit() and int(limit) > 0 else 20
+    rows, next_cursor = search_employees(parse_search(request.args), after=request.args.get('after'), limit=limit)
+    return jsonify(results=[search_result(emp, department_name) for emp, department_name in rows],
+                   next_cursor=next_cursor)
+
+
+@payroll_bp.route('/admin/metrics')
+def metrics():
+    # Prometheus scrapers can't log in, so a configured token is accepted too.
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = token and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    if not authorized and not (current_user.is_authenticated and current_user.role == 'admin'):
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 
 # ----------------------- EMPLOYEE ---------------------------------
@@ -35,8 +89,7 @@ def employee_dashboard():
     if current_user.role != 'employee':
         return redirect(url_for('payroll.admin_dashboard'))
 
-    employee = Employee.query.filter_by(employee_id=current_user.employee_id).first()
-    return render_template('employee_dashboard.html', employee=employee)
+    return render_template('employee_dashboard.html', employee=current_user.employee)
 
 
 # ------------------------- EMPLOYEE UPDATES -----------------------------
@@ -57,6 +110,7 @@ def update_employee():
     employee.bank_account_number = request.form['bank_account_number']
 
     db.session.commit()
+    identity_cache.invalidate_employee(employee.employee_id)
     flash('Profile updated successfully.', 'success')
     return redirect(url_for('payroll.employee_dashboard'))
 
@@ -81,6 +135,13 @@ def add_employee():
                 bank_account_number=request.form['bank_account_number']
             )
             db.session.add(employee)
+            db.session.flush()
+            db.session.add_all([
+                GradeAssignment(employee_id=employee.employee_id, grade_id=employee.grade_id,
+                                effective_from=OPEN_START),
+                ElementAssignment(employee_id=employee.employee_id, element_id=employee.element_id,
+                                  effective_from=OPEN_START),
+            ])
             db.session.commit()
             flash('✅ Employee added successfully', 'success')
             return redirect(url_for('payroll.admin_dashboard'))
@@ -88,12 +149,46 @@ def add_employee():
             db.session.rollback()
             flash(f'❌ Error: {e}', 'danger')
 
-    grades = Grade.query.all()
-    departments = Department.query.all()
-    jobs = Job.query.all()
-    elements = Element.query.all()
-    return render_template('add_employee.html', grades=grades, departments=departments, jobs=jobs, elements=elements)
+    return render_template(
+        'add_employee.html',
+        grades=refdata.rows('grades'),
+        departments=refdata.rows('departments'),
+        jobs=refdata.rows('jobs'),
+        elements=refdata.rows('elements'),
+    )
+
+
 
+# ---------------------- BULK IMPORT EMPLOYEES ----------------------------
+
+@payroll_bp.route('/admin/employees/import', methods=['GET', 'POST'])
+@login_required
+def import_employees_view():
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a CSV or XLSX file to import.', 'danger')
+            return redirect(url_for('payroll.import_employees_view'))
+
+        try:
+            result = import_employees(read_rows(upload.stream, upload.filename))
+        except (zipfile.BadZipFile, UnicodeDecodeError, KeyError, IndexError, TypeError) as e:
+            db.session.rollback()
+            flash(f'❌ Could not read {upload.filename}: {e}', 'danger')
+            return redirect(url_for('payroll.import_employees_view'))
+        flash(f'Imported {result.inserted} employees, rejected {result.rejected} rows.',
+              'success' if not result.rejected else 'warning')
+
+    return render_template(
+        'import_employees.html',
+        result=result,
+        columns=IMPORT_COLUMNS,
+        max_errors=MAX_ERRORS_SHOWN,
+    )
 
 
 # ----------------------- MANAGE DEPARTMENTS -----------------------------------
@@ -111,11 +206,11 @@ def manage_departments():
             new_dept = Department(department_name=department_name)
             db.session.add(new_dept)
             db.session.commit()
+            refdata.bump('departments')
             flash('Department created successfully!', 'success')
             return redirect(url_for('payroll.manage_departments'))
 
-    departments = Department.query.all()
-    return render_template('departments.html', departments=departments)
+    return render_template('departments.html', departments=refdata.rows('departments'))
 
 
 
@@ -125,6 +220,7 @@ def delete_department(id):
     department = Department.query.get_or_404(id)
     db.session.delete(department)
     db.session.commit()
+    refdata.bump('departments')
     flash('Department deleted successfully.', 'success')
     return redirect(url_for('payroll.manage_departments'))
 
@@ -143,9 +239,10 @@ def manage_grades():
             flash('Grade already exists!', 'danger')
         else:
             try:
-                new_grade = Grade(grade_name=grade_name, salary=float(salary))
+                new_grade = Grade(grade_name=grade_name, salary=Money.from_cedis(salary))
                 db.session.add(new_grade)
                 db.session.commit()
+                refdata.bump('grades')
                 flash('Grade added successfully!', 'success')
             except Exception as e:
                 db.session.rollback()
@@ -153,8 +250,7 @@ def manage_grades():
 
         return redirect(url_for('payroll.manage_grades'))
 
-    grades = Grade.query.all()
-    return render_template('grades.html', grades=grades)
+    return render_template('grades.html', grades=refdata.rows('grades'))
 
 
 @payroll_bp.route('/grades/delete/<int:id>', methods=['POST'])
@@ -162,6 +258,7 @@ def delete_grade(id):
     grade = Grade.query.get_or_404(id)
     db.session.delete(grade)
     db.session.commit()
+    refdata.bump('grades')
     flash('Grade deleted successfully.', 'success')
     return redirect(url_for('payroll.manage_grades'))
 
@@ -176,11 +273,11 @@ def manage_jobs():
             new_job = Job(job_name=job_name)
             db.session.add(new_job)
             db.session.commit()
+            refdata.bump('jobs')
             flash('Job added successfully', 'success')
         return redirect(url_for('payroll.manage_jobs'))
 
-    jobs = Job.query.all()
-    return render_template('jobs.html', jobs=jobs)
+    return render_template('jobs.html', jobs=refdata.rows('jobs'))
 
 
 @payroll_bp.route('/admin/jobs/delete/<int:id>', methods=['POST'])
@@ -188,6 +285,7 @@ def delete_job(id):
     job = Job.query.get_or_404(id)
     db.session.delete(job)
     db.session.commit()
+    refdata.bump('jobs')
     flash('Job deleted successfully', 'success')
     return redirect(url_for('payroll.manage_jobs'))
 
@@ -199,17 +297,21 @@ def delete_job(id):
 def manage_elements():
     if request.method == 'POST':
         # Read values from form
-        transport = float(request.form.get('transport_allowance', 0))
-        utility = float(request.form.get('utility_allowance', 0))
-        extra_duty = float(request.form.get('extra_duty_allowance', 0))
-        other_allow = float(request.form.get('other_allowance', 0))
-        overtime = float(request.form.get('overtime', 0))
-
-        ssd = float(request.form.get('social_security_deduction', 0))
-        tax = float(request.form.get('tax_deduction', 0))
-        loan1 = float(request.form.get('loan1_deduction', 0))
-        loan2 = float(request.form.get('loan2_deduction', 0))
-        other_ded = float(request.form.get('other_deductions', 0))
+        try:
+            transport = Money.from_cedis(request.form.get('transport_allowance'))
+            utility = Money.from_cedis(request.form.get('utility_allowance'))
+            extra_duty = Money.from_cedis(request.form.get('extra_duty_allowance'))
+            other_allow = Money.from_cedis(request.form.get('other_allowance'))
+            overtime = Money.from_cedis(request.form.get('overtime'))
+
+            ssd = Money.from_cedis(request.form.get('social_security_deduction'))
+            tax = Money.from_cedis(request.form.get('tax_deduction'))
+            loan1 = Money.from_cedis(request.form.get('loan1_deduction'))
+            loan2 = Money.from_cedis(request.form.get('loan2_deduction'))
+            other_ded = Money.from_cedis(request.form.get('other_deductions'))
+        except ValueError as e:
+            flash(f'Error adding element: {e}', 'danger')
+            return redirect(url_for('payroll.manage_elements'))
 
         # Create and save new element
         element = Element(
@@ -226,97 +328,262 @@ def manage_elements():
         )
         db.session.add(element)
         db.session.commit()
+        refdata.bump('elements')
         flash('New element added successfully!', 'success')
         return redirect(url_for('payroll.manage_elements'))
 
-    elements = Element.query.all()
-    return render_template('manage_elements.html', elements=elements)
+    return render_template('manage_elements.html', elements=refdata.rows('elements'))
 
 
 
-# --------------------- PAYROLL ------------------------------------
+# ------------------- PAYROLL RECORDS -----------------------------
 
-def calculate_payroll(employee):
-    grade_salary = employee.grade.salary
-    element = employee.element 
+@payroll_bp.route('/admin/generate_payroll', methods=['GET', 'POST'])
+@login_required
+def generate_payroll():
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
 
-    allowance_total = element.allowances or 0
-    deduction_total = element.deductions or 0
+    if request.method == 'POST':
+        month = request.form.get('month')
+        year = request.form.get('year', '').strip()
+        if month not in MONTHS:
+            flash('Select a valid payroll month.', 'danger')
+            return redirect(url_for('payroll.generate_payroll'))
+        if not year.isdigit():
+            flash('Enter the payroll year as a number, e.g. 2025.', 'danger')
+            return redirect(url_for('payroll.generate_payroll'))
+        year = int(year)
+        if is_archived(period_key(month, year)):
+            flash(f'{month} {year} is archived and cannot be regenerated.', 'danger')
+            return redirect(url_for('payroll.generate_payroll'))
+
+        if request.form.get('preview'):
+            # A dry run: nothing is written until the preview is committed.
+            threshold = request.form.get('threshold')
+            try:
+                threshold = Money.from_cedis(threshold) if threshold else None
+            except ValueError:
+                flash('The change threshold must be an amount in GH₵.', 'danger')
+                return redirect(url_for('payroll.generate_payroll'))
+            return job_accepted(submit_job('payroll_preview', {
+                'month': month,
+                'year': year,
+                'threshold': threshold,
+            }, user_id=current_user.id))
+
+        # Runs in the background job runner; the request returns at once.
+        try:
+            job = submit_job('payroll', {
+                'month': month,
+                'year': year,
+                'mode': request.form.get('mode', 'single'),
+                'full': bool(request.form.get('full')),
+            }, user_id=current_user.id)
+        except ValueError as e:
+            return job_rejected(str(e), 'payroll.generate_payroll')
+        return job_accepted(job)
 
-    net_pay = grade_salary + allowance_total - deduction_total
+    return render_template('generate_payroll.html', runs=incomplete_runs())
 
-    return {
-        'basic_salary': grade_salary,
-        'allowances': allowance_total,
-        'deductions': deduction_total,
-        'net_pay': net_pay
-    }
 
+@payroll_bp.route('/admin/payroll-runs/<int:run_id>/resume', methods=['POST'])
+@login_required
+def resume_payroll_run(run_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    run = PayrollRun.query.get_or_404(run_id)
+    try:
+        job = submit_job('payroll_resume', {'run_id': run_id, 'month': run.month, 'year': run.year},
+                         user_id=current_user.id)
+    except ValueError as e:
+        return job_rejected(str(e), 'payroll.generate_payroll')
+    return job_accepted(job)
 
-# ------------------- PAYROLL RECORDS -----------------------------
 
-@payroll_bp.route('/admin/generate_payroll', methods=['GET', 'POST'])
+# ------------------------ PAYROLL PREVIEWS ----------------------------------
+
+def _preview_ready(job):
+    return job.kind == 'payroll_preview' and job.status == 'completed' and job.output_path
+
+
+@payroll_bp.route('/admin/payroll-previews/<int:job_id>')
 @login_required
-def generate_payroll():
-    if request.method == 'POST':
-        month = request.form.get('month')
-        year = int(request.form.get('year'))
-        employees = Employee.query.all()
-
-        for emp in employees:
-            grade = emp.grade
-            element = emp.element
-
-            if not grade or not element:
-                continue  # Skip if data is incomplete
-
-            base_salary = grade.salary or 0
-            allowances = (
-                element.transport_allowance +
-                element.utility_allowance +
-                element.extra_duty_allowance +
-                element.other_allowance +
-                element.overtime
-            )
+def payroll_preview(job_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
 
-            deductions = (
-                element.social_security_deduction +
-                element.tax_deduction +
-                element.loan1_deduction +
-                element.loan2_deduction +
-                element.other_deductions
-            )
+    job = BackgroundJob.query.get_or_404(job_id)
+    if not _preview_ready(job):
+        flash('This job has no payroll preview to show.', 'danger')
+        return redirect(url_for('payroll.job_status_page', job_id=job_id))
 
-            gross = base_salary + allowances
-            net = gross - deductions
-
-            payroll = Payroll(
-                employee_id=emp.employee_id,
-                grade_id=emp.grade_id,
-                element_id=emp.element_id,
-                month=month,
-                year=year,
-                gross_salary=gross,
-                total_deductions=deductions,
-                net_pay=net
-            )
-            db.session.add(payroll)
+    preview = Preview(job.output_path)
+    rows, next_cursor = diff_page(preview, after=request.args.get('after'))
+    return render_template('payroll_preview.html', job=job, preview=preview, rows=rows, next_cursor=next_cursor)
 
-        db.session.commit()
-        flash('Payroll generated successfully.', 'success')
-        return redirect(url_for('payroll.admin_dashboard'))
 
-    return render_template('generate_payroll.html')
+@payroll_bp.route('/admin/payroll-previews/<int:job_id>/commit', methods=['POST'])
+@login_required
+def commit_payroll_preview(job_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    job = BackgroundJob.query.get_or_404(job_id)
+    if not _preview_ready(job):
+        flash('This job has no payroll preview to commit.', 'danger')
+        return redirect(url_for('payroll.job_status_page', job_id=job_id))
+
+    period = json.loads(job.params)
+    try:
+        commit = submit_job('payroll_commit', {
+            'preview_job_id': job.job_id,
+            'month': period['month'],
+            'year': period['year'],
+        }, user_id=current_user.id)
+    except ValueError as e:
+        return job_rejected(str(e), 'payroll.payroll_preview', job_id=job_id)
+    return job_accepted(commit)
+
 
+# ------------------------ BACKGROUND JOBS -----------------------------------
 
+def job_accepted(job):
+    # API clients get the id straight away; browsers go to the progress page.
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202
+    return redirect(url_for('payroll.job_status_page', job_id=job.job_id))
+
+
+def job_rejected(message, endpoint, **values):
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(error=message), 409
+    flash(message, 'danger')
+    return redirect(url_for(endpoint, **values))
+
+
+@payroll_bp.route('/admin/jobs/<kind>', methods=['POST'])
+@login_required
+def start_period_job(kind):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    month = request.form.get('month')
+    year = request.form.get('year', type=int)
+    if kind not in ('payslips_zip', 'export') or month not in MONTHS or not year:
+        flash('Unknown job.', 'danger')
+        return redirect(url_for('payroll.view_payroll_records'))
+
+    params = {'month': month, 'year': year}
+    if kind == 'export':
+        params['kind'] = request.form.get('export_kind')
+        params['format'] = request.form.get('format')
+        if params['kind'] not in EXPORTS or params['format'] not in FORMATS:
+            flash('Unknown export.', 'danger')
+            return redirect(url_for('payroll.view_payroll_records'))
+
+    return job_accepted(submit_job(kind, params, user_id=current_user.id))
+
+
+@payroll_bp.route('/admin/jobs/<int:job_id>')
+@login_required
+def job_status_page(job_id):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    job = BackgroundJob.query.get_or_404(job_id)
+    return render_template('job_status.html', job=job)
+
+
+@payroll_bp.route('/admin/jobs/<int:job_id>/status')
+@login_required
+def job_status(job_id):
+    if current_user.role != 'admin':
+        return jsonify(error='Forbidden'), 403
+
+    # Polled by the progress page: a single primary-key lookup.
+    job = BackgroundJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+
+@payroll_bp.route('/admin/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = BackgroundJob.query.get_or_404(job_id)
+    if current_user.role != 'admin' or job.status != 'completed' or not job.output_path:
+        flash('Nothing to download for this job.', 'danger')
+        return redirect(url_for('payroll.job_status_page', job_id=job_id))
+    return send_file(job.output_path, as_attachment=True,
+                     download_name=os.path.basename(job.output_path).split('-', 1)[1])
+
+
+
+
+# ------------------------ ANALYTICS -----------------------------------------
+
+@payroll_bp.route('/admin/analytics')
+@login_required
+def analytics():
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    grouping, metric, year, month = parse_analytics_args(request.args)
+    return render_template(
+        'analytics.html',
+        rows=rollup(grouping, year, month),
+        grouping=grouping, metric=metric, year=year, month=month,
+        metrics=METRICS,
+    )
+
+
+@payroll_bp.route('/admin/analytics/data')
+@login_required
+def analytics_data():
+    if current_user.role != 'admin':
+        return jsonify(error='Forbidden'), 403
+
+    grouping, metric, year, month = parse_analytics_args(request.args)
+    return jsonify(group_by=grouping, year=year, month=month, rows=rollup(grouping, year, month))
+
+
+@payroll_bp.route('/admin/analytics/chart.png')
+@login_required
+def analytics_chart():
+    if current_user.role != 'admin':
+        return jsonify(error='Forbidden'), 403
+
+    grouping, metric, year, month = parse_analytics_args(request.args)
+    digest, png = chart_png(grouping, metric, rollup(grouping, year, month))
+    if request.if_none_match.contains(digest):
+        response = make_response('', 304)
+    else:
+        response = make_response(png)
+        response.mimetype = 'image/png'
+    response.set_etag(digest)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 # ------------------ VIEW PAYROLL RECORDS -------------------------------
 
 @payroll_bp.route('/admin/payroll-records')
+@login_required
 def view_payroll_records():
-    records = Payroll.query.order_by(Payroll.year.desc(), Payroll.month.desc()).all()
-    return render_template('payroll_records.html', records=records)
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+
+    filters = parse_filters(request.args)
+    records, next_cursor = payroll_records_page(filters, after=request.args.get('after'))
+    return render_template(
+        'payroll_records.html',
+        records=records,
+        filters=filters,
+        next_cursor=next_cursor,
+        departments=refdata.rows('departments'),
+        grades=refdata.rows('grades'),
+    )
 
 
 
@@ -328,9 +595,7 @@ def view_payslips():
     if current_user.role != 'employee':
         return redirect(url_for('payroll.admin_dashboard'))
 
-    payslips = Payroll.query.filter_by(employee_id=current_user.employee_id).order_by(
-        Payroll.year.desc(), Payroll.month.desc()
-    ).all()
+    payslips = employee_payslips(current_user.employee_id)
 
     return render_template('view_payslips.html', payslips=payslips)
 
@@ -341,34 +606,65 @@ def view_payslips():
 @payroll_bp.route('/employee/payslip/<int:payroll_id>/download')
 @login_required
 def download_payslip(payroll_id):
-    payslip = Payroll.query.filter_by(payroll_id=payroll_id, employee_id=current_user.employee_id).first()
+    payslip = find_payslip(payroll_id, current_user.employee_id)
 
     if not payslip:
         flash("Payslip not found", "danger")
         return redirect(url_for('payroll.view_payslips'))
 
-    # PDF creation
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    p.setFont("Helvetica", 12)
-
-    # Header
-    p.drawString(100, 750, "Payslip")
-    p.drawString(100, 735, f"Name: {payslip.employee.first_name} {payslip.employee.surname}")
-    p.drawString(100, 720, f"Employee ID: {payslip.employee.employee_id}")
-    p.drawString(100, 705, f"Period: {payslip.month} {payslip.year}")
-
-    # Payroll Details
-    p.drawString(100, 680, f"Basic Salary: {payslip.gross_salary - payslip.total_deductions:.2f}")
-    p.drawString(100, 665, f"Gross Salary: {payslip.gross_salary:.2f}")
-    p.drawString(100, 650, f"Total Deductions: {payslip.total_deductions:.2f}")
-    p.drawString(100, 635, f"Net Pay: {payslip.net_pay:.2f}")
-
-    p.showPage()
-    p.save()
-
-    buffer.seek(0)
-    response = make_response(buffer.read())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=payslip_{payslip.month}_{payslip.year}.pdf'
+    # A payroll row only changes when it is regenerated, and then its
+    # content hash (the ETag) changes with it.
+    data = payslip_data(payslip, payslip.employee, payslip_ytd(payslip))
+    etag = content_hash(data)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+    else:
+        response = send_file(
+            cached_payslip(data, etag),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=payslip_filename(data),
+            etag=etag,
+            last_modified=payslip.generated_at,
+            conditional=True,
+        )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+# ------------------------ BULK PAYSLIPS -------------------------------------
+
+@payroll_bp.route('/admin/payslips/<int:year>/<month>.zip')
+@login_required
+def download_period_payslips(year, month):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+    if month not in MONTHS:
+        flash('Unknown payroll month.', 'danger')
+        return redirect(url_for('payroll.view_payroll_records'))
+
+    response = Response(
+        stream_with_context(stream_period_zip(period_key(month, year))),
+        mimetype='application/zip',
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename=payslips_{month}_{year}.zip'
+    return response
+
+
+# ------------------------ EXPORTS -------------------------------------------
+
+@payroll_bp.route('/admin/exports/<int:year>/<month>/<kind>.<fmt>')
+@login_required
+def export_payroll(year, month, kind, fmt):
+    if current_user.role != 'admin':
+        return redirect(url_for('payroll.employee_dashboard'))
+    if month not in MONTHS or kind not in EXPORTS or fmt not in FORMATS:
+        flash('Unknown export.', 'danger')
+        return redirect(url_for('payroll.view_payroll_records'))
+
+    mimetype, chunks = stream_export(kind, fmt, period_key(month, year))
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(kind, fmt, month, year)}'
     return response
@@ -0,0 +1,183 @@
+"""Synthetic data for local runs and benchmarks.
+
+    python -m app.seed --database sqlite:///payroll_dev.db --employees 10000 --history-months 12
+    flask payroll seed --employees 10000        # against the configured database
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.analytics import refresh_period
+from app.assignments import initial_assignments
+from app.calculator import batch_select, calculate, load_batch
+from app.config import Config
+from app.models import Department, Element, ElementAssignment, Employee, Grade, GradeAssignment, Job, Payroll, User
+from app.money import Money
+from app.payroll_engine import payroll_rows
+from app.periods import MONTHS, period_end, period_key
+from app.reconciliation import refresh_digests
+from app.refdata import REFERENCE_TABLES, refdata
+from app.statutory import rules_for
+from app.ytd import refresh_ytd
+
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ('Kwame', 'Ama', 'Kofi', 'Akosua', 'Yaw', 'Abena', 'Kwabena', 'Efua', 'Kojo', 'Adwoa',
+               'Kwaku', 'Yaa', 'Fiifi', 'Esi', 'Nii', 'Naa', 'Kweku', 'Afua', 'Ekow', 'Aba')
+SURNAMES = ('Mensah', 'Owusu', 'Boateng', 'Asante', 'Osei', 'Agyeman', 'Appiah', 'Darko', 'Addo', 'Tetteh',
+            'Quaye', 'Lamptey', 'Ansah', 'Amoah', 'Badu', 'Frimpong', 'Nkrumah', 'Ofori', 'Acheampong', 'Sarpong')
+BANKS = ('GCB Bank', 'Ecobank', 'Fidelity Bank', 'Stanbic Bank', 'Absa Bank', 'CalBank')
+
+
+def history_periods(months, end_month, end_year):
+    """The `months` periods ending with (end_month, end_year), oldest first."""
+    index = end_year * 12 + MONTHS.index(end_month)
+    return [(MONTHS[i % 12], i // 12) for i in range(index - months + 1, index + 1)]
+
+
+def _insert(model, rows, batch_size=BATCH_SIZE):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(model), rows[start:start + batch_size])
+    db.session.commit()
+
+
+def _amount(rng, low, high):
+    return Money(rng.randint(low * 100, high * 100))
+
+
+# ------------------------- REFERENCE DATA ------------------------------
+
+def seed_reference_data(rng, departments, grades, jobs, elements):
+    _insert(Department, [{'department_name': f"Department {i + 1}"} for i in range(departments)])
+    _insert(Grade, [
+        {'grade_name': f"Grade {i + 1}", 'salary': _amount(rng, 1500 + i * 400, 1900 + i * 400)}
+        for i in range(grades)
+    ])
+    _insert(Job, [{'job_name': f"Job {i + 1}", 'job_description': None} for i in range(jobs)])
+    _insert(Element, [
+        {
+            'transport_allowance': _amount(rng, 50, 400),
+            'utility_allowance': _amount(rng, 0, 250),
+            'extra_duty_allowance': _amount(rng, 0, 300),
+            'other_allowance': _amount(rng, 0, 150),
+            'overtime': _amount(rng, 0, 500),
+            'social_security_deduction': _amount(rng, 80, 300),
+            'tax_deduction': _amount(rng, 100, 900),
+            'loan1_deduction': _amount(rng, 0, 400) if rng.random() < 0.3 else Money(0),
+            'loan2_deduction': _amount(rng, 0, 200) if rng.random() < 0.1 else Money(0),
+            'other_deductions': _amount(rng, 0, 50),
+        }
+        for _ in range(elements)
+    ])
+    for name in REFERENCE_TABLES:
+        refdata.bump(name)
+
+    def ids(column):
+        return list(db.session.execute(db.select(column).order_by(column)).scalars())
+
+    return ids(Department.department_id), ids(Grade.grade_id), ids(Job.job_id), ids(Element.element_id)
+
+
+# ------------------------- EMPLOYEES -----------------------------------
+
+def seed_employees(rng, count, department_ids, grade_ids, job_ids, element_ids):
+    start = (db.session.execute(db.select(db.func.max(Employee.employee_id))).scalar() or 0) + 1
+    employees, users = [], []
+    for employee_id in range(start, start + count):
+        employees.append({
+            'employee_id': employee_id,
+            'grade_id': rng.choice(grade_ids),
+            'department_id': rng.choice(department_ids),
+            'job_id': rng.choice(job_ids),
+            'element_id': rng.choice(element_ids),
+            'first_name': rng.choice(FIRST_NAMES),
+            'surname': rng.choice(SURNAMES),
+            'date_of_birth': date(rng.randint(1960, 2003), rng.randint(1, 12), rng.randint(1, 28)),
+            'bank_name': rng.choice(BANKS),
+            'bank_account_number': f"{rng.randint(10**12, 10**13 - 1)}",
+        })
+        users.append({'username': f"emp{employee_id}", 'role': 'employee', 'employee_id': employee_id})
+    _insert(Employee, employees)
+    _insert(User, users)
+    assignments = initial_assignments(employees)
+    _insert(GradeAssignment, assignments['grade'])
+    _insert(ElementAssignment, assignments['element'])
+    return count
+
+
+# ------------------------- PAYROLL HISTORY -----------------------------
+
+def seed_history(periods):
+    # Rows are inserted directly: the periods are empty.
+    for month, year in periods:
+        as_of = period_end(period_key(month, year))
+        result = calculate(load_batch(batch_select(as_of)), rules_for(month, year))
+        _insert(Payroll, payroll_rows(result, month, year, datetime(year, MONTHS.index(month) + 1, 25)))
+        refresh_period(period_key(month, year))
+        refresh_digests(period_key(month, year))
+        db.session.commit()
+    for year in sorted({year for _, year in periods}):
+        refresh_ytd(year)
+    db.session.commit()
+    return len(result) * len(periods) if periods else 0
+
+
+def seed(employees=1000, departments=20, grades=15, jobs=40, elements=25, history_months=12,
+         end_month=None, end_year=None, random_seed=42, admin=True):
+    """Populate the current (normally empty) database; returns row counts."""
+    rng = random.Random(random_seed)
+    today = date.today()
+    end_month = end_month or MONTHS[today.month - 1]
+    end_year = end_year or today.year
+
+    if admin and not db.session.execute(db.select(User.id).where(User.username == 'admin')).first():
+        _insert(User, [{'username': 'admin', 'role': 'admin', 'employee_id': None}])
+
+    reference_ids = seed_reference_data(rng, departments, grades, jobs, elements)
+    seed_employees(rng, employees, *reference_ids)
+    payroll = seed_history(history_periods(history_months, end_month, end_year))
+    return {
+        'departments': departments, 'grades': grades, 'jobs': jobs, 'elements': elements,
+        'employees': employees, 'payroll': payroll,
+    }
+
+
+# ------------------------- COMMAND LINE --------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a database with synthetic payroll data.')
+    parser.add_argument('--database', default=Config.SQLALCHEMY_DATABASE_URI,
+                        help='SQLAlchemy URL, e.g. sqlite:///payroll_dev.db or mysql+pymysql://user:pw@localhost/db')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate all tables first.')
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--departments', type=int, default=20)
+    parser.add_argument('--grades', type=int, default=15)
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--elements', type=int, default=25)
+    parser.add_argument('--history-months', type=int, default=12, help='Payroll periods to generate.')
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args()
+
+    class SeedConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database
+
+    app = create_app(SeedConfig)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        counts = seed(
+            employees=args.employees, departments=args.departments, grades=args.grades, jobs=args.jobs,
+            elements=args.elements, history_months=args.history_months, random_seed=args.random_seed,
+        )
+    print(', '.join(f"{name}: {count:,}" for name, count in counts.items()))
+    print(f"elapsed: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
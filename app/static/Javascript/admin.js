@@ -1,14 +1,75 @@
 // admin.js
 
+const SEARCH_DELAY_MS = 250;
+
+function employeeRow(emp) {
+  const row = document.createElement("tr");
+  [emp.employee_id, emp.name, emp.department || ""].forEach(value => {
+    const cell = document.createElement("td");
+    cell.textContent = value;
+    row.appendChild(cell);
+  });
+  const actions = document.createElement("td");
+  const link = document.createElement("a");
+  link.href = "#";
+  link.className = "view-link";
+  link.dataset.empid = emp.employee_id;
+  link.textContent = "View Payslip";
+  actions.appendChild(link);
+  row.appendChild(actions);
+  return row;
+}
+
 document.addEventListener("DOMContentLoaded", function () {
-  const links = document.querySelectorAll(".view-link");
-
-  links.forEach(link => {
-    link.addEventListener("click", function (e) {
-      e.preventDefault();
-      const empId = this.getAttribute("data-empid");
-      alert(`Payslip preview for Employee ID: ${empId} (feature coming soon)`);
-      // In the future: window.location.href = `/admin/payslip/${empId}`;
-    });
+  const form = document.getElementById("employee-search-form");
+  const rows = document.getElementById("employee-rows");
+  const pagination = document.getElementById("employee-pagination");
+  let timer = null;
+  let pending = null;
+
+  // Delegated so rows replaced by a search keep working.
+  rows.addEventListener("click", function (e) {
+    const link = e.target.closest(".view-link");
+    if (!link) return;
+    e.preventDefault();
+    const empId = link.getAttribute("data-empid");
+    alert(`Payslip preview for Employee ID: ${empId} (feature coming soon)`);
+    // In the future: window.location.href = `/admin/payslip/${empId}`;
   });
+
+  function search() {
+    const params = new URLSearchParams(new FormData(form));
+    if (pending) pending.abort();
+    pending = new AbortController();
+
+    fetch(`${form.dataset.searchUrl}?${params}`, { signal: pending.signal })
+      .then(response => response.json())
+      .then(data => {
+        rows.replaceChildren(...data.results.map(employeeRow));
+        if (!data.results.length) {
+          rows.innerHTML = '<tr><td colspan="4">No employees found.</td></tr>';
+        }
+        // Further pages are served by the paginated dashboard itself.
+        pagination.innerHTML = "";
+        if (data.next_cursor) {
+          params.set("after", data.next_cursor);
+          const next = document.createElement("a");
+          next.href = `?${params}`;
+          next.textContent = "Next page";
+          pagination.appendChild(next);
+        }
+        history.replaceState(null, "", `?${new URLSearchParams(new FormData(form))}`);
+      })
+      .catch(err => {
+        if (err.name !== "AbortError") console.error(err);
+      });
+  }
+
+  function schedule() {
+    clearTimeout(timer);
+    timer = setTimeout(search, SEARCH_DELAY_MS);
+  }
+
+  form.addEventListener("input", schedule);
+  form.addEventListener("change", schedule);
 });
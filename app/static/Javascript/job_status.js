@@ -0,0 +1,36 @@
+// job_status.js
+
+document.addEventListener("DOMContentLoaded", function () {
+  const container = document.getElementById("job");
+  const statusUrl = container.getAttribute("data-status-url");
+
+  function render(job) {
+    document.getElementById("job-status").textContent = job.status;
+    document.getElementById("job-progress").textContent =
+      job.progress_total ? `${job.progress_done} / ${job.progress_total}` : `${job.progress_done}`;
+
+    const bar = document.getElementById("job-bar");
+    bar.max = job.progress_total || 1;
+    bar.value = job.progress_done;
+
+    if (job.elapsed_seconds !== null) {
+      document.getElementById("job-elapsed").textContent = `${job.elapsed_seconds.toFixed(1)} s`;
+    }
+    document.getElementById("job-message").textContent = job.message || "";
+    document.getElementById("job-download").hidden = !(job.status === "completed" && job.has_output);
+  }
+
+  function poll() {
+    fetch(statusUrl, { headers: { "Accept": "application/json" } })
+      .then(response => response.json())
+      .then(job => {
+        render(job);
+        if (job.status === "queued" || job.status === "running") {
+          setTimeout(poll, 1000);
+        }
+      })
+      .catch(() => setTimeout(poll, 5000));
+  }
+
+  poll();
+});
@@ -0,0 +1,175 @@
+"""Statutory deductions: progressive PAYE and SSNIT schedules.
+
+Schedules are StatutoryTable rows with their brackets, versioned and
+effective-dated. They are compiled into sorted int64 threshold arrays and
+evaluated for a whole PayrollBatch with one searchsorted call each.
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+
+from app import db
+from app.calculator import DEDUCTION_FIELDS
+from app.models import StatutoryBracket, StatutoryTable
+from app.money import Money, to_minor
+from app.periods import period_end, period_key
+from app.refdata import refdata
+
+
+KINDS = ('paye', 'ssnit')
+BASIS_POINTS = 10_000
+
+SSNIT_COLUMN = DEDUCTION_FIELDS.index('social_security_deduction')
+TAX_COLUMN = DEDUCTION_FIELDS.index('tax_deduction')
+
+# Monthly GRA PAYE bands and the 5.5% employee SSNIT contribution, as
+# (lower bound, rate %) pairs, for `flask payroll statutory-add --preset`.
+PRESETS = {
+    'gh-2024-paye': ('paye', [
+        ('0', '0'), ('490', '5'), ('600', '10'), ('730', '17.5'),
+        ('3896.67', '25'), ('19896.67', '30'), ('50416.67', '35'),
+    ]),
+    'gh-ssnit-employee': ('ssnit', [('0', '5.5')]),
+}
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+# ------------------------- COMPILED SCHEDULES --------------------------
+
+class BracketSchedule:
+    """A progressive schedule over amounts in pesewas.
+
+    thresholds are the sorted bracket lower bounds (the first is 0) and
+    rates the matching rates in basis points. base[i] is the charge on
+    everything below thresholds[i], kept in pesewa-basis-points so the
+    whole evaluation is exact integer arithmetic until one final rounding.
+    """
+
+    def __init__(self, thresholds, rates):
+        thresholds = np.asarray(thresholds, dtype=np.int64)
+        rates = np.asarray(rates, dtype=np.int64)
+        if not len(thresholds) or thresholds[0] != 0:
+            thresholds = np.concatenate(([0], thresholds))
+            rates = np.concatenate(([0], rates))
+        if np.any(np.diff(thresholds) <= 0):
+            raise ValueError("Bracket lower bounds must be strictly increasing.")
+        self.thresholds = thresholds
+        self.rates = rates
+        self.base = np.concatenate(([0], np.cumsum(np.diff(thresholds) * rates[:-1])))
+
+    def evaluate(self, amounts):
+        amounts = np.maximum(np.asarray(amounts, dtype=np.int64), 0)
+        band = np.searchsorted(self.thresholds, amounts, side='right') - 1
+        charge = self.base[band] + (amounts - self.thresholds[band]) * self.rates[band]
+        # Round half up to the nearest pesewa.
+        return (charge + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def compile_schedule(brackets):
+    """brackets: iterable of (lower_bound, rate %), bounds in pesewas."""
+    brackets = sorted((to_minor(lower), int(Decimal(rate) * 100)) for lower, rate in brackets)
+    return BracketSchedule([lower for lower, _ in brackets], [rate for _, rate in brackets])
+
+
+# ------------------------- LOADING -------------------------------------
+
+def effective_table(kind, as_of):
+    """The latest version of kind in effect on as_of, or None."""
+    candidates = [
+        t for t in refdata.rows('statutory_tables')
+        if t.kind == kind and t.effective_from <= as_of
+    ]
+    return max(candidates, key=lambda t: (t.effective_from, t.version), default=None)
+
+
+def _schedule(table, fresh=False):
+    key = (table.table_id, refdata.version('statutory_brackets'))
+    with _compiled_lock:
+        if key in _compiled:
+            return _compiled[key]
+
+    by_table = defaultdict(list)
+    for bracket in refdata.rows('statutory_brackets', fresh):
+        by_table[bracket.table_id].append((bracket.lower_bound, bracket.rate))
+    schedule = compile_schedule(by_table[table.table_id])
+
+    with _compiled_lock:
+        _compiled[key] = schedule
+    return schedule
+
+
+class StatutoryRules:
+    """The PAYE and SSNIT schedules in effect for one payroll period.
+
+    A kind with no table in effect keeps the flat amount from the
+    employee's element, as before statutory tables existed.
+    """
+
+    def __init__(self, as_of, fresh=False):
+        self.as_of = as_of
+        if fresh:
+            refdata.rows('statutory_tables', fresh=True)
+        self.tables = {kind: effective_table(kind, as_of) for kind in KINDS}
+        # Brackets never change once stored, so a table's compiled schedule
+        # stays valid.
+        self.schedules = {kind: _schedule(t, fresh) for kind, t in self.tables.items() if t is not None}
+
+    def __bool__(self):
+        return bool(self.schedules)
+
+    @property
+    def changed_at(self):
+        """When the newest table in effect was created, or None."""
+        return max((t.created_at for t in self.tables.values() if t is not None), default=None)
+
+    def apply(self, batch):
+        # SSNIT is charged on basic salary; PAYE on gross less the employee's
+        # SSNIT contribution.
+        if 'ssnit' in self.schedules:
+            batch.deductions[:, SSNIT_COLUMN] = self.schedules['ssnit'].evaluate(batch.basic)
+        if 'paye' in self.schedules:
+            chargeable = batch.basic + batch.allowances.sum(axis=1) - batch.deductions[:, SSNIT_COLUMN]
+            batch.deductions[:, TAX_COLUMN] = self.schedules['paye'].evaluate(chargeable)
+        return batch
+
+
+def rules_for(month, year):
+    # As of the period's last day, like grade and element assignments, so a
+    # table taking effect mid-month applies to that month's run. Runs read
+    # the tables through to the database, like their amounts.
+    return StatutoryRules(period_end(period_key(month, year)), fresh=True)
+
+
+# ------------------------- MAINTENANCE ---------------------------------
+
+def add_table(kind, effective_from, brackets, description=None):
+    """Store brackets [(lower_bound, rate %)] as the next version of kind."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown statutory table kind: {kind}")
+    try:
+        brackets = [(Money.from_cedis(lower), Decimal(rate)) for lower, rate in brackets]
+    except (ArithmeticError, ValueError):
+        raise ValueError("Brackets must be numeric (lower bound, rate) pairs.")
+    if not brackets:
+        raise ValueError("A statutory table needs at least one bracket.")
+    for lower, rate in brackets:
+        if lower < 0 or not 0 <= rate <= 100:
+            raise ValueError(f"Invalid bracket {lower}: {rate}%")
+    compile_schedule(brackets)  # rejects duplicate lower bounds
+
+    latest = db.session.execute(
+        db.select(db.func.max(StatutoryTable.version)).where(StatutoryTable.kind == kind)
+    ).scalar() or 0
+    table = StatutoryTable(
+        kind=kind, version=latest + 1, effective_from=effective_from, description=description,
+        brackets=[StatutoryBracket(lower_bound=lower, rate=rate) for lower, rate in brackets],
+    )
+    db.session.add(table)
+    db.session.commit()
+    refdata.bump('statutory_tables')
+    refdata.bump('statutory_brackets')
+    return table
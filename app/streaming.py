@@ -0,0 +1,48 @@
+import io
+import zipfile
+
+
+class ZipSink(io.RawIOBase):
+    # Non-seekable target for ZipFile; written bytes are handed out by drain().
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def stream_zip(files, compression=zipfile.ZIP_STORED):
+    # files: iterable of (name, content) where content is bytes or an
+    # iterable of byte chunks. Yields the archive as it is written; only the
+    # current chunk is ever held in memory.
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, mode='w', compression=compression) as archive:
+        for name, content in files:
+            if isinstance(content, bytes):
+                archive.writestr(name, content)
+            else:
+                with archive.open(name, mode='w', force_zip64=True) as member:
+                    for chunk in content:
+                        member.write(chunk)
+                        yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def counted(items, callback, every=100):
+    # Pass items through, calling callback(n) every `every` items and at the end.
+    n = 0
+    for n, item in enumerate(items, 1):
+        yield item
+        if n % every == 0:
+            callback(n)
+    callback(n)
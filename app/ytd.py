@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from sqlalchemy import and_, delete, func, insert, literal, select, type_coerce
+
+from app import db
+from app.archive import ytd_arrays
+from app.models import Payroll, PayrollYtd
+from app.money import Money, MoneyType, to_minor
+from app.periods import year_range
+
+
+YTD_FIELDS = ('gross_salary', 'tax_deduction', 'social_security_deduction', 'net_pay')
+YTD_LABELS = {
+    'gross_salary': 'YTD Gross Salary',
+    'tax_deduction': 'YTD Income Tax',
+    'social_security_deduction': 'YTD Social Security',
+    'net_pay': 'YTD Net Pay',
+}
+REFRESH_CHUNK = 500
+
+
+# ------------------------- MAINTENANCE ---------------------------------
+
+def _refresh(year, employee_ids=None):
+    scope = [Payroll.period_key.between(*year_range(year))]
+    if employee_ids is not None:
+        scope.append(Payroll.employee_id.in_(employee_ids))
+
+    stale = delete(PayrollYtd).where(PayrollYtd.year == year)
+    if employee_ids is not None:
+        stale = stale.where(PayrollYtd.employee_id.in_(employee_ids))
+    db.session.execute(stale)
+
+    totals = (
+        select(
+            Payroll.employee_id,
+            literal(year),
+            *(func.sum(getattr(Payroll, field)) for field in YTD_FIELDS),
+            func.count(),
+            func.max(Payroll.period_key),
+            literal(datetime.utcnow(), db.DateTime),
+        )
+        .where(*scope)
+        .group_by(Payroll.employee_id)
+    )
+    db.session.execute(insert(PayrollYtd).from_select(
+        ['employee_id', 'year', *YTD_FIELDS, 'periods', 'through_period_key', 'updated_at'],
+        totals,
+    ))
+
+
+def refresh_ytd(year, employee_ids=None):
+    """Recompute the accumulators of employee_ids (all if None) for year.
+
+    Each employee costs at most twelve indexed payroll rows, so this is
+    cheap enough to run in the same transaction as every payroll write;
+    the caller commits.
+    """
+    if employee_ids is None:
+        _refresh(year)
+        return
+    employee_ids = list(employee_ids)
+    for start in range(0, len(employee_ids), REFRESH_CHUNK):
+        _refresh(year, employee_ids[start:start + REFRESH_CHUNK])
+
+
+# ------------------------- LOOKUPS -------------------------------------
+
+def ytd_columns(key, employee_id=None):
+    """YTD columns through period key, and the joins they need.
+
+    The accumulator covers the whole year so far; amounts of periods after
+    key (when an older payslip is reprinted) are subtracted using a grouped
+    subquery that is empty in the common, latest-period case. Pass
+    employee_id when selecting a single payslip, so that subquery reads only
+    that employee's later rows instead of the whole company's.
+    Returns (join(stmt) -> stmt, [labelled columns in YTD_FIELDS order]).
+    """
+    year = key // 100
+    later = (
+        select(Payroll.employee_id, *(func.sum(getattr(Payroll, f)).label(f) for f in YTD_FIELDS))
+        .where(Payroll.period_key > key, Payroll.period_key <= year_range(year)[1])
+        .group_by(Payroll.employee_id)
+    )
+    if employee_id is not None:
+        later = later.where(Payroll.employee_id == employee_id)
+    later = later.subquery('ytd_later')
+    columns = [
+        type_coerce(
+            func.coalesce(getattr(PayrollYtd, f), 0) - func.coalesce(getattr(later.c, f), 0), MoneyType()
+        ).label(f"ytd_{f}")
+        for f in YTD_FIELDS
+    ]
+
+    def join(stmt):
+        return (
+            stmt.outerjoin(PayrollYtd, and_(PayrollYtd.employee_id == Payroll.employee_id, PayrollYtd.year == year))
+            .outerjoin(later, later.c.employee_id == Payroll.employee_id)
+        )
+
+    return join, columns
+
+
+def payslip_ytd(payslip):
+    """{field: amount} through the payslip's period for one payroll row."""
+    if getattr(payslip, 'archived', False):
+        totals = ytd_arrays(payslip.period_key, YTD_FIELDS)
+        return {f: Money(totals[f][payslip.row_index]) for f in YTD_FIELDS}
+    join, columns = ytd_columns(payslip.period_key, payslip.employee_id)
+    stmt = join(select(*columns).select_from(Payroll)).where(Payroll.payroll_id == payslip.payroll_id)
+    return {f: Money(to_minor(v)) for f, v in zip(YTD_FIELDS, db.session.execute(stmt).one())}
@@ -0,0 +1,65 @@
+"""Row-loop vs vectorized payroll calculation.
+
+    python -m benchmarks.bench_calculator [sizes...]
+"""
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from app.calculator import ALLOWANCE_FIELDS, DEDUCTION_FIELDS, PayrollBatch, calculate
+
+
+def synthetic_batch(n, seed=0):
+    rng = np.random.default_rng(seed)
+    basic = rng.integers(100_000, 2_000_000, n)
+    allowances = rng.integers(0, 50_000, (n, len(ALLOWANCE_FIELDS)))
+    deductions = rng.integers(0, 80_000, (n, len(DEDUCTION_FIELDS)))
+    ids = np.arange(1, n + 1)
+    return PayrollBatch(ids, ids, ids, basic, allowances, deductions)
+
+
+def as_decimal_rows(batch):
+    # What the old route iterated over: one Decimal per Numeric(10, 2) column.
+    cents = Decimal('0.01')
+    return [
+        (
+            Decimal(int(batch.basic[i])) * cents,
+            [Decimal(int(v)) * cents for v in batch.allowances[i]],
+            [Decimal(int(v)) * cents for v in batch.deductions[i]],
+        )
+        for i in range(len(batch))
+    ]
+
+
+def row_loop(rows):
+    out = []
+    for basic, allowances, deductions in rows:
+        gross = basic + sum(allowances)
+        total_deductions = sum(deductions)
+        out.append((gross, total_deductions, gross - total_deductions))
+    return out
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return time.perf_counter() - start, value
+
+
+def main(sizes):
+    print(f"{'employees':>10} {'row loop (s)':>14} {'numpy (s)':>12} {'speedup':>9}")
+    for n in sizes:
+        batch = synthetic_batch(n)
+        rows = as_decimal_rows(batch)
+        loop_s, loop_out = timed(row_loop, rows)
+        vec_s, result = timed(calculate, batch)
+
+        # Both paths must agree to the pesewa.
+        assert int(result.net.sum()) == int(sum(net for _, _, net in loop_out) * 100)
+        print(f"{n:>10,} {loop_s:>14.4f} {vec_s:>12.4f} {loop_s / vec_s:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
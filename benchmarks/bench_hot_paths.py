@@ -0,0 +1,200 @@
+"""Latency and query counts of the payroll hot paths at several data volumes.
+
+    python -m benchmarks.bench_hot_paths [--sizes 1000,10000,100000] [--output results.json]
+    python -m benchmarks.bench_hot_paths --compare benchmarks/results/hot_paths-<old>.json
+
+Each size gets a fresh scratch SQLite database (or --database, which is
+reset) filled by app.seed. Results are written as JSON, tagged with the
+current commit, so runs can be compared across commits with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import sqlalchemy
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config import Config
+from app.identity import identity_cache
+from app.models import Payroll
+from app.payroll_engine import run_payroll
+from app.refdata import refdata
+from app.seed import history_periods, seed
+
+HISTORY_END = ('December', 2024)
+NEXT_PERIOD = ('January', 2025)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def measure(fn, counter, repeats):
+    timings, queries = [], []
+    for _ in range(repeats):
+        before = counter.count
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        queries.append(counter.count - before)
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'queries': max(queries),
+        'repeats': repeats,
+    }
+
+
+def _get(client, url, expect=200, headers=None):
+    def request():
+        response = client.get(url, headers=headers)
+        assert response.status_code == expect, (url, response.status_code)
+        response.get_data()
+    return request
+
+
+def run_size(employees, history_months, database, repeats, cache_dir):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database
+        PAYSLIP_CACHE_DIR = cache_dir
+        TESTING = True
+
+    app = create_app(BenchConfig)
+    results = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        refdata.clear()
+        identity_cache.clear()
+
+        start = time.perf_counter()
+        seed(employees=employees, history_months=history_months,
+             end_month=HISTORY_END[0], end_year=HISTORY_END[1])
+        seeded = time.perf_counter() - start
+        print(f"  seeded in {seeded:.1f}s")
+
+        counter = QueryCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+        # What the generate_payroll job does, run inline so it can be timed.
+        # The first run computes a new period; later ones find nothing changed.
+        results['generate_payroll (new period)'] = measure(
+            lambda: run_payroll(*NEXT_PERIOD, full=True), counter, 1)
+        results['generate_payroll (full recompute)'] = measure(
+            lambda: run_payroll(*NEXT_PERIOD, full=True), counter, repeats)
+        results['generate_payroll (incremental)'] = measure(
+            lambda: run_payroll(*NEXT_PERIOD), counter, repeats)
+
+        month, year = history_periods(1, *HISTORY_END)[0]
+        payroll_id = db.session.execute(
+            db.select(Payroll.payroll_id).where(Payroll.employee_id == 1).order_by(Payroll.period_key.desc())
+        ).scalar()
+        engine = db.engine
+        db.session.remove()
+
+    # Requests run outside the app context above so each gets its own `g`.
+    admin = app.test_client()
+    admin.post('/auth/login', data={'username': 'admin'})
+    employee = app.test_client()
+    employee.post('/auth/login', data={'username': 'emp1', 'employee_id': '1'})
+
+    results['admin_dashboard'] = measure(_get(admin, '/admin/dashboard'), counter, repeats)
+    results['view_payroll_records'] = measure(_get(admin, '/admin/payroll-records'), counter, repeats)
+    results['view_payroll_records (period filter)'] = measure(
+        _get(admin, f'/admin/payroll-records?month={month}&year={year}'), counter, repeats)
+    results['view_payslips'] = measure(_get(employee, '/employee/payslips'), counter, repeats)
+
+    download = f'/employee/payslip/{payroll_id}/download'
+    results['download_payslip (cold cache)'] = measure(
+        lambda: (shutil.rmtree(cache_dir, ignore_errors=True), _get(employee, download)()), counter, repeats)
+    results['download_payslip (warm cache)'] = measure(_get(employee, download), counter, repeats)
+    etag = employee.get(download).headers['ETag']
+    results['download_payslip (304)'] = measure(
+        _get(employee, download, expect=304, headers={'If-None-Match': etag}), counter, repeats)
+
+    event.remove(engine, 'before_cursor_execute', counter)
+    engine.dispose()
+    results['_seed_s'] = seeded
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline):
+    print(f"\nagainst {baseline['commit']} ({baseline['date']}):")
+    for size, cases in current['results'].items():
+        old_cases = baseline['results'].get(size, {})
+        for name, case in cases.items():
+            old = old_cases.get(name)
+            if name.startswith('_') or old is None:
+                continue
+            ratio = case['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+            queries = case['queries'] - old['queries']
+            print(f"  {size:>7} {name:<38} {ratio:6.2f}x time  {queries:+d} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma-separated employee counts.')
+    parser.add_argument('--history-months', type=int, default=12)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--database', default=None, help='SQLAlchemy URL to reset and use (default: scratch SQLite)')
+    parser.add_argument('--output', default=None, help='JSON file (default: benchmarks/results/hot_paths-<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results file to compare against.')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    scratch = tempfile.mkdtemp(prefix='bench_hot_paths-')
+    report = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'database': 'sqlite' if args.database is None else sqlalchemy.engine.make_url(args.database).get_backend_name(),
+        'history_months': args.history_months,
+        'results': {},
+    }
+    try:
+        for size in (int(s) for s in args.sizes.split(',')):
+            print(f"{size:,} employees")
+            database = args.database or f"sqlite:///{os.path.join(scratch, f'{size}.db')}"
+            results = run_size(size, args.history_months, database, args.repeats, os.path.join(scratch, 'payslips'))
+            report['results'][str(size)] = results
+            for name, case in results.items():
+                if not name.startswith('_'):
+                    print(f"  {name:<38} {case['median_s'] * 1000:9.1f} ms  {case['queries']:4d} queries")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"hot_paths-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(report, json.load(handle))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Bulk employee import rate on synthetic rows, against a scratch SQLite DB.
+
+    python -m benchmarks.bench_import [rows] [--database URL]
+"""
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+from app import create_app, db
+from app.config import Config
+from app.employee_import import import_employees, read_csv
+from app.models import Department, Element, Grade, Job
+
+
+def synthetic_csv(rows, reference_ids, reject_every=50):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['employee_id', 'first_name', 'surname', 'date_of_birth', 'grade_id',
+                     'department_id', 'job_id', 'element_id', 'bank_name', 'bank_account_number'])
+    grade_ids, department_ids, job_ids, element_ids = reference_ids
+    for i in range(1, rows + 1):
+        # A small share of rows point at a grade that does not exist.
+        grade = 999_999 if i % reject_every == 0 else grade_ids[i % len(grade_ids)]
+        writer.writerow([i, f"First{i}", f"Surname{i}", '1990-01-01', grade,
+                         department_ids[i % len(department_ids)], job_ids[i % len(job_ids)],
+                         element_ids[i % len(element_ids)], 'GCB Bank', f"10{i:010d}"])
+    return io.BytesIO(buffer.getvalue().encode())
+
+
+def seed_reference_data():
+    grades = [Grade(grade_name=f"G{i}", salary=Decimal(1000 + i * 250)) for i in range(10)]
+    departments = [Department(department_name=f"Dept {i}") for i in range(20)]
+    jobs = [Job(job_name=f"Job {i}") for i in range(30)]
+    elements = [Element(transport_allowance=Decimal(i), tax_deduction=Decimal(i * 2)) for i in range(10)]
+    db.session.add_all(grades + departments + jobs + elements)
+    db.session.commit()
+    return (
+        [g.grade_id for g in grades],
+        [d.department_id for d in departments],
+        [j.job_id for j in jobs],
+        [e.element_id for e in elements],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('rows', nargs='?', type=int, default=100_000)
+    parser.add_argument('--database', default=None, help='SQLAlchemy URL (default: scratch SQLite file)')
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database is None:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        args.database = f"sqlite:///{scratch}"
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        upload = synthetic_csv(args.rows, seed_reference_data())
+
+        start = time.perf_counter()
+        result = import_employees(read_csv(upload))
+        elapsed = time.perf_counter() - start
+
+    print(f"rows: {args.rows:,}  inserted: {result.inserted:,}  rejected: {result.rejected:,}")
+    print(f"elapsed: {elapsed:.2f}s  rate: {args.rows / elapsed:,.0f} rows/s")
+    if scratch:
+        os.remove(scratch)
+
+
+if __name__ == '__main__':
+    main()
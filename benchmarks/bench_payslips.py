@@ -0,0 +1,52 @@
+"""Bulk payslip rendering into a streamed ZIP: throughput and peak memory.
+
+    python -m benchmarks.bench_payslips [count] [workers...]
+"""
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+from app.payslips import payslip_filename, render_many, stream_zip
+
+
+def synthetic_payslips(count):
+    for i in range(1, count + 1):
+        yield {
+            'payroll_id': i,
+            'employee_id': i,
+            'name': f"Employee {i}",
+            'month': 'March',
+            'year': 2025,
+            'lines': [(f"Line {n}", f"{i * 7 + n:,}.00") for n in range(14)],
+        }
+
+
+def run(count, workers):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    rendered = render_many(synthetic_payslips(count), workers=workers)
+    files = ((payslip_filename(data, per_employee=True), pdf) for data, pdf in rendered)
+    for chunk in stream_zip(files):
+        size += len(chunk)  # discarded, as a client socket would consume it
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main(count, worker_counts):
+    print(f"{'workers':>8} {'payslips/s':>11} {'zip MB':>8} {'peak heap MB':>13}")
+    for workers in worker_counts:
+        elapsed, size, peak = run(count, workers)
+        print(f"{workers:>8} {count / elapsed:>11.1f} {size / 2**20:>8.1f} {peak / 2**20:>13.2f}")
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"parent max RSS: {maxrss / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    worker_counts = [int(a) for a in sys.argv[2:]] or sorted({1, os.cpu_count() or 1})
+    main(count, worker_counts)
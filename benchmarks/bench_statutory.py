@@ -0,0 +1,46 @@
+"""Per-employee bracket loop vs compiled, vectorized PAYE evaluation.
+
+    python -m benchmarks.bench_statutory [sizes...]
+"""
+import bisect
+import sys
+import time
+
+import numpy as np
+
+from app.statutory import PRESETS, compile_schedule
+
+
+def loop_tax(schedule, amounts):
+    # One bisect and a Python multiply per employee.
+    thresholds = schedule.thresholds.tolist()
+    rates = schedule.rates.tolist()
+    base = schedule.base.tolist()
+    out = []
+    for amount in amounts:
+        band = bisect.bisect_right(thresholds, amount) - 1
+        out.append((base[band] + (amount - thresholds[band]) * rates[band] + 5000) // 10000)
+    return out
+
+
+def main(sizes):
+    schedule = compile_schedule(PRESETS['gh-2024-paye'][1])
+    print(f"{'employees':>10} {'loop (s)':>10} {'numpy (s)':>10} {'speedup':>9}")
+    for n in sizes:
+        amounts = np.random.default_rng(0).integers(0, 10_000_000, n)
+        as_list = amounts.tolist()
+
+        start = time.perf_counter()
+        expected = loop_tax(schedule, as_list)
+        loop_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tax = schedule.evaluate(amounts)
+        vec_s = time.perf_counter() - start
+
+        assert tax.tolist() == expected
+        print(f"{n:>10,} {loop_s:>10.3f} {vec_s:>10.4f} {loop_s / vec_s:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -96,6 +96,18 @@ def run_migrations_online():
 
     connectable = get_engine()
 
+    # indexes declared with Index.ddl_if(dialect=...) (e.g. the MySQL
+    # full-text index on employee names) only exist on that dialect
+    def include_object(object, name, type_, reflected, compare_to):
+        ddl_if = getattr(object, '_ddl_if', None)
+        if type_ == 'index' and not reflected and ddl_if is not None and ddl_if.dialect:
+            dialects = ddl_if.dialect if isinstance(ddl_if.dialect, (tuple, list)) else (ddl_if.dialect,)
+            return connectable.dialect.name in dialects
+        return True
+
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
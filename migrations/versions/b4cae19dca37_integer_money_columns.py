@@ -0,0 +1,56 @@
+"""integer money columns
+
+Revision ID: b4cae19dca37
+Revises: c853d7746547
+Create Date: 2026-10-18 12:02:25.953483
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4cae19dca37'
+down_revision = 'c853d7746547'
+branch_labels = None
+depends_on = None
+
+ALLOWANCES = ('transport_allowance', 'utility_allowance', 'extra_duty_allowance', 'other_allowance', 'overtime')
+DEDUCTIONS = ('social_security_deduction', 'tax_deduction', 'loan1_deduction', 'loan2_deduction', 'other_deductions')
+AMOUNT = sa.Numeric(precision=10, scale=2)
+TOTAL = sa.Numeric(precision=14, scale=2)
+
+# table -> [(column, type before this revision, nullable)]
+MONEY_COLUMNS = {
+    'element': [(c, AMOUNT, True) for c in ALLOWANCES + DEDUCTIONS],
+    'grade': [('salary', AMOUNT, True)],
+    'payroll': [(c, AMOUNT, False) for c in ('basic_salary', *ALLOWANCES, *DEDUCTIONS, 'total_allowances')]
+               + [(c, sa.Float(), False) for c in ('gross_salary', 'total_deductions', 'net_pay')],
+    'payroll_rollup': [(c, TOTAL, False) for c in ('gross_salary', 'total_deductions', 'net_pay')],
+    'payroll_ytd': [(c, TOTAL, False)
+                    for c in ('gross_salary', 'tax_deduction', 'social_security_deduction', 'net_pay')],
+    'statutory_bracket': [('lower_bound', sa.Numeric(precision=12, scale=2), False)],
+}
+# Wide enough for every amount in pesewas while it is being rescaled.
+WIDE = sa.Numeric(precision=20, scale=2)
+
+
+def _retype(table, columns, types):
+    with op.batch_alter_table(table, schema=None) as batch_op:
+        for (name, _, nullable), (existing, new) in zip(columns, types):
+            batch_op.alter_column(name, existing_type=existing, type_=new, existing_nullable=nullable)
+
+
+def upgrade():
+    # Amounts become whole pesewas: widen, scale by 100, then store as BIGINT.
+    for table, columns in MONEY_COLUMNS.items():
+        _retype(table, columns, [(old, WIDE) for _, old, _ in columns])
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{c} = ROUND({c} * 100)" for c, _, _ in columns))
+        _retype(table, columns, [(WIDE, sa.BigInteger())] * len(columns))
+
+
+def downgrade():
+    for table, columns in MONEY_COLUMNS.items():
+        _retype(table, columns, [(sa.BigInteger(), WIDE)] * len(columns))
+        op.execute(f"UPDATE {table} SET " + ", ".join(f"{c} = {c} / 100.0" for c, _, _ in columns))
+        _retype(table, columns, [(WIDE, old) for _, old, _ in columns])
@@ -0,0 +1,129 @@
+"""compensation assignments
+
+Revision ID: c853d7746547
+Revises: 5c7fe35b7bd1
+Create Date: 2026-10-18 11:53:26.952424
+
+"""
+from datetime import date, datetime
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c853d7746547'
+down_revision = '5c7fe35b7bd1'
+branch_labels = None
+depends_on = None
+
+# app.assignments.OPEN_START
+OPEN_START = date(1900, 1, 1)
+BATCH_SIZE = 5000
+
+
+def _month_start(key):
+    return date(key // 100, key % 100, 1)
+
+
+def _next_month_start(key):
+    year, month = divmod(key, 100)
+    return date(year + month // 12, month % 12 + 1, 1)
+
+
+def _backfill(table_name, column):
+    # Rebuild each employee's history from the values stored on their
+    # payroll rows: a new interval starts at the first period paid on a new
+    # value, and employee.<column> takes over after the last period if it
+    # differs. The first interval is open-started, as app.assignments does
+    # for employees with no known history.
+    bind = op.get_bind()
+    payroll = sa.table('payroll', sa.column('employee_id'), sa.column('period_key'), sa.column(column))
+    employee = sa.table('employee', sa.column('employee_id'), sa.column(column))
+    target = sa.table(table_name, sa.column('employee_id'), sa.column(column), sa.column('effective_from'),
+                      sa.column('effective_to'), sa.column('created_at'))
+
+    current = dict(bind.execute(sa.select(employee.c.employee_id, employee.c[column])).all())
+    paid = bind.execute(
+        sa.select(payroll.c.employee_id, payroll.c.period_key, payroll.c[column])
+        .order_by(payroll.c.employee_id, payroll.c.period_key)
+    )
+    now = datetime.utcnow()
+    rows = []
+
+    def add(employee_id, intervals):
+        for (start, value), (end, _) in zip(intervals, intervals[1:] + [(None, None)]):
+            if value is not None:
+                rows.append({'employee_id': employee_id, column: value, 'effective_from': start,
+                             'effective_to': end, 'created_at': now})
+        if len(rows) >= BATCH_SIZE:
+            bind.execute(sa.insert(target), rows)
+            rows.clear()
+
+    for employee_id, periods in groupby(paid, key=lambda row: row[0]):
+        intervals = []
+        for _, key, value in periods:
+            if not intervals or intervals[-1][1] != value:
+                intervals.append((_month_start(key) if intervals else OPEN_START, value))
+        if current.get(employee_id) != intervals[-1][1]:
+            intervals.append((_next_month_start(key), current.get(employee_id)))
+        add(employee_id, intervals)
+        current.pop(employee_id, None)
+
+    # Employees never paid.
+    for employee_id, value in current.items():
+        add(employee_id, [(OPEN_START, value)])
+    if rows:
+        bind.execute(sa.insert(target), rows)
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('element_assignment',
+    sa.Column('assignment_id', sa.Integer(), nullable=False),
+    sa.Column('element_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('effective_from', sa.Date(), nullable=False),
+    sa.Column('effective_to', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['element_id'], ['element.element_id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.employee_id'], ),
+    sa.PrimaryKeyConstraint('assignment_id'),
+    sa.UniqueConstraint('employee_id', 'effective_from', name='uq_element_assignment_start')
+    )
+    with op.batch_alter_table('element_assignment', schema=None) as batch_op:
+        batch_op.create_index('ix_element_assignment_as_of', ['employee_id', 'effective_from', 'effective_to', 'element_id'], unique=False)
+
+    op.create_table('grade_assignment',
+    sa.Column('assignment_id', sa.Integer(), nullable=False),
+    sa.Column('grade_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('effective_from', sa.Date(), nullable=False),
+    sa.Column('effective_to', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.employee_id'], ),
+    sa.ForeignKeyConstraint(['grade_id'], ['grade.grade_id'], ),
+    sa.PrimaryKeyConstraint('assignment_id'),
+    sa.UniqueConstraint('employee_id', 'effective_from', name='uq_grade_assignment_start')
+    )
+    with op.batch_alter_table('grade_assignment', schema=None) as batch_op:
+        batch_op.create_index('ix_grade_assignment_as_of', ['employee_id', 'effective_from', 'effective_to', 'grade_id'], unique=False)
+
+    # ### end Alembic commands ###
+
+    _backfill('grade_assignment', 'grade_id')
+    _backfill('element_assignment', 'element_id')
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('grade_assignment', schema=None) as batch_op:
+        batch_op.drop_index('ix_grade_assignment_as_of')
+
+    op.drop_table('grade_assignment')
+    with op.batch_alter_table('element_assignment', schema=None) as batch_op:
+        batch_op.drop_index('ix_element_assignment_as_of')
+
+    op.drop_table('element_assignment')
+    # ### end Alembic commands ###
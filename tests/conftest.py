@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.assignments import initial_assignments
+from app.config import Config
+from app.identity import identity_cache
+from app.models import Department, Element, ElementAssignment, Employee, Grade, GradeAssignment, Job, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'payroll.db'}"
+        TESTING = True
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        department, grade = Department(department_name='Ops'), Grade(grade_name='G1', salary=100000)
+        job, element = Job(job_name='Clerk'), Element()
+        db.session.add_all([department, grade, job, element])
+        db.session.flush()
+        db.session.add(Employee(
+            employee_id=1, first_name='Ama', surname='Mensah', date_of_birth=date(1990, 1, 1),
+            department_id=department.department_id, grade_id=grade.grade_id, job_id=job.job_id,
+            element_id=element.element_id, bank_name='GCB', bank_account_number='ACC1',
+        ))
+        assignments = initial_assignments([
+            {'employee_id': 1, 'grade_id': grade.grade_id, 'element_id': element.element_id},
+        ])
+        db.session.execute(insert(GradeAssignment), assignments['grade'])
+        db.session.execute(insert(ElementAssignment), assignments['element'])
+        db.session.add_all([User(username='admin', role='admin'), User(username='ama', role='employee', employee_id=1)])
+        db.session.commit()
+    identity_cache.clear()
+    yield app
+    identity_cache.clear()
+
+
+def login(app, username, employee_id=None):
+    client = app.test_client()
+    data = {'username': username}
+    if employee_id is not None:
+        data['employee_id'] = str(employee_id)
+    client.post('/auth/login', data=data)
+    return client
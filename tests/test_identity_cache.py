@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.identity import identity_cache
+
+from tests.conftest import login
+
+
+@contextmanager
+def statements(app):
+    """Collect the SQL statements issued inside the block."""
+    issued = []
+
+    def record(conn, cursor, statement, *args):
+        issued.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield issued
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def user_lookups(issued):
+    return [s for s in issued if 'FROM user' in s or 'FROM "user"' in s]
+
+
+@pytest.mark.parametrize('username, employee_id, url', [
+    ('ama', 1, '/employee/dashboard'),
+    ('admin', None, '/admin/dashboard'),
+])
+def test_cached_identity_saves_the_user_lookup(app, username, employee_id, url):
+    client = login(app, username, employee_id)
+    client.get(url)  # warm the other caches (reference data) first
+
+    identity_cache.clear()
+    with statements(app) as cold:
+        assert client.get(url).status_code == 200
+    with statements(app) as warm:
+        assert client.get(url).status_code == 200
+
+    assert len(user_lookups(cold)) == 1
+    assert user_lookups(warm) == []
+    assert len(warm) == len(cold) - 1
+
+
+def test_employee_dashboard_reads_no_employee_row_when_cached(app):
+    client = login(app, 'ama', 1)
+    client.get('/employee/dashboard')
+
+    with statements(app) as warm:
+        assert b'Ama' in client.get('/employee/dashboard').data
+    assert not any('FROM employee' in s for s in warm)
+
+
+def test_profile_update_invalidates_the_cached_employee(app):
+    client = login(app, 'ama', 1)
+    client.get('/employee/dashboard')
+
+    client.post('/employee/update', data={
+        'first_name': 'Akua', 'surname': 'Mensah', 'bank_name': 'GCB', 'bank_account_number': 'ACC1',
+    })
+    assert b'Akua' in client.get('/employee/dashboard').data
@@ -0,0 +1,73 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from app import db
+from app.assignments import assign
+from app.calculator import batch_select, calculate, load_batch
+from app.models import Grade, Payroll
+from app.money import Money
+from app.payroll_engine import payroll_rows, run_payroll, upsert_payroll
+from app.periods import period_end, period_key
+from app.reconciliation import verify
+from app.refdata import refdata
+
+
+def clean(year=2025):
+    checked, problems = verify(year)
+    return checked > 0 and problems == []
+
+
+def stored(month='March', year=2025):
+    return db.session.execute(
+        select(Payroll.payroll_id, Payroll.grade_id, Payroll.basic_salary, Payroll.net_pay, Payroll.generated_at)
+        .where(Payroll.period_key == period_key(month, year))
+    ).all()
+
+
+def test_rerun_only_recomputes_changed_employees(app):
+    with app.app_context():
+        assert run_payroll('March', 2025) == 1
+        first = stored()
+        assert run_payroll('March', 2025) == 0
+        assert stored() == first
+        assert clean()
+
+
+def test_full_rerun_updates_rows_in_place(app):
+    with app.app_context():
+        run_payroll('March', 2025)
+        (payroll_id, *_), = stored()
+        assert run_payroll('March', 2025, full=True) == 1
+        assert [row.payroll_id for row in stored()] == [payroll_id]
+        assert clean()
+
+
+def test_upserting_the_same_rows_twice_is_idempotent(app):
+    with app.app_context():
+        key = period_key('March', 2025)
+        result = calculate(load_batch(batch_select(period_end(key))))
+        rows = payroll_rows(result, 'March', 2025)
+        upsert_payroll(rows)
+        db.session.commit()
+        first = stored()
+        upsert_payroll(rows)
+        db.session.commit()
+        assert stored() == first
+        assert clean()
+
+
+def test_assignment_applies_from_the_period_containing_its_start(app):
+    with app.app_context():
+        senior = Grade(grade_name='G2', salary=Money.from_cedis('1500'))
+        db.session.add(senior)
+        db.session.commit()
+        refdata.bump('grades')
+        assign(1, date(2025, 3, 15), grade_id=senior.grade_id)
+        db.session.commit()
+
+        run_payroll('February', 2025)
+        run_payroll('March', 2025)
+        assert stored('February')[0].basic_salary == 100000
+        assert stored('March')[0].grade_id == senior.grade_id
+        assert stored('March')[0].basic_salary == 150000
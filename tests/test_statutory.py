@@ -0,0 +1,73 @@
+from datetime import date
+
+import pytest
+
+from app.money import Money
+from app.statutory import PRESETS, add_table, compile_schedule, rules_for
+
+
+def schedule(*brackets):
+    return compile_schedule([(Money.from_cedis(lower), rate) for lower, rate in brackets])
+
+
+PAYE = schedule(*PRESETS['gh-2024-paye'][1])
+
+
+@pytest.mark.parametrize('amount, charge', [
+    (0, 0),
+    (49000, 0),          # exactly on the 5% bound: nothing above it yet
+    (49100, 5),          # GH₵1 into the 5% band
+    (60000, 550),        # top of the 5% band: 110 cedis at 5%
+    (60100, 560),        # first cedi at 10%
+    (73000, 1850),       # 550 + 130 cedis at 10%
+    (74000, 2025),       # GH₵10 at 17.5% (1750 basis points)
+])
+def test_paye_bands_meet_at_their_lower_bounds(amount, charge):
+    assert PAYE.evaluate([amount])[0] == charge
+
+
+@pytest.mark.parametrize('amount, charge', [
+    (49009, 0),    # 0.45 pesewa
+    (49010, 1),    # 0.5 pesewa rounds half up
+    (73030, 1855),  # 1850 + 5.25 pesewas at 17.5%
+])
+def test_charges_round_half_up_to_the_pesewa(amount, charge):
+    assert PAYE.evaluate([amount])[0] == charge
+
+
+def test_negative_amounts_are_not_charged():
+    assert PAYE.evaluate([-5000])[0] == 0
+
+
+def test_bounds_must_increase():
+    with pytest.raises(ValueError):
+        schedule(('0', '0'), ('490', '5'), ('490', '10'))
+
+
+@pytest.mark.parametrize('value, pesewas', [
+    ('12.345', 1235),
+    ('12.344', 1234),
+    ('-0.005', -1),
+    ('1500', 150000),
+    ('', 0),
+])
+def test_cedis_round_half_up_to_the_pesewa(value, pesewas):
+    assert Money.from_cedis(value) == pesewas
+
+
+@pytest.mark.parametrize('month, applies', [
+    ('February', False),
+    ('March', True),     # in effect from the 15th, so on March's last day
+    ('April', True),
+])
+def test_tables_apply_from_the_period_containing_their_effective_date(app, month, applies):
+    with app.app_context():
+        add_table('ssnit', date(2025, 3, 15), [('0', '5.5')])
+        assert bool(rules_for(month, 2025)) is applies
+
+
+def test_table_effective_on_the_last_day_applies_to_that_month(app):
+    with app.app_context():
+        add_table('paye', date(2025, 3, 31), PRESETS['gh-2024-paye'][1])
+        assert 'paye' in rules_for('March', 2025).schedules
+        assert 'paye' not in rules_for('February', 2025).schedules